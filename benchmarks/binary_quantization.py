@@ -0,0 +1,81 @@
+"""Recall and latency of the binary-quantized `InMemoryVectorStore`.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/binary_quantization.py --sizes 100000 1000000 --dim 384 --rescore 4 10 30
+
+Vectors are drawn around ``--clusters`` random centres and loaded into an
+exact store and a ``binary=True`` one.  Queries are perturbed copies of stored
+vectors; for every ``--rescore`` the Hamming-prefiltered search is timed and
+its recall@k measured against the exact path.  The packed sign bits take
+``dim / 8`` bytes per vector against ``dim * 4`` for the float32 matrix.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+async def _latencies(store, queries, k) -> tuple[list[list[str]], float, float]:
+    hits, times = [], []
+    for q in queries:
+        started = time.perf_counter()
+        result = await store.similarity_search(q, top_k=k)
+        times.append((time.perf_counter() - started) * 1000)
+        hits.append([doc_id for doc_id, _ in result])
+    times.sort()
+    return hits, statistics.median(times), times[int(0.95 * (len(times) - 1))]
+
+
+async def run(args, size: int) -> None:
+    rng = np.random.default_rng(size)
+    centres = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    vectors = centres[rng.integers(0, args.clusters, size)]
+    vectors += args.spread * rng.standard_normal((size, args.dim), dtype=np.float32)
+    picks = rng.choice(size, args.queries, replace=False)
+    queries = vectors[picks] + args.spread * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    ids = [f"chunk-{i}" for i in range(size)]
+    mib = lambda b: b / 2**20  # noqa: E731
+
+    exact = InMemoryVectorStore(initial_capacity=size)
+    binary = InMemoryVectorStore(initial_capacity=size, binary=True)
+    for start in range(0, size, 65_536):
+        batch = ids[start : start + 65_536]
+        await exact.add_vectors(vectors[start : start + len(batch)], [{}] * len(batch), batch)
+        await binary.add_vectors(vectors[start : start + len(batch)], [{}] * len(batch), batch)
+    del vectors
+
+    truth, p50, p95 = await _latencies(exact, queries, args.k)
+    print(
+        f"{size:>9} vectors  float32 {mib(binary._matrix.nbytes):7.1f} MiB  bits {mib(binary._bits.nbytes):6.1f} MiB  "
+        f"exact p50 {p50:7.2f} ms  p95 {p95:7.2f} ms"
+    )
+    for rescore in args.rescore:
+        binary.rescore = rescore
+        found, p50, p95 = await _latencies(binary, queries, args.k)
+        recall = statistics.mean(len(set(f) & set(t)) / args.k for f, t in zip(found, truth))
+        print(f"{'':>9} rescore={rescore:<4} recall@{args.k} {recall:6.3f}   p50 {p50:7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--spread", type=float, default=1.0, help="noise around each centre")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[4, 10, 30])
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(run(args, size))
+
+
+if __name__ == "__main__":
+    main()
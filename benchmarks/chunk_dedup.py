@@ -0,0 +1,112 @@
+"""Index size, ingest time and search time with and without chunk deduplication.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/chunk_dedup.py --sizes 20000 100000 --repeated 0.4
+    PYTHONPATH=src python benchmarks/chunk_dedup.py --store segmented
+
+Builds a corpus of ``size`` chunks in documents of ``--doc-chunks`` chunks,
+where a ``--repeated`` fraction of the chunks are drawn from ``--boilerplate``
+shared texts (disclaimers, headers, signature blocks) and the rest are unique.
+Every distinct text gets one random vector (the embedding cache already
+embeds a repeated text once), so the runs differ only in storage.  The same
+chunks are loaded into an `InMemoryVectorStore` (or, with ``--store
+segmented``, a compacted `SegmentedVectorStore` in a temporary directory)
+with ``dedup`` off and on, then queried with and without a document filter.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+from privategpt.infra.vector_store.segmented import SegmentedVectorStore
+
+
+def corpus(size: int, repeated: float, boilerplate: int, doc_chunks: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    shared = [f"boilerplate block {j}: " + "this communication is confidential " * 8 for j in range(boilerplate)]
+    texts, metas, ids = [], [], []
+    for i in range(size):
+        if rng.random() < repeated:
+            text = shared[rng.integers(0, boilerplate)]
+        else:
+            text = f"unique clause {i} " + " ".join(f"w{w}" for w in rng.integers(0, 5000, 30))
+        texts.append(text)
+        metas.append({"text": text, "document_id": i // doc_chunks, "user_id": 1, "position": i % doc_chunks})
+        ids.append(f"doc{i // doc_chunks}-{i % doc_chunks}")
+    return texts, metas, ids
+
+
+def vectors_for(texts, dim: int, seed: int = 1) -> np.ndarray:
+    """One random vector per distinct text, identical for repeated texts."""
+    rng = np.random.default_rng(seed)
+    distinct = {t: None for t in texts}
+    table = dict(zip(distinct, rng.standard_normal((len(distinct), dim), dtype=np.float32)))
+    return np.stack([table[t] for t in texts])
+
+
+async def run(args, size: int, dedup: bool, texts, metas, ids, vectors) -> None:
+    directory = tempfile.TemporaryDirectory() if args.store == "segmented" else None
+    if directory is not None:
+        store = SegmentedVectorStore(directory.name, compact_min_rows=size + 1, background_compaction=False, dedup=dedup)
+    else:
+        store = InMemoryVectorStore(initial_capacity=1024, dedup=dedup)
+    started = time.perf_counter()
+    for start in range(0, size, args.window):
+        end = min(start + args.window, size)
+        await store.add_vectors(vectors[start:end], metas[start:end], ids[start:end])
+    if directory is not None:
+        store.compact()  # copies in different windows share once merged
+    ingest_s = time.perf_counter() - started
+
+    rng = np.random.default_rng(2)
+    queries = vectors[rng.choice(size, args.queries)] + 0.1 * rng.standard_normal(
+        (args.queries, vectors.shape[1]), dtype=np.float32
+    )
+    documents = max(size // args.doc_chunks, 1)
+    latencies, filtered = [], []
+    for q in queries:
+        started = time.perf_counter()
+        await store.similarity_search(q, top_k=10)
+        latencies.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        await store.similarity_search(q, top_k=10, filters={"document_id": int(rng.integers(0, documents))})
+        filtered.append((time.perf_counter() - started) * 1000)
+
+    rows = store.dedup_stats()["rows"]
+    print(
+        f"{size:>8} {'on' if dedup else 'off':>5} {rows:>8} {rows * vectors.shape[1] * 4 / 2**20:>9.1f} "
+        f"{ingest_s:>9.2f} {statistics.median(latencies):>9.2f} {statistics.median(filtered):>11.2f}"
+    )
+    if directory is not None:
+        directory.cleanup()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--repeated", type=float, default=0.4, help="fraction of chunks that are boilerplate")
+    parser.add_argument("--boilerplate", type=int, default=50, help="distinct boilerplate texts")
+    parser.add_argument("--doc-chunks", type=int, default=100)
+    parser.add_argument("--window", type=int, default=512, help="chunks per add_vectors call")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--store", choices=["memory", "segmented"], default="memory")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'dedup':>5} {'rows':>8} {'matrix MB':>9} {'ingest s':>9} {'p50 ms':>9} {'filt p50 ms':>11}")
+    for size in args.sizes:
+        texts, metas, ids = corpus(size, args.repeated, args.boilerplate, args.doc_chunks)
+        vectors = vectors_for(texts, args.dim)
+        for dedup in (False, True):
+            await run(args, size, dedup, texts, metas, ids, vectors)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
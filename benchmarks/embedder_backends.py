@@ -0,0 +1,65 @@
+"""Throughput comparison of the torch and ONNX Runtime embedding backends.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/embedder_backends.py --chunks 2000
+
+Reports chunks/sec per backend and the cosine drift of each ONNX variant
+against the torch vectors.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from privategpt.infra.embedder.bge_adapter import BgeEmbedderAdapter
+from privategpt.infra.embedder.model_pool import EmbedderModelPool
+from privategpt.infra.embedder.onnx_adapter import OnnxEmbedderAdapter
+
+_WORDS = (
+    "agreement party shall notice court revenue quarter liability clause section "
+    "invoice shipment warranty damages pursuant hereby tenant landlord schedule"
+).split()
+
+
+def make_chunks(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(_WORDS, k=rng.randint(8, 220))) for _ in range(n)]
+
+
+async def run(model: str, chunks: list[str]) -> None:
+    pool = EmbedderModelPool(device="cpu")
+    adapters = {
+        "torch": BgeEmbedderAdapter(model, pool=pool),
+        "onnx": OnnxEmbedderAdapter(model, pool=pool),
+        "onnx-int8": OnnxEmbedderAdapter(model, quantized=True, pool=pool),
+    }
+    reference = None
+    for name, adapter in adapters.items():
+        await adapter.embed_documents(chunks[:8])  # load + warm up
+        started = time.perf_counter()
+        vectors = np.asarray(await adapter.embed_documents(chunks), dtype=np.float32)
+        elapsed = time.perf_counter() - started
+        line = f"{name:10s} {len(chunks) / elapsed:8.1f} chunks/s"
+        if reference is None:
+            reference = vectors
+        else:
+            cos = np.sum(reference * vectors, axis=1)
+            line += f"   cosine vs torch: min={cos.min():.5f} mean={cos.mean():.5f}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="BAAI/bge-small-en-v1.5")
+    parser.add_argument("--chunks", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.model, make_chunks(args.chunks)))
+
+
+if __name__ == "__main__":
+    main()
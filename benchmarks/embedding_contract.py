@@ -0,0 +1,71 @@
+"""Cost of passing embeddings as Python lists versus float32 matrices.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/embedding_contract.py --chunks 20000 --dim 384
+
+Simulates the hand-off of one ingestion job from the embedder to a vector
+store, once the old way (``tolist()`` per batch, lists passed around and
+turned back into arrays for scoring) and once with the ``EmbeddingMatrix``
+contract (batches written into one contiguous float32 array).  The final
+JSON/Weaviate serialization is identical for both and left out.  Reports
+wall time and peak traced memory of each path.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def _measure(label: str, fn) -> None:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    # traced separately: tracemalloc slows allocation-heavy code down a lot
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:8s} {elapsed * 1000:9.1f} ms   peak {peak / 2**20:8.1f} MiB")
+
+
+def list_path(batches: list[np.ndarray]) -> None:
+    # adapters returned ``vectors.tolist()`` per batch, stitched into one list
+    vectors: list[list[float]] = []
+    for batch in batches:
+        vectors.extend(batch.tolist())
+    stored = np.array(vectors, dtype=np.float32)  # store scores with numpy again
+    del vectors, stored
+
+
+def matrix_path(batches: list[np.ndarray]) -> None:
+    total = sum(len(b) for b in batches)
+    matrix = np.empty((total, batches[0].shape[1]), dtype=np.float32)
+    offset = 0
+    for batch in batches:
+        matrix[offset : offset + len(batch)] = batch
+        offset += len(batch)
+    del matrix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch", type=int, default=128)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batches = [
+        rng.standard_normal((min(args.batch, args.chunks - i), args.dim), dtype=np.float32)
+        for i in range(0, args.chunks, args.batch)
+    ]
+    _measure("lists", lambda: list_path(batches))
+    _measure("float32", lambda: matrix_path(batches))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Recall@k and latency of `HnswVectorStore` against the exact in-memory store.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/hnsw_recall.py --sizes 10000 50000 --dim 384 --ef 16 32 64 128
+
+Vectors are drawn around ``--clusters`` random centres (real embeddings are
+clustered; uniform Gaussian noise is the worst case for any ANN index).  For
+each size the vectors are appended to the delta log, linked into the graph
+by one ``snapshot`` and reloaded through the memory-mapped path, then queried at every ``ef_search`` value.  Recall is
+the overlap of the HNSW top-k with the exact top-k from
+`InMemoryVectorStore`; latencies are per query, single-threaded.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from privategpt.infra.vector_store.hnsw import HnswVectorStore
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+def clustered(rng: np.random.Generator, n: int, dim: int, clusters: int, spread: float) -> np.ndarray:
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centres[labels] + spread * rng.standard_normal((n, dim), dtype=np.float32)
+
+
+async def _latencies(store, queries, k) -> tuple[list[list[str]], float, float]:
+    hits, times = [], []
+    for q in queries:
+        started = time.perf_counter()
+        result = await store.similarity_search(q, top_k=k)
+        times.append((time.perf_counter() - started) * 1000)
+        hits.append([doc_id for doc_id, _ in result])
+    times.sort()
+    return hits, statistics.median(times), times[int(0.95 * (len(times) - 1))]
+
+
+async def run(args, size: int) -> None:
+    rng = np.random.default_rng(size)
+    data = clustered(rng, size + args.queries, args.dim, args.clusters, args.spread)
+    vectors, queries = data[:size], data[size:]
+    ids = [f"chunk-{i}" for i in range(size)]
+
+    exact = InMemoryVectorStore(initial_capacity=size)
+    await exact.add_vectors(vectors, [{}] * size, ids)
+    truth, exact_p50, _ = await _latencies(exact, queries, args.k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = HnswVectorStore(tmp, M=args.M, ef_construction=args.ef_construction)
+        started = time.perf_counter()
+        for start in range(0, size, 512):
+            await writer.add_vectors(vectors[start : start + 512], [{}] * 512, ids[start : start + 512])
+        append_s = time.perf_counter() - started
+        started = time.perf_counter()
+        writer.snapshot()
+        snapshot_s = time.perf_counter() - started
+        started = time.perf_counter()
+        store = HnswVectorStore(tmp)  # memory-mapped reload
+        load_ms = (time.perf_counter() - started) * 1000
+
+        print(
+            f"{size:>8} vectors  append {append_s:5.2f} s  snapshot {snapshot_s:7.1f} s "
+            f"({size / snapshot_s:6.0f}/s)  reload {load_ms:7.1f} ms  exact p50 {exact_p50:7.2f} ms"
+        )
+        for ef in args.ef:
+            store.ef_search = ef
+            found, p50, p95 = await _latencies(store, queries, args.k)
+            recall = statistics.mean(len(set(f) & set(t)) / args.k for f, t in zip(found, truth))
+            print(f"{'':>8} ef={ef:<4} recall@{args.k} {recall:6.3f}   p50 {p50:7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--spread", type=float, default=1.0, help="noise around each centre")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=128)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128])
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(run(args, size))
+
+
+if __name__ == "__main__":
+    main()
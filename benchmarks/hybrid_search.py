@@ -0,0 +1,85 @@
+"""Latency overhead of hybrid (BM25 + vector) search in `InMemoryVectorStore`.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/hybrid_search.py --sizes 10000 100000 --dim 384
+
+Each chunk gets ``--words`` words drawn from a Zipf-distributed vocabulary,
+so a few terms are very common, plus a unique code (``sku-<n>``).  Queries mix
+two vocabulary words with a code.  For every size the vector-only and hybrid
+paths are timed over the same queries, together with how often the chunk
+holding the queried code is in the top 10.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+async def _timed(fn, queries) -> tuple[list, float, float]:
+    results, latencies = [], []
+    for q in queries:
+        started = time.perf_counter()
+        results.append(await fn(q))
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return results, statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+
+
+async def run(args, size: int) -> None:
+    rng = np.random.default_rng(size)
+    vocab = [f"w{i}" for i in range(args.vocab)]
+    words = np.minimum(rng.zipf(1.3, (size, args.words)), args.vocab) - 1
+    texts = [" ".join(vocab[w] for w in row) + f" sku-{i}" for i, row in enumerate(words)]
+    vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+    ids = [f"chunk-{i}" for i in range(size)]
+
+    store = InMemoryVectorStore(initial_capacity=size, hybrid_depth=args.depth)
+    started = time.perf_counter()
+    for start in range(0, size, 4096):
+        end = min(start + 4096, size)
+        await store.add_vectors(vectors[start:end], [{"text": t} for t in texts[start:end]], ids[start:end])
+    load_s = time.perf_counter() - started
+
+    targets = rng.choice(size, args.queries, replace=False)
+    queries = [
+        (f"{vocab[rng.integers(0, 50)]} {vocab[rng.integers(0, args.vocab)]} sku-{t}",
+         rng.standard_normal(args.dim, dtype=np.float32), f"chunk-{t}")
+        for t in targets
+    ]
+    dense, d50, d95 = await _timed(lambda q: store.similarity_search(q[1], top_k=10), queries)
+    hybrid, h50, h95 = await _timed(lambda q: store.hybrid_search(q[0], q[1], top_k=10, alpha=args.alpha), queries)
+
+    def found(results):
+        return statistics.mean(q[2] in {i for i, _ in hits} for q, hits in zip(queries, results))
+
+    print(f"{size:>9} chunks  load {load_s:6.2f} s")
+    print(f"{'':>9} vector  p50 {d50:7.2f} ms  p95 {d95:7.2f} ms  code hit@10 {found(dense):5.2f}")
+    print(
+        f"{'':>9} hybrid  p50 {h50:7.2f} ms  p95 {h95:7.2f} ms  code hit@10 {found(hybrid):5.2f}  "
+        f"overhead p50 {h50 - d50:+7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--vocab", type=int, default=20_000)
+    parser.add_argument("--words", type=int, default=120, help="words per chunk")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=50, help="hybrid_depth of the store")
+    parser.add_argument("--alpha", type=float, default=0.5)
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(run(args, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Peak Python memory of whole-text versus streaming ingestion.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/ingest_memory.py --sizes-mb 10 50
+
+Writes a synthetic UTF-8 document of each size to a temp file and ingests it
+twice with the fake embedder and a sink that discards the vectors:
+
+* ``whole``  – the previous path: read + decode the file, ``split()`` it into a
+  list and embed every chunk in one call.
+* ``stream`` – `TextBlockReader` → ``iter_chunks_stream`` → `embed_windows`.
+
+Peak allocations are measured with ``tracemalloc``.  The streaming peak should
+stay roughly flat as the document grows; the whole-text peak grows with it.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from privategpt.infra.embedder.fake import FakeEmbedderAdapter
+from privategpt.infra.splitters.recursive import RecursiveTokenSplitter
+from privategpt.infra.tasks.ingest_stream import TextBlockReader, embed_windows
+
+_WORDS = (
+    "agreement party shall notice court revenue quarter liability clause section "
+    "invoice shipment warranty damages pursuant hereby tenant landlord schedule"
+).split()
+
+
+def write_document(path: Path, size_mb: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    target = size_mb << 20
+    written = 0
+    with open(path, "w", encoding="utf-8") as fp:
+        while written < target:
+            paragraph = " ".join(
+                " ".join(rng.choices(_WORDS, k=rng.randint(6, 30))).capitalize() + "."
+                for _ in range(rng.randint(3, 12))
+            )
+            written += fp.write(paragraph + "\n\n")
+
+
+async def _discard(position, parts, vectors) -> None:
+    return None
+
+
+async def ingest_whole(path: Path, splitter: RecursiveTokenSplitter, embedder) -> int:
+    text = path.read_bytes().decode("utf-8", errors="replace")
+    parts = splitter.split(text)
+    vectors = await embedder.embed_documents(parts)
+    await _discard(0, parts, vectors)
+    return len(parts)
+
+
+async def ingest_stream(path: Path, splitter: RecursiveTokenSplitter, embedder, window: int) -> int:
+    chunks = splitter.iter_chunks_stream(TextBlockReader(path))
+    return await embed_windows(chunks, embedder, _discard, window_chunks=window)
+
+
+def measure(coro) -> tuple[int, float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    chunks = asyncio.run(coro)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, seconds, peak / (1 << 20)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--window", type=int, default=512, help="chunks per embed/store window")
+    args = parser.parse_args()
+
+    splitter = RecursiveTokenSplitter(chunk_size=args.chunk_size, chunk_overlap=64)
+    embedder = FakeEmbedderAdapter()
+    print(f"{'size':>6} {'path':>7} {'chunks':>8} {'seconds':>8} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes_mb:
+            path = Path(tmp) / f"doc-{size}mb.txt"
+            write_document(path, size)
+            runs = {
+                "whole": ingest_whole(path, splitter, embedder),
+                "stream": ingest_stream(path, splitter, embedder, args.window),
+            }
+            for name, coro in runs.items():
+                chunks, seconds, peak = measure(coro)
+                print(f"{size:>4}MB {name:>7} {chunks:>8} {seconds:>8.2f} {peak:>9.1f}")
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
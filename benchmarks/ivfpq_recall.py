@@ -0,0 +1,116 @@
+"""Recall, latency and resident memory of `IvfPqVectorStore`.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/ivfpq_recall.py --sizes 100000 1000000 --dim 384 --nprobe 8 16 32
+
+Vectors are drawn around ``--clusters`` random centres, written in 65k-row
+appends and trained once.  A freshly spawned process then opens the store and
+runs the queries at every ``nprobe``; it reports its anonymous memory – the
+PQ codes and coarse lists it loaded – separately from the file-backed pages
+of the full-precision vectors it read for re-ranking.  Recall@k is measured
+against the exact `InMemoryVectorStore`, which needs ``dim * 4`` bytes of
+heap per vector.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from privategpt.infra.embedder.model_pool import process_memory
+from privategpt.infra.vector_store.ivfpq import IvfPqVectorStore
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+def clustered(rng: np.random.Generator, n: int, dim: int, clusters: int, spread: float) -> np.ndarray:
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centres[labels] + spread * rng.standard_normal((n, dim), dtype=np.float32)
+
+
+async def _latencies(store, queries, k) -> tuple[list[list[str]], float, float]:
+    hits, times = [], []
+    for q in queries:
+        started = time.perf_counter()
+        result = await store.similarity_search(q, top_k=k)
+        times.append((time.perf_counter() - started) * 1000)
+        hits.append([doc_id for doc_id, _ in result])
+    times.sort()
+    return hits, statistics.median(times), times[int(0.95 * (len(times) - 1))]
+
+
+def _cold_search(path: str, args, queries: np.ndarray, out) -> None:
+    store = IvfPqVectorStore(path)
+    before = process_memory()
+    runs = []
+    for nprobe in args.nprobe:
+        store.nprobe = nprobe
+        runs.append(asyncio.run(_latencies(store, queries, args.k)))
+    after = process_memory()
+    out.send((runs, before, after))
+
+
+async def run(args, size: int) -> None:
+    rng = np.random.default_rng(size)
+    data = clustered(rng, size + args.queries, args.dim, args.clusters, args.spread)
+    vectors, queries = data[:size], data[size:]
+    ids = [f"chunk-{i}" for i in range(size)]
+    mib = lambda b: b / 2**20  # noqa: E731
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = IvfPqVectorStore(tmp, nlist=args.nlist, m=args.m, train_min_rows=size)
+        for start in range(0, size, 65_536):
+            batch = ids[start : start + 65_536]
+            await store.add_vectors(vectors[start : start + len(batch)], [{}] * len(batch), batch)
+        started = time.perf_counter()
+        store.train()
+        train_s = time.perf_counter() - started
+        codec = store._collections[""].codec
+        del store
+
+        recv, send = multiprocessing.Pipe(duplex=False)
+        child = multiprocessing.get_context("spawn").Process(target=_cold_search, args=(tmp, args, queries, send))
+        child.start()
+        runs, before, after = recv.recv()
+        child.join()
+
+    exact = InMemoryVectorStore(initial_capacity=size)
+    await exact.add_vectors(vectors, [{}] * size, ids)
+    truth, exact_p50, _ = await _latencies(exact, queries, args.k)
+
+    anon = after["anonymous_bytes"] - before["anonymous_bytes"]
+    print(
+        f"{size:>9} vectors  train {train_s:6.1f} s  nlist {codec.nlist}  m {codec.m}  "
+        f"codes {mib(size * (codec.m + 8)):7.1f} MiB vs raw {mib(size * args.dim * 4):7.1f} MiB  "
+        f"anon +{mib(anon):6.1f} MiB  page cache +{mib(after['rss_bytes'] - before['rss_bytes'] - anon):6.1f} MiB  "
+        f"exact p50 {exact_p50:7.2f} ms"
+    )
+    for nprobe, (found, p50, p95) in zip(args.nprobe, runs):
+        recall = statistics.mean(len(set(f) & set(t)) / args.k for f, t in zip(found, truth))
+        print(f"{'':>9} nprobe={nprobe:<4} recall@{args.k} {recall:6.3f}   p50 {p50:7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--spread", type=float, default=1.0, help="noise around each centre")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--m", type=int, default=48)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(run(args, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Cold start, search latency and memory of `SegmentedVectorStore`.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/segmented_store.py --sizes 100000 1000000 --dim 384
+
+For each size the store is filled in ``--segment-rows`` appends (one segment
+each, background compaction off so the segment count is fixed), then opened
+afresh in a child process, which reports:
+
+* open time – only the manifest is read and the segment files mapped;
+* search p50/p95 over ``--queries`` top-10 queries;
+* RSS and anonymous bytes after the searches – the vectors are file-backed
+  page cache, so they count towards RSS but not towards anonymous memory,
+  and the kernel can reclaim them under pressure.
+
+The exact in-memory store is timed on the same data for comparison; its
+"open" is the rebuild a restart would need.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from privategpt.infra.embedder.model_pool import process_memory
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+from privategpt.infra.vector_store.segmented import SegmentedVectorStore
+
+
+def _batches(size: int, dim: int, rows: int, seed: int):
+    rng = np.random.default_rng(seed)
+    for start in range(0, size, rows):
+        n = min(rows, size - start)
+        yield start, rng.standard_normal((n, dim), dtype=np.float32)
+
+
+async def _search(store, queries) -> tuple[float, float]:
+    times = []
+    for q in queries:
+        started = time.perf_counter()
+        await store.similarity_search(q, top_k=10)
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(0.95 * (len(times) - 1))]
+
+
+def _cold_open(path: str, queries: np.ndarray, out) -> None:
+    started = time.perf_counter()
+    store = SegmentedVectorStore(path, background_compaction=False)
+    open_ms = (time.perf_counter() - started) * 1000
+    before = process_memory()
+    p50, p95 = asyncio.run(_search(store, queries))
+    after = process_memory()
+    out.send((open_ms, p50, p95, before, after, len(store._segments)))
+
+
+async def run(size: int, dim: int, segment_rows: int, n_queries: int) -> None:
+    queries = np.random.default_rng(1).standard_normal((n_queries, dim), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SegmentedVectorStore(tmp, background_compaction=False)
+        started = time.perf_counter()
+        for start, batch in _batches(size, dim, segment_rows, size):
+            ids = [f"chunk-{i}" for i in range(start, start + len(batch))]
+            await store.add_vectors(batch, [{"document_id": i // 100} for i in range(start, start + len(batch))], ids)
+        write_s = time.perf_counter() - started
+        del store
+
+        recv, send = multiprocessing.Pipe(duplex=False)
+        child = multiprocessing.get_context("fork").Process(target=_cold_open, args=(tmp, queries, send))
+        child.start()
+        open_ms, p50, p95, before, after, segments = recv.recv()
+        child.join()
+        mib = lambda b: b / 2**20  # noqa: E731
+        print(
+            f"{size:>9} segmented  write {write_s:6.1f} s  open {open_ms:7.1f} ms  ({segments} segments)  "
+            f"p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  "
+            f"rss {mib(before['rss_bytes']):6.0f} -> {mib(after['rss_bytes']):6.0f} MiB  "
+            f"anon {mib(before['anonymous_bytes']):6.0f} -> {mib(after['anonymous_bytes']):6.0f} MiB"
+        )
+
+    exact = InMemoryVectorStore(initial_capacity=size)
+    started = time.perf_counter()
+    for start, batch in _batches(size, dim, segment_rows, size):
+        await exact.add_vectors(batch, [{}] * len(batch), [f"chunk-{i}" for i in range(start, start + len(batch))])
+    rebuild_s = time.perf_counter() - started
+    p50, p95 = await _search(exact, queries)
+    print(f"{size:>9} in-memory  rebuild {rebuild_s:6.1f} s (vectors only)  p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--segment-rows", type=int, default=65_536)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(run(size, args.dim, args.segment_rows, args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Recursive token splitter versus the v1 ``ChunkingService.chunk_text``.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/text_splitters.py --pages 200
+
+Builds a synthetic document of ``--pages`` pages in two layouts – one long
+run of text without blank lines and thousands of one-line paragraphs – and
+reports split time plus the token-size spread of the chunks each splitter
+produces.  v1 sizes chunks in characters, so it is given ``4 × chunk_size``
+characters to target roughly the same number of tokens.
+
+The v1 module double-escapes its regexes (``r'\\s+'``), which makes it return
+the whole document as a single chunk; the benchmark loads it with those
+escapes fixed so it measures the algorithm as intended.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import types
+from pathlib import Path
+
+from privategpt.infra.splitters.recursive import RecursiveTokenSplitter, approx_token_count
+
+_V1_CHUNKING = Path(__file__).resolve().parents[1] / "v1/docker/knowledge-service/app/services/chunking.py"
+_WORDS = (
+    "agreement party shall notice court revenue quarter liability clause section "
+    "invoice shipment warranty damages pursuant hereby tenant landlord schedule"
+).split()
+
+
+def _load_v1():
+    source = _V1_CHUNKING.read_text(encoding="utf-8").replace("\\\\", "\\")
+    module = types.ModuleType("v1_chunking")
+    exec(compile(source, str(_V1_CHUNKING), "exec"), module.__dict__)
+    return module.ChunkingService
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choices(_WORDS, k=rng.randint(6, 30))).capitalize() + "."
+
+
+def make_document(pages: int, layout: str, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences = [_sentence(rng) for _ in range(pages * 25)]
+    if layout == "wall":
+        return " ".join(sentences)
+    return "\n\n".join(sentences)  # one-line paragraphs
+
+
+def _report(label: str, seconds: float, chunks: list[str]) -> None:
+    sizes = [approx_token_count(c) for c in chunks] or [0]
+    print(
+        f"  {label:10s} {seconds * 1000:8.1f} ms  chunks {len(chunks):6d}  tokens "
+        f"min {min(sizes):4d} median {int(statistics.median(sizes)):4d} max {max(sizes):5d}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    args = parser.parse_args()
+
+    v1 = _load_v1()(chunk_size=args.chunk_size * 4, chunk_overlap=args.overlap * 4)
+    recursive = RecursiveTokenSplitter(args.chunk_size, args.overlap)
+    for layout in ("wall", "paragraphs"):
+        text = make_document(args.pages, layout)
+        print(f"{layout}: {len(text) / 1e6:.1f} MB")
+
+        started = time.perf_counter()
+        old = [c["content"] for c in asyncio.run(v1.chunk_text(text))]
+        _report("v1", time.perf_counter() - started, old)
+
+        started = time.perf_counter()
+        new = recursive.split(text)
+        _report("recursive", time.perf_counter() - started, new)
+
+
+if __name__ == "__main__":
+    main()
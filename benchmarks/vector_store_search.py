@@ -0,0 +1,82 @@
+"""Query latency of the matrix-backed `InMemoryVectorStore`.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/vector_store_search.py --sizes 10000 100000 1000000 --dim 384
+
+For each store size, random float32 vectors are loaded and ``--queries``
+searches are timed with ``top_k=10``.  The old implementation – a dict of
+vectors, norms recomputed per call and a full sort of every score – is timed
+alongside on up to ``--baseline-max`` vectors (it is too slow beyond that).
+The 1M × 384 matrix needs about 1.5 GiB of RAM; lower ``--dim`` on small
+machines.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+def dict_search(store: dict, query: np.ndarray, top_k: int):
+    # the pre-matrix InMemoryVectorStore.similarity_search
+    results = []
+    qn = np.linalg.norm(query)
+    for key, vec in store.items():
+        score = float(np.dot(vec, query) / (np.linalg.norm(vec) * qn))
+        results.append((key, score))
+    results.sort(key=lambda r: r[1], reverse=True)
+    return results[:top_k]
+
+
+async def _timed(fn, queries) -> tuple[float, float]:
+    latencies = []
+    for q in queries:
+        started = time.perf_counter()
+        result = fn(q)
+        if asyncio.iscoroutine(result):
+            await result
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+
+
+async def run(size: int, dim: int, n_queries: int, baseline_max: int, batch: int) -> None:
+    rng = np.random.default_rng(size)
+    store = InMemoryVectorStore(initial_capacity=size)
+    ids = [f"chunk-{i}" for i in range(size)]
+    started = time.perf_counter()
+    for start in range(0, size, batch):
+        vectors = rng.standard_normal((min(batch, size - start), dim), dtype=np.float32)
+        await store.add_vectors(vectors, [{}] * len(vectors), ids[start : start + len(vectors)])
+    load_s = time.perf_counter() - started
+
+    queries = rng.standard_normal((n_queries, dim), dtype=np.float32)
+    p50, p95 = await _timed(lambda q: store.similarity_search(q, top_k=10), queries)
+    print(f"{size:>9} matrix  load {load_s:7.2f} s   p50 {p50:9.2f} ms   p95 {p95:9.2f} ms")
+
+    if size <= baseline_max:
+        legacy = {eid: store._matrix[row].copy() for eid, row in store._rows.items()}
+        p50, p95 = await _timed(lambda q: dict_search(legacy, q, 10), queries[: max(n_queries // 10, 3)])
+        print(f"{size:>9} dict                    p50 {p50:9.2f} ms   p95 {p95:9.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--baseline-max", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=4096, help="vectors per add_vectors call")
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(run(size, args.dim, args.queries, args.baseline_max, args.batch))
+
+
+if __name__ == "__main__":
+    main()
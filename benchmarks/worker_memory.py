@@ -0,0 +1,100 @@
+"""Per-worker memory with and without preloading the embedder in the parent.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/worker_memory.py --workers 4
+    PYTHONPATH=src python benchmarks/worker_memory.py --workers 4 --synthetic-mb 130
+
+Forks ``--workers`` children twice, the way Celery prefork and gunicorn do:
+first with every child loading its own model ("private"), then with the
+model loaded in the parent before forking ("preload", what
+``EMBED_PRELOAD_PARENT=true`` does).  Each child embeds a sentence, waits
+for its siblings and reports RSS, PSS and private bytes from
+``/proc/self/smaps_rollup``.  ``--synthetic-mb`` replaces the model with a
+float32 buffer of that size so the report also runs where torch is missing.
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+
+import numpy as np
+
+from privategpt.infra.embedder.model_pool import EmbedderModelPool, process_memory
+
+_MiB = 2**20
+
+
+class _Workload:
+    def __init__(self, model: str, synthetic_mb: int):
+        self.model = model
+        self.synthetic_mb = synthetic_mb
+        self.pool = EmbedderModelPool(device="cpu")
+        self.buffer: np.ndarray | None = None
+
+    def load(self) -> None:
+        if self.synthetic_mb:
+            self.buffer = np.ones(self.synthetic_mb * _MiB // 4, dtype=np.float32)
+        else:
+            self.pool.get(self.model)
+
+    def preload(self) -> None:
+        if self.synthetic_mb:
+            self.load()
+        else:
+            self.pool.preload_for_fork([self.model])
+
+    def infer(self) -> None:
+        if self.buffer is None and self.synthetic_mb:
+            self.load()
+        if self.synthetic_mb:
+            float(self.buffer.sum())  # read every weight page, like a forward pass
+        else:
+            self.pool.get(self.model).encode(["how much memory does a worker use?"])
+
+
+def _child(work: _Workload, barrier, results) -> None:
+    work.infer()
+    barrier.wait()  # measure while all siblings are alive so PSS is split fairly
+    results.put(process_memory())
+    barrier.wait()
+
+
+def _run(work: _Workload, workers: int, preload: bool) -> list[dict]:
+    ctx = multiprocessing.get_context("fork")
+    if preload:
+        work.preload()
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_child, args=(work, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return reports
+
+
+def _print(label: str, reports: list[dict]) -> None:
+    print(f"{label}:")
+    for i, r in enumerate(reports):
+        print(
+            f"  worker {i}: rss {r['rss_bytes'] / _MiB:7.1f} MiB   pss {r['pss_bytes'] / _MiB:7.1f} MiB"
+            f"   private {r['private_bytes'] / _MiB:7.1f} MiB"
+        )
+    total = sum(r["pss_bytes"] for r in reports) / _MiB
+    print(f"  total pss {total:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="BAAI/bge-small-en-v1.5")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--synthetic-mb", type=int, default=0)
+    args = parser.parse_args()
+
+    _print("private (each worker loads the model)", _run(_Workload(args.model, args.synthetic_mb), args.workers, False))
+    _print("preload (parent loads, workers fork)", _run(_Workload(args.model, args.synthetic_mb), args.workers, True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Gunicorn settings for rag-service (uvicorn workers).
+
+``uvicorn --workers`` starts workers with *spawn*, so each one loads its own
+copy of the embedding model.  Gunicorn forks its workers instead: with
+``EMBED_PRELOAD_PARENT=true`` the master loads the models once and every
+worker shares those pages copy-on-write.
+"""
+import os
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("RAG_WORKERS", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+
+
+def on_starting(server):
+    from privategpt.shared.settings import settings
+
+    if not settings.embed_preload_parent:
+        return
+    from privategpt.infra.embedder.model_pool import get_model_pool
+    from privategpt.infra.tasks.service_factory import preload_model_names
+
+    get_model_pool().preload_for_fork(preload_model_names())
+
+
+def post_fork(server, worker):
+    # give every worker its share of the cores instead of all of them
+    from privategpt.infra.embedder.process_pool import apply_thread_limits
+
+    apply_thread_limits(max((os.cpu_count() or 1) // workers, 1))
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 from dataclasses import dataclass
-from typing import Sequence
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
 
 
 @dataclass(slots=True)
@@ -10,4 +14,10 @@ class Chunk:
     document_id: int
     position: int  # order within original doc
     text: str
-    embedding: Sequence[float] | None = None 
\ No newline at end of file
+    embedding: np.ndarray | None = None  # float32 row, see EmbedderPort
+    content_hash: str | None = None
+
+
+def content_hash(text: str) -> str:
+    """Stable digest of a chunk's text, used to find unchanged chunks on re-ingestion."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
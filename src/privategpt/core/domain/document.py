@@ -27,6 +27,7 @@ class Document:
     status: DocumentStatus = DocumentStatus.PENDING
     error: Optional[str] = None
     task_id: Optional[str] = None
+    batch_id: Optional[str] = None  # set for documents uploaded through /documents/batch
     processing_progress: Dict[str, Any] = field(default_factory=dict)
     doc_metadata: Dict[str, Any] = field(default_factory=dict)
     
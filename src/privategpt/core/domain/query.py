@@ -8,4 +8,8 @@ from typing import Optional, Dict, Any
 class SearchQuery:
     text: str
     filters: Optional[Dict[str, Any]] = None
-    top_k: int = 5 
\ No newline at end of file
+    top_k: int = 5
+    # "vector" or "hybrid" (BM25 + vector, fused by rank); alpha weighs the
+    # vector side of a hybrid search, None for the configured default
+    mode: str = "vector"
+    alpha: Optional[float] = None 
\ No newline at end of file
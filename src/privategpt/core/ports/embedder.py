@@ -1,9 +1,32 @@
 from __future__ import annotations
 
-from typing import Protocol, Sequence, List
+from typing import Callable, Protocol, List
+
+import numpy as np
+
+# Embeddings travel as contiguous float32 arrays: one row per text for batch
+# calls (shape ``(n, dim)``) and a 1-D ``(dim,)`` array for a single query.
+# Adapters convert to lists/JSON only at their own serialization boundary.
+EmbeddingMatrix = np.ndarray
+EmbeddingVector = np.ndarray
+
+# called with (texts embedded so far, total texts) while a batch is processed
+ProgressCallback = Callable[[int, int], None]
+
+
+def as_embedding_matrix(vectors) -> EmbeddingMatrix:
+    """Coerce *vectors* (list of lists, rows, matrix) into a C-contiguous float32 matrix."""
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1) if matrix.size else matrix.reshape(0, 0)
+    return matrix
 
 
 class EmbedderPort(Protocol):
-    async def embed_documents(self, texts: List[str]) -> List[Sequence[float]]: ...
+    async def embed_documents(
+        self, texts: List[str], on_progress: ProgressCallback | None = None
+    ) -> EmbeddingMatrix: ...
+
+    async def embed_query(self, text: str) -> EmbeddingVector: ...
 
-    async def embed_query(self, text: str) -> Sequence[float]: ... 
\ No newline at end of file
+    async def embed_queries(self, texts: List[str]) -> EmbeddingMatrix: ...
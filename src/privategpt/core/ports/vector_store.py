@@ -1,14 +1,93 @@
 from __future__ import annotations
 
-from typing import Protocol, Sequence, List, Tuple
+from typing import Any, Dict, List, Protocol, Sequence, Tuple
+
+from privategpt.core.ports.embedder import EmbeddingMatrix, EmbeddingVector
+
+# Chunk metadata that adapters index and can filter on before scoring, with
+# the type each value is stored as.
+FILTER_FIELDS: Dict[str, type] = {
+    "document_id": int,
+    "collection_id": str,
+    "user_id": int,
+    "position": int,
+}
+
+
+def normalize_filters(filters: Dict[str, Any] | None) -> Dict[str, List[Any]]:
+    """Map search filters to ``{field: allowed values}``.
+
+    Accepts a single value (``document_id=3``) or a list under the field name
+    or its plural (``collection_ids=[...]``, as built by ``/rag/search``).
+    Values are coerced to the field's type; unknown keys raise ``ValueError``.
+    An empty list yields an empty allowed set, i.e. nothing matches.
+    """
+    normalized: Dict[str, List[Any]] = {}
+    for key, value in (filters or {}).items():
+        field = key[:-1] if key.endswith("s") and key[:-1] in FILTER_FIELDS else key
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"unsupported search filter: {key!r}")
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+        cast = FILTER_FIELDS[field]
+        allowed = normalized.setdefault(field, [])
+        allowed.extend(v for v in (cast(v) for v in values) if v not in allowed)
+    return normalized
+
+
+def per_query_filters(filters: Dict[str, Any] | Sequence[Dict[str, Any] | None] | None, count: int) -> List[Dict[str, Any] | None]:
+    """Expand the *filters* of a batch search to one entry per query.
+
+    A single dict (or ``None``) applies to every query; a sequence must hold
+    exactly *count* entries.
+    """
+    if filters is None or isinstance(filters, dict):
+        return [filters] * count
+    filters = list(filters)
+    if len(filters) != count:
+        raise ValueError(f"{len(filters)} filters for {count} queries")
+    return filters
 
 
 class VectorStorePort(Protocol):
-    async def add_vectors(self, embeddings: List[Sequence[float]], metadatas: List[dict], ids: List[str]) -> None: ...
+    async def add_vectors(self, embeddings: EmbeddingMatrix, metadatas: List[dict], ids: List[str]) -> None: ...
 
     async def similarity_search(
         self,
-        embedding: Sequence[float],
+        embedding: EmbeddingVector,
         top_k: int = 5,
         filters: dict | None = None,
-    ) -> List[Tuple[str, float]]: ...  # returns (id, score) 
\ No newline at end of file
+    ) -> List[Tuple[str, float]]: ...  # returns (id, score)
+
+    async def similarity_search_many(
+        self,
+        embeddings: EmbeddingMatrix,
+        top_k: int = 5,
+        filters: dict | Sequence[dict | None] | None = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """One result list per row of *embeddings*; see `per_query_filters`.
+
+        Adapters that can score a batch at once override this; the default
+        runs the queries one after another.
+        """
+        per_query = per_query_filters(filters, len(embeddings))
+        return [
+            await self.similarity_search(embedding, top_k=top_k, filters=query_filters)
+            for embedding, query_filters in zip(embeddings, per_query)
+        ]
+
+    async def hybrid_search(
+        self,
+        text: str,
+        embedding: EmbeddingVector,
+        top_k: int = 5,
+        filters: dict | None = None,
+        alpha: float = 0.5,
+    ) -> List[Tuple[str, float]]:
+        """Lexical (BM25) and vector results for *text* fused by rank.
+
+        *alpha* weighs the vector ranking: 1 is pure vector search, 0 pure
+        lexical.  Adapters without a lexical index fall back to vector search.
+        """
+        return await self.similarity_search(embedding, top_k=top_k, filters=filters)
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Tuple
 import json
 
+import numpy as np
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select
 
-from privategpt.core.domain.chunk import Chunk
+from privategpt.core.domain.chunk import Chunk, content_hash
 from privategpt.core.ports.chunk_repository import ChunkRepositoryPort
 from privategpt.infra.database import models
+from privategpt.shared.settings import settings  # type: ignore[attr-defined]
+
+
+def _load_embedding(raw: str | None) -> np.ndarray | None:
+    return np.asarray(json.loads(raw), dtype=np.float32) if raw else None
 
 
 class SqlChunkRepository(ChunkRepositoryPort):
@@ -16,16 +23,22 @@ class SqlChunkRepository(ChunkRepositoryPort):
         self.session = session
 
     async def add_many(self, chunks: List[Chunk]) -> None:
-        objs = [
-            models.Chunk(
-                document_id=c.document_id,
-                position=c.position,
-                text=c.text,
-                embedding=json.dumps(c.embedding) if c.embedding else None,
-            )
+        if not chunks:
+            return
+        rows = [
+            {
+                "document_id": c.document_id,
+                "position": c.position,
+                "text": c.text,
+                "embedding": json.dumps(np.asarray(c.embedding).tolist()) if c.embedding is not None else None,
+                "content_hash": c.content_hash or content_hash(c.text),
+            }
             for c in chunks
         ]
-        self.session.add_all(objs)
+        # Core executemany in batches instead of one tracked ORM object per chunk
+        batch = max(settings.chunk_insert_batch_rows, 1)
+        for start in range(0, len(rows), batch):
+            await self.session.execute(insert(models.Chunk), rows[start : start + batch])
         await self.session.commit()
 
     async def list_by_document(self, document_id: int) -> List[Chunk]:
@@ -36,7 +49,8 @@ class SqlChunkRepository(ChunkRepositoryPort):
                 document_id=row.document_id,
                 position=row.position,
                 text=row.text,
-                embedding=json.loads(row.embedding) if row.embedding else None,
+                embedding=_load_embedding(row.embedding),
+                content_hash=row.content_hash,
             )
             for row in result.scalars()
         ]
@@ -51,7 +65,8 @@ class SqlChunkRepository(ChunkRepositoryPort):
                 document_id=row.document_id,
                 position=row.position,
                 text=row.text,
-                embedding=json.loads(row.embedding) if row.embedding else None,
+                embedding=_load_embedding(row.embedding),
+                content_hash=row.content_hash,
             )
             for row in result.scalars()
         ]
@@ -78,7 +93,8 @@ class SqlChunkRepository(ChunkRepositoryPort):
                 document_id=row.document_id,
                 position=row.position,
                 text=row.text,
-                embedding=json.loads(row.embedding) if row.embedding else None,
+                embedding=_load_embedding(row.embedding),
+                content_hash=row.content_hash,
             )
             for row in result.scalars()
         ] 
\ No newline at end of file
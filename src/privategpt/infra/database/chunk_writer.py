@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+"""Bulk writes of chunk rows, bypassing the ORM unit of work.
+
+Adding ``models.Chunk`` objects one by one makes SQLAlchemy build, track and
+flush an identity-mapped object per chunk, which dominates the cost of
+storing a large document.  `write_chunk_rows` writes plain row dicts instead:
+
+* on PostgreSQL with psycopg2 the rows are streamed through ``COPY … FROM
+  STDIN`` on the connection's own DBAPI cursor, so they stay in the caller's
+  transaction;
+* elsewhere (SQLite, or with ``CHUNK_INSERT_COPY=false``) a Core ``insert()``
+  is executed with ``CHUNK_INSERT_BATCH_ROWS`` rows per ``executemany``.
+
+See ``benchmarks/chunk_insert.py`` for inserts/sec of each path.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import Table, insert
+from sqlalchemy.engine import Connection
+
+from privategpt.core.domain.chunk import content_hash
+from privategpt.infra.database.models import Chunk
+from privategpt.shared.settings import settings  # type: ignore[attr-defined]
+
+_COLUMNS = ("document_id", "collection_id", "position", "text", "embedding", "content_hash")
+
+
+def chunk_rows(
+    document_id: int,
+    collection_id: str | None,
+    position: int,
+    texts: Sequence[str],
+    embeddings: np.ndarray | None = None,
+) -> List[Dict[str, Any]]:
+    """Row dicts for consecutive chunks starting at *position*, embeddings JSON-encoded and text hashed."""
+    vectors = [None] * len(texts) if embeddings is None else [json.dumps(v) for v in np.asarray(embeddings).tolist()]
+    return [
+        {
+            "document_id": document_id,
+            "collection_id": collection_id,
+            "position": position + i,
+            "text": text,
+            "embedding": vector,
+            "content_hash": content_hash(text),
+        }
+        for i, (text, vector) in enumerate(zip(texts, vectors))
+    ]
+
+
+def write_chunk_rows(
+    connection: Connection,
+    rows: Sequence[Dict[str, Any]],
+    batch_rows: int | None = None,
+    use_copy: bool | None = None,
+    table: Table | None = None,
+) -> int:
+    """Insert *rows* into the chunks *table* within *connection*'s transaction; returns the row count."""
+    if not rows:
+        return 0
+    table = table if table is not None else Chunk.__table__
+    use_copy = settings.chunk_insert_copy if use_copy is None else use_copy
+    if use_copy and connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2":
+        _copy_rows(connection, table, rows)
+    else:
+        batch = max(batch_rows or settings.chunk_insert_batch_rows, 1)
+        statement = insert(table)
+        for start in range(0, len(rows), batch):
+            connection.execute(statement, list(rows[start : start + batch]))
+    return len(rows)
+
+
+def _copy_rows(connection: Connection, table: Table, rows: Sequence[Dict[str, Any]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # None is written as an unquoted empty field, which CSV COPY reads as NULL
+        writer.writerow([row.get(column) for column in _COLUMNS])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(_COLUMNS)}) FROM STDIN "
+            "WITH (FORMAT csv, FORCE_NOT_NULL (text))",  # an empty chunk text is '' not NULL
+            buffer,
+        )
+    finally:
+        cursor.close()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Iterable
+from typing import Iterable, List
 
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -34,43 +34,47 @@ class SqlDocumentRepository(DocumentRepositoryPort):
         result = await self.session.execute(select(models.Document).where(models.Document.id == doc_id))
         row = result.scalar_one_or_none()
         if row:
-            return Document(
-                id=row.id,
-                collection_id=row.collection_id,
-                user_id=row.user_id,
-                title=row.title,
-                file_path=row.file_path,
-                file_name=row.file_name,
-                file_size=row.file_size,
-                mime_type=row.mime_type,
-                uploaded_at=row.uploaded_at,
-                status=DocumentStatus(row.status),
-                error=row.error,
-                task_id=row.task_id,
-                processing_progress=row.processing_progress or {},
-                doc_metadata=row.doc_metadata or {}
-            )
+            return _to_domain(row)
         return None
 
     async def list(self) -> Iterable[Document]:
         result = await self.session.execute(select(models.Document))
         for row in result.scalars():
-            yield Document(
-                id=row.id,
-                collection_id=row.collection_id,
-                user_id=row.user_id,
-                title=row.title,
-                file_path=row.file_path,
-                file_name=row.file_name,
-                file_size=row.file_size,
-                mime_type=row.mime_type,
-                uploaded_at=row.uploaded_at,
-                status=DocumentStatus(row.status),
-                error=row.error,
-                task_id=row.task_id,
-                processing_progress=row.processing_progress or {},
-                doc_metadata=row.doc_metadata or {}
+            yield _to_domain(row)
+
+    async def add_many(self, docs: List[Document]) -> List[Document]:
+        """Insert *docs* in one transaction and set their ids."""
+        rows = [
+            models.Document(
+                collection_id=doc.collection_id,
+                user_id=doc.user_id,
+                title=doc.title,
+                file_path=doc.file_path,
+                file_size=doc.file_size,
+                uploaded_at=doc.uploaded_at,
+                status=doc.status.value,
+                error=doc.error,
+                task_id=doc.task_id,
+                batch_id=doc.batch_id,
+                doc_metadata=doc.doc_metadata,
             )
+            for doc in docs
+        ]
+        self.session.add_all(rows)
+        await self.session.flush()
+        for doc, row in zip(docs, rows):
+            doc.id = row.id
+        await self.session.commit()
+        return docs
+
+    async def list_by_batch(self, batch_id: str) -> List[Document]:
+        """Documents created by one ``/rag/documents/batch`` call, in upload order."""
+        result = await self.session.execute(
+            select(models.Document)
+            .where(models.Document.batch_id == batch_id)
+            .order_by(models.Document.id)
+        )
+        return [_to_domain(row) for row in result.scalars()]
 
     async def update(self, doc: Document) -> None:
         await self.session.execute(
@@ -84,4 +88,24 @@ class SqlDocumentRepository(DocumentRepositoryPort):
                 doc_metadata=doc.doc_metadata
             )
         )
-        await self.session.commit() 
\ No newline at end of file
+        await self.session.commit()
+
+
+def _to_domain(row: models.Document) -> Document:
+    return Document(
+        id=row.id,
+        collection_id=row.collection_id,
+        user_id=row.user_id,
+        title=row.title,
+        file_path=row.file_path,
+        file_name=row.file_name,
+        file_size=row.file_size,
+        mime_type=row.mime_type,
+        uploaded_at=row.uploaded_at,
+        status=DocumentStatus(row.status),
+        error=row.error,
+        task_id=row.task_id,
+        batch_id=row.batch_id,
+        processing_progress=row.processing_progress or {},
+        doc_metadata=row.doc_metadata or {}
+    )
@@ -74,6 +74,7 @@ class Document(Base):
     status = Column(String(50), nullable=False, default="pending")
     error = Column(String(1024), nullable=True)
     task_id = Column(String(255), nullable=True, index=True)
+    batch_id = Column(String(36), nullable=True, index=True)
     processing_progress = Column(JSON, nullable=True, default=dict)
     doc_metadata = Column(JSON, nullable=True, default=dict)
     
@@ -92,6 +93,7 @@ class Chunk(Base):
     text = Column(String, nullable=False)
     # store embedding as JSON string for simplicity; real impl may use vector type
     embedding = Column(String, nullable=True)
+    content_hash = Column(String(32), nullable=True)  # see core.domain.chunk.content_hash
     
     # Relationships
     collection = relationship("Collection", backref="chunks")
@@ -15,7 +15,10 @@ DATABASE_URL: str = settings.database_url
 # Ensure we're using the sync driver
 if DATABASE_URL.startswith("postgresql+asyncpg://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+elif DATABASE_URL.startswith("sqlite+aiosqlite://"):
+    DATABASE_URL = DATABASE_URL.replace("sqlite+aiosqlite://", "sqlite://", 1)
 
+# One engine (and connection pool) per process, shared by every Celery task
 sync_engine = create_engine(
     DATABASE_URL,
     echo=False,
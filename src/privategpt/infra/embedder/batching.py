@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+"""Batching helpers for the embedders.
+
+* `plan_token_batches` groups document chunks of similar token length so a
+  batch is padded as little as possible and sized by a token budget.
+* `MicroBatchingEmbedder` coalesces concurrent ``embed_query`` calls
+  (``/rag/search``, MCP tools, …) for at most ``max_wait_ms`` or ``max_batch``
+  items and encodes them in a single forward pass.  Each caller still receives
+  exactly its own vector.
+"""
+
+import asyncio
+import bisect
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+from privategpt.core.ports.embedder import EmbedderPort, EmbeddingMatrix, EmbeddingVector, ProgressCallback
+from privategpt.shared.logging import get_logger
+
+logger = get_logger("embedder.batching")
+
+
+@dataclass(slots=True)
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style: ``le`` upper bounds)."""
+
+    bounds: Tuple[float, ...]
+    counts: List[int] = field(default_factory=list)
+    total: float = 0.0
+    samples: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.samples += 1
+
+    def to_dict(self) -> Dict[str, object]:
+        labels = [str(b) for b in self.bounds] + ["+Inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.samples,
+            "mean": round(self.total / self.samples, 3) if self.samples else 0.0,
+        }
+
+
+def plan_token_batches(lengths: Sequence[int], token_budget: int, max_batch: int) -> List[List[int]]:
+    """Group indices of *lengths* into length-sorted batches.
+
+    Texts are visited longest first and a batch is closed once its padded
+    size (``items × longest item``) would exceed *token_budget* or it holds
+    *max_batch* items.  A single text longer than the budget still gets a
+    batch of its own.  Returned indices refer to the original order.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    longest = 0
+    for idx in order:
+        length = max(int(lengths[idx]), 1)
+        padded_longest = max(longest, length)
+        if current and (len(current) >= max_batch or padded_longest * (len(current) + 1) > token_budget):
+            batches.append(current)
+            current, padded_longest = [], length
+        current.append(idx)
+        longest = padded_longest
+    if current:
+        batches.append(current)
+    return batches
+
+
+_SIZE_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class _LoopState:
+    __slots__ = ("loop", "pending", "timer")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.pending: List[Tuple[str, asyncio.Future]] = []
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class MicroBatchingEmbedder(EmbedderPort):
+    """Decorator that coalesces concurrent `embed_query` calls into batches.
+
+    Document embedding is passed straight through – ingestion already sends
+    large batches.
+    """
+
+    def __init__(self, inner: EmbedderPort, max_wait_ms: float = 5.0, max_batch: int = 32):
+        self.inner = inner
+        self.max_wait = max(max_wait_ms, 0.0) / 1000
+        self.max_batch = max(max_batch, 1)
+        self._state: _LoopState | None = None
+        self.queue_depth = Histogram(_SIZE_BOUNDS)
+        self.batch_size = Histogram(_SIZE_BOUNDS)
+
+    async def embed_documents(
+        self, texts: List[str], on_progress: ProgressCallback | None = None
+    ) -> EmbeddingMatrix:
+        return await self.inner.embed_documents(texts, on_progress=on_progress)
+
+    async def embed_queries(self, texts: List[str]) -> EmbeddingMatrix:
+        return await self.inner.embed_queries(texts)
+
+    async def embed_query(self, text: str) -> EmbeddingVector:
+        loop = asyncio.get_running_loop()
+        state = self._state
+        # Celery tasks use asyncio.run(), so pending work is tied to one loop
+        if state is None or state.loop is not loop:
+            state = self._state = _LoopState(loop)
+
+        future: asyncio.Future = loop.create_future()
+        state.pending.append((text, future))
+        self.queue_depth.observe(len(state.pending))
+
+        if len(state.pending) >= self.max_batch:
+            self._flush(state)
+        elif state.timer is None:
+            state.timer = loop.call_later(self.max_wait, self._flush, state)
+        return await future
+
+    def _flush(self, state: _LoopState) -> None:
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        while state.pending:
+            batch = state.pending[: self.max_batch]
+            del state.pending[: self.max_batch]
+            state.loop.create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.batch_size.observe(len(batch))
+        try:
+            vectors = await self.inner.embed_queries([text for text, _ in batch])
+        except Exception as exc:  # noqa: BLE001 – hand the error to every caller
+            logger.error("query.embed.batch_failed", batch=len(batch), error=str(exc))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        report: Dict[str, Dict[str, object]] = {
+            "query_batching": {
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch": self.max_batch,
+                "queue_depth": self.queue_depth.to_dict(),
+                "batch_size": self.batch_size.to_dict(),
+            }
+        }
+        inner_stats = getattr(self.inner, "stats", None)
+        if callable(inner_stats):
+            report.update(inner_stats())
+        return report
@@ -2,50 +2,113 @@ from __future__ import annotations
 
 import os
 import asyncio
-from typing import Sequence, List
+from typing import List
 import logging
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 import torch
 
-from privategpt.core.ports.embedder import EmbedderPort
+from privategpt.core.ports.embedder import EmbedderPort, EmbeddingMatrix, EmbeddingVector, ProgressCallback
+from privategpt.infra.embedder.batching import plan_token_batches
+from privategpt.infra.embedder.model_pool import EmbedderModelPool, get_model_pool
 
 logger = logging.getLogger(__name__)
 
 
 class BgeEmbedderAdapter(EmbedderPort):
-    """Sentence-Transformers BGE embedder with async wrappers."""
-
-    def __init__(self, model_name: str | None = None):
+    """Sentence-Transformers BGE embedder with async wrappers.
+
+    The model itself lives in the process-wide `EmbedderModelPool`, so creating
+    adapters is cheap and never reloads weights from disk.
+    """
+
+    def __init__(
+        self,
+        model_name: str | None = None,
+        pool: EmbedderModelPool | None = None,
+        token_budget: int = 16_384,
+        max_batch: int = 128,
+    ):
         self.model_name = model_name or os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5")
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.token_budget = token_budget
+        self.max_batch = max_batch
+        self._pool = pool or get_model_pool()
         self._model: SentenceTransformer | None = None
 
+    @property
+    def device(self) -> str:
+        return self._pool.device
+
     async def _ensure_model(self) -> SentenceTransformer:
         if self._model is not None:
             return self._model
 
-        def _load() -> SentenceTransformer:
-            logger.info(f"Loading embedder {self.model_name} on {self.device}")
-            return SentenceTransformer(self.model_name, device=self.device)
-
-        self._model = await asyncio.to_thread(_load)
+        if self._pool.is_loaded(self.model_name):
+            self._model = self._pool.get(self.model_name)
+        else:
+            self._model = await asyncio.to_thread(self._pool.get, self.model_name)
         return self._model
 
-    async def embed_documents(self, texts: List[str]) -> List[Sequence[float]]:
+    def _token_lengths(self, model: SentenceTransformer, texts: List[str]) -> List[int]:
+        tokenizer = getattr(model, "tokenizer", None)
+        if tokenizer is None:
+            # rough word-piece estimate when the model exposes no tokenizer
+            return [int(len(t.split()) * 1.3) + 2 for t in texts]
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=model.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    async def embed_documents(
+        self, texts: List[str], on_progress: ProgressCallback | None = None
+    ) -> EmbeddingMatrix:
+        """Embed *texts* in length-sorted batches sized by a token budget.
+
+        Similar-length chunks share a batch so little compute is wasted on
+        padding; rows of the returned float32 matrix follow the input order.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
         model = await self._ensure_model()
-
-        def _encode(batch: List[str]):
-            with torch.no_grad():
-                return model.encode(batch, convert_to_numpy=True, normalize_embeddings=True).tolist()
-
-        return await asyncio.to_thread(_encode, texts)
-
-    async def embed_query(self, text: str) -> Sequence[float]:
+        lengths = await asyncio.to_thread(self._token_lengths, model, texts)
+        batches = plan_token_batches(lengths, self.token_budget, self.max_batch)
+
+        results: np.ndarray | None = None
+        done = 0
+        for indices in batches:
+            vectors = await asyncio.to_thread(self._encode, model, [texts[i] for i in indices])
+            if results is None:
+                results = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            results[indices] = vectors
+            done += len(indices)
+            if on_progress is not None:
+                on_progress(done, len(texts))
+
+        logger.debug(
+            f"Embedded {len(texts)} texts in {len(batches)} batches "
+            f"(budget={self.token_budget} tokens, max_batch={self.max_batch})"
+        )
+        return results
+
+    @staticmethod
+    def _encode(model: SentenceTransformer, batch: List[str]) -> EmbeddingMatrix:
+        with torch.no_grad():
+            vectors = model.encode(
+                batch, batch_size=len(batch), convert_to_numpy=True, normalize_embeddings=True
+            )
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def embed_query(self, text: str) -> EmbeddingVector:
+        return (await self.embed_queries([text]))[0]
+
+    async def embed_queries(self, texts: List[str]) -> EmbeddingMatrix:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
         model = await self._ensure_model()
-
-        def _encode_one(txt: str):
-            with torch.no_grad():
-                return model.encode(txt, convert_to_numpy=True, normalize_embeddings=True).tolist()
-
-        return await asyncio.to_thread(_encode_one, text) 
\ No newline at end of file
+        return await asyncio.to_thread(self._encode, model, texts)
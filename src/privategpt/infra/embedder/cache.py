@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+"""Content-addressed embedding cache that sits in front of any `EmbedderPort`.
+
+Two tiers are used:
+
+* an in-process LRU for hot *query* vectors (cheap, lost on restart)
+* a persistent SQLite store of float32 blobs for *document chunk* vectors so
+  re-uploads and re-indexing of unchanged text never hit the model again
+
+Entries are keyed by ``(model name, sha256(normalized text))`` so switching the
+embedding model can never return stale vectors.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from privategpt.core.ports.embedder import (
+    EmbedderPort,
+    EmbeddingMatrix,
+    EmbeddingVector,
+    ProgressCallback,
+    as_embedding_matrix,
+)
+from privategpt.shared.logging import get_logger
+
+logger = get_logger("embedder.cache")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (NFC + collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        data = asdict(self)
+        data["hit_ratio"] = round(self.hit_ratio, 4)
+        return data
+
+
+class LruVectorCache:
+    """Thread-safe, size-bounded in-memory LRU of float32 vectors."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is None:
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return vec
+
+    def put(self, key: str, vector: Sequence[float]) -> None:
+        if self.max_entries <= 0:
+            return
+        # hits are handed out without copying, so the stored row is frozen
+        arr = np.array(vector, dtype=np.float32)
+        arr.setflags(write=False)
+        with self._lock:
+            self._data[key] = arr
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+
+class SqliteVectorCache:
+    """Persistent vector store: one float32 blob per key in a SQLite file.
+
+    Eviction is least-recently-used and bounded by ``max_entries``.  Access
+    times are only refreshed on hits, which keeps the write volume proportional
+    to the number of reused vectors.  The row count is kept as a running total
+    rather than counted per write; it is re-read every ``_RECOUNT_EVERY``
+    writes to pick up rows other processes added to a shared file.
+    """
+
+    _RECOUNT_EVERY = 256
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS embeddings ("
+        " key TEXT PRIMARY KEY,"
+        " dim INTEGER NOT NULL,"
+        " vector BLOB NOT NULL,"
+        " accessed_at REAL NOT NULL)"
+    )
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self._SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed_at)")
+        self._count: int | None = None  # rows in the table, loaded on first write
+        self._writes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite caps bound parameters, so look keys up in slices
+            for i in range(0, len(unique), 500):
+                part = unique[i : i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                # one transaction, not one autocommit per hit
+                now = time.time()
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                        [(now, k) for k in found],
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            hits = sum(1 for k in keys if k in found)
+            self.stats.hits += hits
+            self.stats.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items: Dict[str, Sequence[float]]) -> None:
+        if not items or self.max_entries <= 0:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            arr = np.ascontiguousarray(vector, dtype=np.float32)
+            rows.append((key, arr.shape[-1], arr.tobytes(), now))
+        with self._lock:
+            if self._count is None or self._writes % self._RECOUNT_EVERY == 0:
+                self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._writes += 1
+            count = self._count
+            self._conn.execute("BEGIN")
+            try:
+                count += len(rows) - self._existing_locked([row[0] for row in rows])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings(key, dim, vector, accessed_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                evicted = self._evict_locked(count)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._count = None
+                raise
+            self._count = count - evicted
+            self.stats.evictions += evicted
+
+    def _existing_locked(self, keys: List[str]) -> int:
+        existing = 0
+        for i in range(0, len(keys), 500):
+            part = keys[i : i + 500]
+            marks = ",".join("?" * len(part))
+            existing += self._conn.execute(
+                f"SELECT COUNT(*) FROM embeddings WHERE key IN ({marks})", part
+            ).fetchone()[0]
+        return existing
+
+    def _evict_locked(self, count: int) -> int:
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return 0
+        return self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM embeddings ORDER BY accessed_at ASC LIMIT ?)",
+            (overflow,),
+        ).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedderAdapter(EmbedderPort):
+    """Decorator adding the two-tier cache to another `EmbedderPort`.
+
+    Query vectors go through the LRU, document chunk vectors through the
+    persistent store.  Misses are forwarded to the wrapped embedder in a single
+    call so batching behaviour of the inner adapter is preserved.
+    """
+
+    def __init__(
+        self,
+        inner: EmbedderPort,
+        model_name: str,
+        store: SqliteVectorCache | None = None,
+        query_cache: LruVectorCache | None = None,
+    ):
+        self.inner = inner
+        self.model_name = model_name
+        self.store = store
+        self.query_cache = query_cache if query_cache is not None else LruVectorCache()
+
+    async def embed_documents(
+        self, texts: List[str], on_progress: ProgressCallback | None = None
+    ) -> EmbeddingMatrix:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.store is None:
+            return await self.inner.embed_documents(texts, on_progress=on_progress)
+
+        keys = [cache_key(self.model_name, t) for t in texts]
+        cached = await asyncio.to_thread(self.store.get_many, keys)
+
+        # embed every distinct missing text exactly once
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        total = len(texts)
+        reused = total - sum(1 for k in keys if k in missing)
+        if on_progress is not None and reused:
+            on_progress(reused, total)
+
+        if missing:
+            # duplicate texts finish together with their first copy, so scale
+            # the inner count to the number of outstanding positions
+            outstanding = total - reused
+
+            def _inner_progress(done: int, inner_total: int) -> None:
+                if on_progress is not None:
+                    on_progress(reused + done * outstanding // inner_total, total)
+
+            fresh = await self.inner.embed_documents(list(missing.values()), on_progress=_inner_progress)
+            computed = dict(zip(missing.keys(), as_embedding_matrix(fresh)))
+            await asyncio.to_thread(self.store.put_many, computed)
+            cached.update(computed)
+
+        logger.info(
+            "chunk.embed.cache",
+            model=self.model_name,
+            batch=len(texts),
+            reused=len(texts) - len(missing),
+            embedded=len(missing),
+        )
+        return np.stack([cached[k] for k in keys])
+
+    async def embed_query(self, text: str) -> EmbeddingVector:
+        key = cache_key(self.model_name, text)
+        hit = self.query_cache.get(key)
+        if hit is not None:
+            return hit
+        vector = np.asarray(await self.inner.embed_query(text), dtype=np.float32)
+        self.query_cache.put(key, vector)
+        return vector
+
+    async def embed_queries(self, texts: List[str]) -> EmbeddingMatrix:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        keys = [cache_key(self.model_name, t) for t in texts]
+        vectors: Dict[str, EmbeddingVector] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing:
+                continue
+            hit = self.query_cache.get(key)
+            if hit is not None:
+                vectors[key] = hit
+            else:
+                missing[key] = text
+
+        if missing:
+            fresh = await self.inner.embed_queries(list(missing.values()))
+            for key, vector in zip(missing.keys(), as_embedding_matrix(fresh)):
+                self.query_cache.put(key, vector)
+                vectors[key] = vector
+        return np.stack([vectors[k] for k in keys])
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        report = {"query_lru": self.query_cache.stats.to_dict()}
+        if self.store is not None:
+            report["document_store"] = self.store.stats.to_dict()
+        inner_stats = getattr(self.inner, "stats", None)
+        if callable(inner_stats):
+            report.update(inner_stats())
+        return report
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Sequence, List
+from typing import List
 
-from privategpt.core.ports.embedder import EmbedderPort
+import numpy as np
+
+from privategpt.core.ports.embedder import EmbedderPort, EmbeddingMatrix, EmbeddingVector, ProgressCallback
 from privategpt.shared.logging import get_logger
 
 logger = get_logger("embedder.fake")
@@ -12,15 +14,30 @@ logger = get_logger("embedder.fake")
 class FakeEmbedderAdapter(EmbedderPort):
     """Deterministic but trivial embedding: hash text into fixed-length vector."""
 
-    def _hash(self, text: str) -> Sequence[float]:
+    def _hash(self, text: str) -> EmbeddingVector:
         h = hashlib.sha256(text.encode()).digest()
         # produce 32 floats between 0 and 1
-        return [b / 255 for b in h]
+        return np.frombuffer(h, dtype=np.uint8).astype(np.float32) / 255
+
+    def _hash_many(self, texts: List[str]) -> EmbeddingMatrix:
+        matrix = np.empty((len(texts), 32), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self._hash(text)
+        return matrix
 
-    async def embed_documents(self, texts: List[str]) -> List[Sequence[float]]:
+    async def embed_documents(
+        self, texts: List[str], on_progress: ProgressCallback | None = None
+    ) -> EmbeddingMatrix:
         logger.info("chunk.embed", adapter="fake", batch=len(texts))
-        return [self._hash(t) for t in texts]
+        vectors = self._hash_many(texts)
+        if on_progress is not None:
+            on_progress(len(texts), len(texts))
+        return vectors
 
-    async def embed_query(self, text: str) -> Sequence[float]:
+    async def embed_query(self, text: str) -> EmbeddingVector:
         logger.info("query.embed", adapter="fake")
-        return self._hash(text) 
\ No newline at end of file
+        return self._hash(text)
+
+    async def embed_queries(self, texts: List[str]) -> EmbeddingMatrix:
+        logger.info("query.embed", adapter="fake", batch=len(texts))
+        return self._hash_many(texts)
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+"""Process-wide pool of loaded embedding models.
+
+Loading a model from disk takes seconds and hundreds of MB, so every adapter
+in a process shares the instances held here.  Models are keyed by name, which
+lets collections with different ``CollectionSettings.embedding_model`` values
+coexist in one worker.
+
+A name may carry a backend prefix – ``onnx:<model>`` or ``onnx-int8:<model>``
+– in which case an ONNX Runtime session is pooled instead of a torch model.
+
+With ``EMBED_PRELOAD_PARENT`` the Celery and gunicorn master processes fill the
+pool before forking, so children inherit the weights copy-on-write instead of
+loading a private copy each (see `EmbedderModelPool.preload_for_fork`).
+"""
+
+import gc
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
+
+from privategpt.shared.logging import get_logger
+
+if TYPE_CHECKING:  # pragma: no cover – heavy import only for type checkers
+    from sentence_transformers import SentenceTransformer
+
+logger = get_logger("embedder.pool")
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def parse_model_spec(spec: str) -> Tuple[str, str]:
+    """Split ``"onnx-int8:BAAI/bge-small-en-v1.5"`` into (backend, model name)."""
+    backend, sep, name = spec.partition(":")
+    if sep and backend in BACKENDS:
+        return backend, name
+    return "torch", spec
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (0 if it cannot be determined)."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as fp:
+            resident_pages = int(fp.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+
+            # ru_maxrss is a peak value in KiB on Linux – good enough as a fallback
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except Exception:  # noqa: BLE001 – platform without resource module
+            return 0
+
+
+_SMAPS_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_bytes",
+    "Shared_Dirty": "shared_bytes",
+    "Private_Clean": "private_bytes",
+    "Private_Dirty": "private_bytes",
+    "Anonymous": "anonymous_bytes",
+}
+
+
+def process_memory() -> Dict[str, int]:
+    """RSS split into shared and private pages, plus PSS.
+
+    RSS counts copy-on-write pages shared with the parent in every child, so
+    ``pss_bytes`` (shared pages divided by the number of sharers) and
+    ``private_bytes`` are the numbers that show what a worker really costs.
+    ``anonymous_bytes`` excludes file-backed pages (memory-mapped indexes),
+    which the kernel can drop and re-read.  Only ``rss_bytes`` is available
+    where ``/proc/self/smaps_rollup`` is not.
+    """
+    report = {"rss_bytes": 0, "pss_bytes": 0, "shared_bytes": 0, "private_bytes": 0, "anonymous_bytes": 0}
+    try:
+        with open("/proc/self/smaps_rollup", "r", encoding="ascii") as fp:
+            for line in fp:
+                field, _, rest = line.partition(":")
+                key = _SMAPS_FIELDS.get(field)
+                if key is not None:
+                    report[key] += int(rest.split()[0]) * 1024  # values are in kB
+    except (OSError, ValueError, IndexError):
+        report["rss_bytes"] = current_rss_bytes()
+    return report
+
+
+@dataclass(slots=True)
+class LoadedModelInfo:
+    model_name: str
+    device: str
+    load_seconds: float
+    parameter_bytes: int
+    rss_delta_bytes: int
+    loaded_by_pid: int = 0
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+class EmbedderModelPool:
+    """Thread-safe registry that loads each model at most once per process."""
+
+    def __init__(self, device: str | None = None):
+        self._device = device
+        self._models: Dict[str, "SentenceTransformer"] = {}
+        self._info: Dict[str, LoadedModelInfo] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self._expected: set[str] = set()
+        self._errors: Dict[str, str] = {}
+
+    @property
+    def device(self) -> str:
+        if self._device is None:
+            import torch
+
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+
+    def _lock_for(self, model_name: str) -> threading.Lock:
+        with self._registry_lock:
+            return self._locks.setdefault(model_name, threading.Lock())
+
+    def get(self, model_name: str) -> "SentenceTransformer":
+        """Return the loaded model, loading it on first use."""
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock_for(model_name):
+            model = self._models.get(model_name)
+            if model is not None:
+                return model
+            return self._load(model_name)
+
+    def _construct(self, model_name: str) -> Tuple[Any, str, int]:
+        """Build the model for *model_name*; returns (model, device, weight bytes)."""
+        backend, name = parse_model_spec(model_name)
+        if backend != "torch":
+            from privategpt.infra.embedder.onnx_adapter import load_onnx_model
+
+            onnx_model = load_onnx_model(name, quantized=backend == "onnx-int8")
+            return onnx_model, "cpu", onnx_model.parameter_bytes
+
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(name, device=self.device)
+        model.eval()
+        return model, self.device, sum(p.numel() * p.element_size() for p in model.parameters())
+
+    def _load(self, model_name: str) -> "SentenceTransformer":
+        logger.info("embedder.load.start", model=model_name)
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        try:
+            model, device, weight_bytes = self._construct(model_name)
+        except Exception as exc:
+            self._errors[model_name] = str(exc)
+            logger.error("embedder.load.failed", model=model_name, error=str(exc))
+            raise
+
+        info = LoadedModelInfo(
+            model_name=model_name,
+            device=device,
+            load_seconds=round(time.perf_counter() - started, 3),
+            parameter_bytes=weight_bytes,
+            rss_delta_bytes=max(current_rss_bytes() - rss_before, 0),
+            loaded_by_pid=os.getpid(),
+        )
+        self._models[model_name] = model
+        self._info[model_name] = info
+        self._errors.pop(model_name, None)
+        logger.info("embedder.load.done", **info.to_dict())
+        return model
+
+    def warmup(self, model_names: Iterable[str]) -> None:
+        """Eagerly load *model_names*; failures are recorded, not raised."""
+        names: List[str] = [n for n in dict.fromkeys(model_names) if n]
+        self._expected.update(names)
+        for name in names:
+            try:
+                self.get(name)
+            except Exception:  # noqa: BLE001 – surfaced through status()
+                continue
+
+    def preload_for_fork(self, model_names: Iterable[str]) -> List[str]:
+        """Load *model_names* in a parent process that is about to fork workers.
+
+        Forked children then share the weight pages copy-on-write.  Only torch
+        models on CPU are preloaded: CUDA contexts and ONNX Runtime thread
+        pools do not survive ``fork`` and are left to each child.  Intra-op
+        threads are pinned to one first so no OpenMP pool exists at fork
+        time, and `gc.freeze` keeps the children's collector from writing to
+        (and thereby copying) the inherited objects.  Returns the preloaded
+        names.
+        """
+        names = [n for n in dict.fromkeys(model_names) if n]
+        torch_names = [n for n in names if parse_model_spec(n)[0] == "torch"]
+        skipped = [n for n in names if n not in torch_names]
+        if torch_names and self.device != "cpu":
+            skipped, torch_names = names, []
+        if skipped:
+            logger.info("embedder.preload.skipped", models=skipped, device=self._device)
+        if not torch_names:
+            return []
+
+        from privategpt.infra.embedder.process_pool import apply_thread_limits
+
+        apply_thread_limits(1)
+        self.warmup(torch_names)
+        preloaded = [n for n in torch_names if self.is_loaded(n)]
+        gc.collect()
+        gc.freeze()
+        logger.info("embedder.preload.done", models=preloaded, **process_memory())
+        return preloaded
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    @property
+    def ready(self) -> bool:
+        """True once every model requested through `warmup` is loaded."""
+        return all(name in self._models for name in self._expected)
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "ready": self.ready,
+            "device": self._device,
+            "expected": sorted(self._expected),
+            "models": {
+                name: {**info.to_dict(), "inherited": info.loaded_by_pid != os.getpid()}
+                for name, info in self._info.items()
+            },
+            "errors": dict(self._errors),
+            "rss_bytes": current_rss_bytes(),
+            "memory": process_memory(),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_model_pool() -> EmbedderModelPool:
+    """Return the process-wide model pool."""
+    return EmbedderModelPool()
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+"""ONNX Runtime embedder for CPU-only nodes.
+
+The Hugging Face model behind a Sentence-Transformers checkpoint is exported
+once to ``<EMBED_ONNX_DIR>/<model>/model.onnx`` and, optionally, dynamically
+quantized to int8 (``model.int8.onnx``).  Pooling and normalisation mirror the
+BGE Sentence-Transformers pipeline so vectors are interchangeable with
+`BgeEmbedderAdapter` within a small cosine drift.
+
+Select it per deployment with ``EMBED_BACKEND=onnx|onnx-int8`` or per
+collection by prefixing ``CollectionSettings.embedding_model`` with
+``onnx:`` / ``onnx-int8:``.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List
+
+import numpy as np
+
+from privategpt.core.ports.embedder import EmbedderPort, EmbeddingMatrix, EmbeddingVector, ProgressCallback
+from privategpt.infra.embedder.batching import plan_token_batches
+from privategpt.infra.embedder.model_pool import EmbedderModelPool, get_model_pool
+from privategpt.shared.logging import get_logger
+from privategpt.shared.settings import settings  # type: ignore[attr-defined]
+
+logger = get_logger("embedder.onnx")
+
+_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+@dataclass(slots=True)
+class OnnxModel:
+    """A loaded ONNX session plus the tokenizer that feeds it."""
+
+    session: Any
+    tokenizer: Any
+    max_seq_length: int
+    pooling: str
+    parameter_bytes: int
+    path: str
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_seq_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        features = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feed_names = {i.name for i in self.session.get_inputs()}
+        feed = {k: np.asarray(v, dtype=np.int64) for k, v in features.items() if k in feed_names}
+        hidden = self.session.run(None, feed)[0]
+        if self.pooling == "mean":
+            mask = feed["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        else:  # BGE uses the [CLS] token
+            pooled = hidden[:, 0]
+        pooled = pooled.astype(np.float32, copy=False)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+
+def onnx_model_dir(model_name: str, base_dir: str | None = None) -> Path:
+    base = base_dir or settings.embed_onnx_dir
+    return Path(base) / model_name.replace("/", "__")
+
+
+def export_onnx_model(model_name: str, out_dir: Path, quantize: bool = False) -> Path:
+    """Export *model_name* to ONNX (and int8 if *quantize*); return the file path.
+
+    Needs ``torch`` and ``transformers`` – run it once at image build time or
+    on a node that has them; inference nodes only need ``onnxruntime``.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = out_dir / "model.onnx"
+    if not fp32_path.exists():
+        logger.info("onnx.export.start", model=model_name, path=str(fp32_path))
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        names = [n for n in _INPUT_NAMES if n in sample]
+        dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+        dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[n] for n in names),
+                str(fp32_path),
+                input_names=names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic,
+                opset_version=17,
+            )
+        tokenizer.save_pretrained(str(out_dir))
+        logger.info("onnx.export.done", model=model_name, bytes=fp32_path.stat().st_size)
+
+    if not quantize:
+        return fp32_path
+
+    int8_path = out_dir / "model.int8.onnx"
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        logger.info("onnx.quantize.done", model=model_name, bytes=int8_path.stat().st_size)
+    return int8_path
+
+
+def load_onnx_model(
+    model_name: str,
+    quantized: bool = False,
+    pooling: str = "cls",
+    max_seq_length: int = 512,
+    intra_op_threads: int | None = None,
+) -> OnnxModel:
+    """Load (exporting on first use) the ONNX graph for *model_name*."""
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+
+    out_dir = onnx_model_dir(model_name)
+    path = out_dir / ("model.int8.onnx" if quantized else "model.onnx")
+    if not path.exists():
+        path = export_onnx_model(model_name, out_dir, quantize=quantized)
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    session = ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
+    tokenizer = AutoTokenizer.from_pretrained(str(out_dir) if (out_dir / "tokenizer.json").exists() else model_name)
+    return OnnxModel(
+        session=session,
+        tokenizer=tokenizer,
+        max_seq_length=min(max_seq_length, getattr(tokenizer, "model_max_length", max_seq_length)),
+        pooling=pooling,
+        parameter_bytes=path.stat().st_size,
+        path=str(path),
+    )
+
+
+class OnnxEmbedderAdapter(EmbedderPort):
+    """`EmbedderPort` running an exported (optionally int8) ONNX graph on CPU."""
+
+    def __init__(
+        self,
+        model_name: str | None = None,
+        quantized: bool = False,
+        pool: EmbedderModelPool | None = None,
+        token_budget: int = 16_384,
+        max_batch: int = 128,
+    ):
+        self.model_name = model_name or os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+        self.quantized = quantized
+        self.spec = f"{'onnx-int8' if quantized else 'onnx'}:{self.model_name}"
+        self.token_budget = token_budget
+        self.max_batch = max_batch
+        self._pool = pool or get_model_pool()
+        self._model: OnnxModel | None = None
+
+    async def _ensure_model(self) -> OnnxModel:
+        if self._model is None:
+            self._model = await asyncio.to_thread(self._pool.get, self.spec)
+        return self._model
+
+    async def embed_documents(
+        self, texts: List[str], on_progress: ProgressCallback | None = None
+    ) -> EmbeddingMatrix:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        model = await self._ensure_model()
+        lengths = await asyncio.to_thread(model.token_lengths, texts)
+        results: np.ndarray | None = None
+        done = 0
+        for indices in plan_token_batches(lengths, self.token_budget, self.max_batch):
+            vectors = await asyncio.to_thread(model.encode, [texts[i] for i in indices])
+            if results is None:
+                results = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            results[indices] = vectors
+            done += len(indices)
+            if on_progress is not None:
+                on_progress(done, len(texts))
+        return results
+
+    async def embed_query(self, text: str) -> EmbeddingVector:
+        return (await self.embed_queries([text]))[0]
+
+    async def embed_queries(self, texts: List[str]) -> EmbeddingMatrix:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        model = await self._ensure_model()
+        return await asyncio.to_thread(model.encode, texts)
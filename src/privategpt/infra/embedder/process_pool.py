@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+"""Multi-process embedding for large ingestion jobs.
+
+`ProcessPoolEmbedder` shards big ``embed_documents`` calls across worker
+processes that each hold their own copy of the model, while queries and small
+documents stay in-process.  `plan_threads` splits the machine's cores between
+Celery prefork children, embedding workers and torch/OpenMP intra-op threads
+so they stop oversubscribing the CPU.
+
+Daemonic processes may not start children, and Celery's prefork pool runs
+its children as daemons, so the pool only shards in a worker started with
+``--pool=solo`` (as docker-compose does when ``EMBED_PROCESS_POOL`` is on).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from privategpt.core.ports.embedder import (
+    EmbedderPort,
+    EmbeddingMatrix,
+    EmbeddingVector,
+    ProgressCallback,
+    as_embedding_matrix,
+)
+from privategpt.shared.logging import get_logger
+
+logger = get_logger("embedder.process_pool")
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+@dataclass(slots=True)
+class ThreadPlan:
+    cpu_count: int
+    parent_processes: int
+    threads_per_parent: int
+    workers: int
+    threads_per_worker: int
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def plan_threads(cpu_count: int | None = None, parent_processes: int = 1, workers: int = 0) -> ThreadPlan:
+    """Share *cpu_count* cores between processes without oversubscription.
+
+    *parent_processes* is the number of processes that may embed at the same
+    time (e.g. the Celery prefork concurrency).  Each one gets an equal slice
+    of the cores; ``workers=0`` picks one embedding worker per two cores of
+    that slice, and the intra-op threads fill the rest of it.
+    """
+    cpus = max(cpu_count or os.cpu_count() or 1, 1)
+    parents = max(parent_processes, 1)
+    budget = max(cpus // parents, 1)
+    n_workers = workers if workers > 0 else max(budget // 2, 1)
+    n_workers = min(n_workers, budget)
+    return ThreadPlan(
+        cpu_count=cpus,
+        parent_processes=parents,
+        threads_per_parent=budget,
+        workers=n_workers,
+        threads_per_worker=max(budget // n_workers, 1),
+    )
+
+
+def apply_thread_limits(threads: int) -> None:
+    """Pin torch and the BLAS/OpenMP runtimes of this process to *threads*."""
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        import torch
+    except ModuleNotFoundError:  # ONNX-only nodes
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # can only be set before the first parallel op ran in this process
+        pass
+
+
+# ---------------------------------------------------------------------------
+# worker process side
+# ---------------------------------------------------------------------------
+
+_worker_embedder: EmbedderPort | None = None
+
+
+def _init_worker(model_spec: str, threads: int, token_budget: int, max_batch: int) -> None:
+    global _worker_embedder
+    apply_thread_limits(threads)
+
+    from privategpt.infra.embedder.model_pool import get_model_pool, parse_model_spec
+
+    backend, name = parse_model_spec(model_spec)
+    if backend == "torch":
+        from privategpt.infra.embedder.bge_adapter import BgeEmbedderAdapter
+
+        _worker_embedder = BgeEmbedderAdapter(name, token_budget=token_budget, max_batch=max_batch)
+    else:
+        from privategpt.infra.embedder.onnx_adapter import OnnxEmbedderAdapter
+
+        _worker_embedder = OnnxEmbedderAdapter(
+            name, quantized=backend == "onnx-int8", token_budget=token_budget, max_batch=max_batch
+        )
+    get_model_pool().get(model_spec)
+
+
+def _embed_shard(shard_index: int, texts: List[str]) -> Tuple[int, np.ndarray, int, float]:
+    assert _worker_embedder is not None, "worker not initialised"
+    started = time.perf_counter()
+    vectors = asyncio.run(_worker_embedder.embed_documents(texts))
+    return shard_index, as_embedding_matrix(vectors), os.getpid(), time.perf_counter() - started
+
+
+# ---------------------------------------------------------------------------
+# parent side
+# ---------------------------------------------------------------------------
+
+
+@dataclass(slots=True)
+class WorkerStats:
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+
+class ProcessPoolEmbedder(EmbedderPort):
+    """Decorator that fans large document batches out to worker processes.
+
+    Calls with fewer than ``min_chunks`` texts, all queries, and calls made
+    from a daemonic process (which may not start children) are served by the
+    wrapped in-process embedder.
+    """
+
+    def __init__(
+        self,
+        inner: EmbedderPort,
+        model_spec: str,
+        plan: ThreadPlan,
+        shard_size: int = 256,
+        min_chunks: int = 512,
+        token_budget: int = 16_384,
+        max_batch: int = 128,
+    ):
+        self.inner = inner
+        self.model_spec = model_spec
+        self.plan = plan
+        self.shard_size = max(shard_size, 1)
+        self.min_chunks = min_chunks
+        self._initargs = (model_spec, plan.threads_per_worker, token_budget, max_batch)
+        self._executor: ProcessPoolExecutor | None = None
+        self._worker_stats: Dict[int, WorkerStats] = {}
+        self._warned_daemon = False
+
+    def _can_fork(self) -> bool:
+        if self.plan.workers <= 1:
+            return False
+        if multiprocessing.current_process().daemon:
+            if not self._warned_daemon:
+                self._warned_daemon = True
+                logger.warning(
+                    "embedder.process_pool.daemon",
+                    reason="daemonic process (e.g. a Celery prefork child) cannot start workers; "
+                    "embedding in-process, run the worker with --pool=solo",
+                    model=self.model_spec,
+                )
+            return False
+        return True
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: never fork a parent that already holds torch thread pools
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.plan.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=self._initargs,
+            )
+            logger.info("embedder.process_pool.start", model=self.model_spec, **self.plan.to_dict())
+        return self._executor
+
+    async def embed_documents(
+        self, texts: List[str], on_progress: ProgressCallback | None = None
+    ) -> EmbeddingMatrix:
+        if len(texts) < self.min_chunks or not self._can_fork():
+            return await self.inner.embed_documents(texts, on_progress=on_progress)
+
+        loop = asyncio.get_running_loop()
+        executor = self._ensure_executor()
+        starts = list(range(0, len(texts), self.shard_size))
+        pending = [
+            loop.run_in_executor(executor, _embed_shard, i, texts[start : start + self.shard_size])
+            for i, start in enumerate(starts)
+        ]
+
+        shards: Dict[int, np.ndarray] = {}
+        done = 0
+        for next_done in asyncio.as_completed(pending):
+            index, vectors, pid, seconds = await next_done
+            shards[index] = vectors
+            stats = self._worker_stats.setdefault(pid, WorkerStats())
+            stats.chunks += len(vectors)
+            stats.seconds += seconds
+            done += len(vectors)
+            if on_progress is not None:
+                on_progress(done, len(texts))
+
+        matrix = np.concatenate([shards[i] for i in range(len(starts))])
+        logger.info("embedder.process_pool.batch", chunks=len(texts), shards=len(starts))
+        return matrix
+
+    async def embed_query(self, text: str) -> EmbeddingVector:
+        return await self.inner.embed_query(text)
+
+    async def embed_queries(self, texts: List[str]) -> EmbeddingMatrix:
+        return await self.inner.embed_queries(texts)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "process_pool": {
+                "plan": self.plan.to_dict(),
+                "active": self._executor is not None,
+                "workers": {
+                    str(pid): {
+                        "chunks": s.chunks,
+                        "seconds": round(s.seconds, 3),
+                        "chunks_per_second": round(s.chunks_per_second, 1),
+                    }
+                    for pid, s in self._worker_stats.items()
+                },
+            }
+        }
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+"""Token-aware recursive splitter.
+
+Chunks are packed up to ``chunk_size`` tokens and cut at the strongest
+boundary available – paragraph, then sentence end, then line break, then
+word – as long as the chunk is at least half full.  Consecutive chunks share
+about ``chunk_overlap`` tokens, starting at a sentence boundary when one lies
+inside the overlap.
+
+The text is scanned once, sentence by sentence, with a lazy regex; only
+sentences longer than a chunk are broken into words (and words into
+characters).  Chunks are yielded as soon as they are complete, so the work is
+linear in the size of the document and only one chunk is held at a time.
+"""
+
+import itertools
+import re
+from dataclasses import dataclass
+from typing import Callable, Generator, Iterable, Iterator, List, Tuple
+
+from privategpt.core.ports.text_splitter import TextSplitterPort
+
+# a sentence or line with the whitespace that follows it
+# (a "." inside "3.14" also ends a unit, but gets no boundary rank)
+_UNIT = re.compile(r"[^.!?…\n]*(?:[.!?…]+[\"')\]]*)?\s*")
+# a word with the whitespace that follows it
+_WORD = re.compile(r"\S+\s*")
+_SENTENCE_END = re.compile(r"[.!?…][\"')\]]*$")
+
+WORD, LINE, SENTENCE, PARAGRAPH = range(4)
+
+
+def approx_token_count(text: str) -> int:
+    """Roughly four characters per token – slightly pessimistic for English
+    WordPiece/BPE vocabularies, so chunks stay inside the model's window.
+    Pass a tokenizer-backed counter to `RecursiveTokenSplitter` for exact sizes.
+    """
+    return (len(text) + 3) // 4
+
+
+@dataclass(slots=True)
+class _Atom:
+    start: int
+    end: int
+    tokens: int
+    rank: int  # strength of the boundary *after* this atom
+
+
+def _boundary_rank(word: str, gap: str) -> int:
+    if not gap:
+        return WORD
+    newlines = gap.count("\n")
+    if newlines >= 2:
+        return PARAGRAPH
+    if _SENTENCE_END.search(word):
+        return SENTENCE
+    # single line breaks are often just hard-wrapped text (PDF extraction)
+    return LINE if newlines else WORD
+
+
+class RecursiveTokenSplitter(TextSplitterPort):
+    """Split text into ~``chunk_size``-token chunks on natural boundaries."""
+
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        token_counter: Callable[[str], int] = approx_token_count,
+    ):
+        self.chunk_size = max(chunk_size, 1)
+        self.chunk_overlap = min(max(chunk_overlap, 0), self.chunk_size // 2)
+        self.count_tokens = token_counter
+
+    def split(self, text: str) -> List[str]:
+        return list(self.iter_chunks(text))
+
+    def _atoms(
+        self, text: str, final: bool = True, pos: int = 0, in_long: bool = False
+    ) -> Generator[_Atom, None, Tuple[int, bool]]:
+        """Sentences/lines of *text* from *pos*; only those longer than a chunk are broken up further.
+
+        Unless *final*, the unit at the very end may be incomplete.  It is
+        held back until more text arrives, except for the complete words of a
+        unit already longer than a chunk, which are split the same way
+        whatever follows.  Returns where the held-back tail starts and
+        whether it continues such a long unit (*in_long* on the next call).
+        """
+        for match in _UNIT.finditer(text, pos):
+            start, end = match.span()
+            body = match.group().rstrip()
+            complete = final or end < len(text)
+            if not body:
+                if not complete:
+                    return start, in_long  # leading whitespace joins the next unit
+                continue
+            body_end = start + len(body)
+            # counted with the trailing gap so chunk sizes add up under char estimates
+            tokens = self.count_tokens(match.group())
+            rank = _boundary_rank(body, text[body_end:end])
+            if tokens <= self.chunk_size and not in_long:
+                if not complete:
+                    return start, False
+                yield _Atom(start, end, max(tokens, 1), rank)
+            else:
+                held = yield from self._words(text, start, body_end, end, rank, complete)
+                if held is not None:
+                    return held, True
+            in_long = False
+        return len(text), False
+
+    def _words(
+        self, text: str, start: int, body_end: int, end: int, rank: int, complete: bool
+    ) -> Generator[_Atom, None, int | None]:
+        """Word atoms of one unit; unless *complete*, returns the start of the held-back last word."""
+        words = list(_WORD.finditer(text, start, body_end))
+        for n, match in enumerate(words):
+            w_start, w_end = match.span()
+            word_end = w_start + len(match.group().rstrip())
+            last_word = n == len(words) - 1
+            if last_word and not complete:
+                return w_start  # may still grow, and its slices depend on its full length
+            w_rank = rank if last_word else WORD
+            w_end = end if last_word else w_end
+            tokens = max(self.count_tokens(text[w_start:w_end]), 1)
+            if tokens <= self.chunk_size:
+                yield _Atom(w_start, w_end, tokens, w_rank)
+                continue
+            # a "word" longer than a whole chunk (URLs, base64, tables without
+            # spaces): cut it into character slices of roughly chunk_size tokens
+            step = max((word_end - w_start) * self.chunk_size // tokens, 1)
+            for s in range(w_start, word_end, step):
+                e = min(s + step, word_end)
+                if e == word_end:
+                    yield _Atom(s, w_end, self.count_tokens(text[s:w_end]), w_rank)
+                else:
+                    yield _Atom(s, e, self.count_tokens(text[s:e]), WORD)
+        return None
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """Yield chunks of *text* in order."""
+        yield from self._pack(self._atoms(text), lambda start, end: text[start:end])
+
+    def iter_chunks_stream(self, blocks: Iterable[str]) -> Iterator[str]:
+        """`iter_chunks` for text that arrives in pieces (e.g. read from a file).
+
+        Gives the same chunks as the joined text.  Only the current chunk and
+        the unfinished sentence after it are kept between blocks, so memory
+        does not grow with the document – except that a single word longer
+        than a chunk (a long URL or base64 run) is held until it ends.
+        """
+        buffer = {"text": "", "base": 0}  # text from absolute offset base on
+        window_start = [0]
+
+        def atoms() -> Iterator[_Atom]:
+            tail, in_long = 0, False  # where atoms resume, and whether inside a long unit
+            for block in itertools.chain(blocks, [None]):
+                final = block is None
+                if not final and not block:
+                    continue
+                text = buffer["text"] = buffer["text"] + (block or "")
+                base = buffer["base"]
+                pending = self._atoms(text, final, tail - base, in_long)
+                while True:
+                    try:
+                        atom = next(pending)
+                    except StopIteration as stop:
+                        held, in_long = stop.value
+                        break
+                    atom.start += base
+                    atom.end += base
+                    yield atom
+                tail = base + held
+                # keep the text of the packer's window and of the held-back tail
+                keep = min(window_start[0], tail)
+                buffer["text"], buffer["base"] = text[keep - base :], keep
+
+        def text_at(start: int, end: int) -> str:
+            return buffer["text"][start - buffer["base"] : end - buffer["base"]]
+
+        yield from self._pack(atoms(), text_at, window_start)
+
+    def _pack(
+        self, atoms: Iterable[_Atom], text_at: Callable[[int, int], str], window_start: List[int] | None = None
+    ) -> Iterator[str]:
+        """Pack *atoms* into chunks, sliced from the text with *text_at*.
+
+        *window_start*, when given, is kept at the start of the unfinished
+        chunk, which is as far back as *text_at* will be asked for.
+        """
+        min_fill = self.chunk_size // 2
+        window: List[_Atom] = []
+        fresh_from = 0  # window[:fresh_from] is overlap already emitted once
+        total = 0
+        for atom in atoms:
+            while window and total + atom.tokens > self.chunk_size:
+                if fresh_from >= len(window):
+                    # only overlap left – drop it rather than repeat it alone
+                    window, fresh_from, total = [], 0, 0
+                else:
+                    cut = self._cut_index(window, fresh_from, min_fill)
+                    chunk = text_at(window[0].start, window[cut].end).strip()
+                    if chunk:
+                        yield chunk
+                    keep = self._overlap_start(window, cut)
+                    window = window[keep:]
+                    fresh_from = cut + 1 - keep
+                    total = sum(a.tokens for a in window)
+            window.append(atom)
+            total += atom.tokens
+            if window_start is not None:
+                window_start[0] = window[0].start
+        if len(window) > fresh_from:
+            chunk = text_at(window[0].start, window[-1].end).strip()
+            if chunk:
+                yield chunk
+
+    @staticmethod
+    def _cut_index(window: List[_Atom], fresh_from: int, min_fill: int) -> int:
+        """Index of the atom to end the chunk after: strongest boundary past *min_fill*."""
+        best, best_rank = len(window) - 1, WORD
+        filled = 0
+        for i, atom in enumerate(window):
+            filled += atom.tokens
+            if i >= fresh_from and filled >= min_fill and atom.rank >= best_rank:
+                best, best_rank = i, atom.rank
+        return best
+
+    def _overlap_start(self, window: List[_Atom], cut: int) -> int:
+        """First atom of the next chunk: about ``chunk_overlap`` tokens before *cut*."""
+        start = cut + 1
+        if not self.chunk_overlap:
+            return start
+        budget = 0
+        sentence_start = None
+        for i in range(cut, -1, -1):
+            budget += window[i].tokens
+            if budget > self.chunk_overlap:
+                break
+            start = i
+            if i > 0 and window[i - 1].rank >= SENTENCE:
+                sentence_start = i
+        return sentence_start if sentence_start is not None else start
@@ -3,8 +3,10 @@ from __future__ import annotations
 """Celery application & tasks for background ingestion."""
 
 from celery import Celery, current_task
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from privategpt.shared.settings import settings  # type: ignore
 from privategpt.infra.tasks.service_factory import build_rag_service
+from privategpt.infra.tasks.ingest_pipeline import run_in_worker_loop
 from privategpt.core.domain.document import DocumentStatus
 from privategpt.infra.database.async_session import AsyncSessionLocal
 from privategpt.infra.database.document_repository import SqlDocumentRepository
@@ -12,7 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import uuid
 
 logger = logging.getLogger(__name__)
@@ -24,12 +26,150 @@ app = Celery(
 )
 
 
+if settings.celery_concurrency:
+    app.conf.worker_concurrency = settings.celery_concurrency
+
+
+@worker_init.connect
+def plan_embedding_processes(sender=None, **_: Any) -> None:
+    """Plan threads for the worker's real concurrency; forked children inherit it."""
+    from privategpt.infra.tasks.service_factory import (
+        ingestion_thread_plan,
+        set_worker_concurrency,
+        warn_if_process_pool_idle,
+    )
+
+    pool_cls = getattr(sender, "pool_cls", None)
+    pool = str(getattr(pool_cls, "__module__", pool_cls) or "").rsplit(".", 1)[-1]  # prefork, solo, thread, ...
+    # a solo worker runs one task at a time in its (non-daemonic) main process
+    set_worker_concurrency(1 if pool == "solo" else getattr(sender, "concurrency", 0) or 0)
+    warn_if_process_pool_idle(ingestion_thread_plan(), pool)
+
+
+@worker_init.connect
+def preload_embedder_in_parent(**_: Any) -> None:
+    """Load the models in the main worker process so prefork children share them."""
+    if not settings.embed_preload_parent:
+        return
+    from privategpt.infra.embedder.model_pool import get_model_pool
+    from privategpt.infra.tasks.service_factory import preload_model_names
+
+    get_model_pool().preload_for_fork(preload_model_names())
+
+
+@worker_process_init.connect
+def warm_embedder_pool(**_: Any) -> None:
+    """Limit intra-op threads to this child's core share, then load the models once.
+
+    Models preloaded by the parent are already in the inherited pool, so only
+    the remaining ones are loaded here.
+    """
+    from privategpt.infra.embedder.model_pool import get_model_pool
+    from privategpt.infra.embedder.process_pool import apply_thread_limits
+    from privategpt.infra.tasks.service_factory import ingestion_thread_plan, preload_model_names
+
+    plan = ingestion_thread_plan()
+    apply_thread_limits(plan.threads_per_parent)
+    logger.info(f"Embedding thread plan: {plan.to_dict()}")
+    get_model_pool().warmup(preload_model_names())
+
+
+@worker_process_init.connect
+def reset_database_pool(**_: Any) -> None:
+    """Drop DB connections inherited from the parent; this child opens its own."""
+    from privategpt.infra.database.sync_session import sync_engine
+
+    sync_engine.dispose(close=False)
+
+
+@worker_process_shutdown.connect
+def close_vector_store_clients(**_: Any) -> None:
+    """Close this child's shared Weaviate client."""
+    from privategpt.infra.vector_store.weaviate_client import close_weaviate_clients
+
+    close_weaviate_clients()
+
+
 @app.task(name="ingest_document", bind=True)
-def ingest_document_task(self, doc_id: int, file_path: str, title: str, text: str):
-    """Background ingestion task – split, embed, vector-store, save chunks."""
+def ingest_document_task(self, doc_id: int, file_path: str, title: str, text: str, incremental: bool = False):
+    """Background ingestion task – split, embed, vector-store, save chunks.
+
+    *incremental* re-ingests an edited document, re-embedding only changed chunks.
+    """
     # Use synchronous implementation to avoid asyncio issues with Celery
     from privategpt.infra.tasks.celery_sync import process_document_sync
-    process_document_sync(doc_id, file_path, title, text)
+    process_document_sync(doc_id, file_path, title, text, incremental=incremental)
+
+
+@app.task(name="ingest_documents", bind=True)
+def ingest_documents_task(self, documents: List[List[Any]]):
+    """Ingest a pack of small documents from one batch upload, one after another.
+
+    A failing document is marked failed and the rest of the pack still runs.
+    """
+    from privategpt.infra.tasks.celery_sync import process_document_sync
+
+    completed, failed = [], []
+    for doc_id, file_path, title in documents:
+        try:
+            process_document_sync(doc_id, file_path, title, "")
+            completed.append(doc_id)
+        except Exception as e:  # already recorded on the document row
+            logger.error(f"Document {doc_id} in packed task {self.request.id} failed: {e}")
+            failed.append(doc_id)
+    return {"completed": completed, "failed": failed}
+
+
+@app.task(name="train_vector_index")
+def train_vector_index_task(collection_ids: Optional[List[str]] = None):
+    """Train the IVF-PQ codecs of the given collections, by default the stale ones."""
+    from privategpt.infra.tasks.service_factory import build_vector_store
+
+    vector_store = build_vector_store()
+    if not hasattr(vector_store, "train"):
+        return []
+    trained = vector_store.train(collection_ids)
+    logger.info(f"Trained vector index for collections: {trained}")
+    return trained
+
+
+@app.task(name="snapshot_vector_index")
+def snapshot_vector_index_task():
+    """Link rows appended to the HNSW delta log into the graph and write a new generation."""
+    from privategpt.infra.tasks.service_factory import build_vector_store
+
+    vector_store = build_vector_store()
+    if not hasattr(vector_store, "snapshot"):
+        return False
+    written = vector_store.snapshot()
+    logger.info(f"Vector index snapshot written: {written}")
+    return written
+
+
+@app.task(name="set_vector_tenant_activity")
+def set_vector_tenant_activity_task(user_ids: List[int], active: bool):
+    """Load or unload the Weaviate tenants of *user_ids* (multi-tenant stores only)."""
+    from privategpt.infra.tasks.service_factory import build_vector_store
+
+    vector_store = build_vector_store()
+    if not hasattr(vector_store, "set_tenant_activity"):
+        return []
+    changed = run_in_worker_loop(vector_store.set_tenant_activity(user_ids, active))
+    logger.info(f"Set tenants {changed} {'active' if active else 'inactive'}")
+    return changed
+
+
+@app.task(name="migrate_vector_tenants")
+def migrate_vector_tenants_task(drop_source: bool = False):
+    """Copy the shared Weaviate chunk class into per-user tenants."""
+    from privategpt.infra.tasks.service_factory import build_vector_store
+
+    vector_store = build_vector_store()
+    if not getattr(vector_store, "multi_tenancy", False):
+        raise ValueError("WEAVIATE_MULTI_TENANCY is not enabled")
+    copied = run_in_worker_loop(vector_store.migrate_to_tenants(drop_source=drop_source))
+    logger.info(f"Migrated chunks into tenants: {copied}")
+    return copied
 
 
 @app.task(name="save_assistant_message")
@@ -2,40 +2,71 @@
 import logging
 from typing import List
 from celery import current_task
-from sqlalchemy import create_engine, update
-from sqlalchemy.orm import sessionmaker
-
-from privategpt.infra.database.models import Document as DocumentModel
+from privategpt.infra.database.chunk_writer import chunk_rows, write_chunk_rows
+from privategpt.infra.database.models import Chunk as ChunkModel, Document as DocumentModel
+from privategpt.infra.database.sync_session import SyncSessionLocal
+from privategpt.core.domain.collection import CollectionSettings
 from privategpt.core.domain.document import DocumentStatus
-from privategpt.infra.splitters.simple import SimpleSplitterAdapter
-from privategpt.infra.embedder.bge_adapter import BgeEmbedderAdapter
-import asyncio
+from privategpt.infra.tasks.ingest_diff import ChunkDiff
+from privategpt.infra.tasks.ingest_pipeline import PipelineTimings, in_thread, pipeline_windows, run_in_worker_loop
+from privategpt.infra.tasks.ingest_stream import TextBlockReader, remove_spool
+from privategpt.infra.tasks.service_factory import build_embedder, build_splitter, build_vector_store
 import json
+import uuid
 
 logger = logging.getLogger(__name__)
 
 
-def process_document_sync(doc_id: int, file_path: str, title: str, text: str):
-    """Synchronous document processing function."""
-    
-    # Create sync database connection
-    engine = create_engine("postgresql://privategpt:secret@db:5432/privategpt")
-    Session = sessionmaker(bind=engine)
-    
-    def update_progress(stage: str, progress: int, message: str):
+def _collection_settings(doc: DocumentModel) -> CollectionSettings | None:
+    """Settings of the document's collection, inherited from the nearest ancestor that has them."""
+    collection = doc.collection
+    while collection is not None:
+        if collection.settings:
+            return CollectionSettings.from_dict(collection.settings)
+        collection = collection.parent
+    return None
+
+
+def _vector_id(doc_id: int, position: int) -> str:
+    # Generate proper UUIDs for Weaviate
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"doc_{doc_id}_chunk_{position}"))
+
+
+def process_document_sync(doc_id: int, file_path: str, title: str, text: str, incremental: bool = False):
+    """Synchronous document processing function.
+
+    With *incremental* an already ingested document is diffed against its
+    stored chunks (see `ChunkDiff`) and only new or changed chunks are
+    embedded and written.
+    """
+
+    def update_progress(stage: str, progress: int, message: str, timings: PipelineTimings | None = None):
         """Update task progress in Celery backend."""
-        current_task.update_state(
-            state='PROGRESS',
-            meta={
-                'stage': stage,
-                'progress': progress,
-                'message': message,
-                'document_id': doc_id,
-                'title': title
-            }
-        )
+        meta = {
+            'stage': stage,
+            'progress': progress,
+            'message': message,
+            'document_id': doc_id,
+            'title': title
+        }
+        if timings is not None:
+            meta['timings'] = timings.to_dict()
+        current_task.update_state(state='PROGRESS', meta=meta)
     
-    with Session() as session:
+    # the spool file is read once; it goes whether ingestion succeeds or not
+    spooled = not text
+    try:
+        _process_document(doc_id, file_path, title, text, incremental, spooled, update_progress)
+    finally:
+        if spooled:
+            remove_spool(file_path)
+
+
+def _process_document(
+    doc_id: int, file_path: str, title: str, text: str, incremental: bool, spooled: bool, update_progress
+):
+    # the process-wide engine keeps its pooled connections between documents
+    with SyncSessionLocal() as session:
         try:
             # Get document
             doc = session.query(DocumentModel).filter_by(id=doc_id).first()
@@ -47,109 +78,142 @@ def process_document_sync(doc_id: int, file_path: str, title: str, text: str):
             doc.processing_progress = json.dumps({"stage": "starting", "progress": 0})
             session.commit()
             
-            update_progress("splitting", 10, "Splitting document into chunks...")
-            
-            # Split text
-            splitter = SimpleSplitterAdapter()
-            parts = splitter.split(text)
-            num_chunks = len(parts)
-            
-            update_progress("splitting", 20, f"Split into {num_chunks} chunks")
-            
-            # Update document progress
-            doc.processing_progress = json.dumps({
-                "stage": "embedding", 
-                "progress": 20,
-                "chunks_total": num_chunks
-            })
-            session.commit()
-            
-            # Generate embeddings
-            update_progress("embedding", 30, f"Generating embeddings for {num_chunks} chunks...")
-            
-            embedder = BgeEmbedderAdapter()
-            
-            # Use asyncio.run for the async embed_documents method
-            async def get_embeddings():
-                batch_size = 10
-                all_embeddings = []
-                for i in range(0, num_chunks, batch_size):
-                    batch = parts[i:i+batch_size]
-                    batch_embeddings = await embedder.embed_documents(batch)
-                    all_embeddings.extend(batch_embeddings)
-                    
-                    # Update progress
-                    progress = 30 + int((i / num_chunks) * 40)  # 30-70% for embeddings
-                    update_progress(
-                        "embedding", 
-                        progress, 
-                        f"Embedded {min(i + batch_size, num_chunks)}/{num_chunks} chunks"
-                    )
-                return all_embeddings
-            
-            embeddings = asyncio.run(get_embeddings())
-            
-            # Store in vector database
-            update_progress("storing", 70, "Storing vectors in database...")
-            
-            # Use asyncio.run for vector store operations
-            async def store_vectors():
-                from privategpt.infra.vector_store.weaviate_adapter import WeaviateAdapter
-                vector_store = WeaviateAdapter()
-                
-                # Generate proper UUIDs for Weaviate
-                import uuid
-                ids = [str(uuid.uuid5(uuid.NAMESPACE_DNS, f"doc_{doc_id}_chunk_{i}")) for i in range(num_chunks)]
-                await vector_store.add_vectors(
-                    embeddings,
-                    [{"text": p, "document_id": doc_id, "position": i} for i, p in enumerate(parts)],
-                    ids,
+            update_progress("splitting", 10, "Reading and splitting document...")
+
+            # Text is read from the spool file in blocks and split lazily;
+            # inline text is only used by callers that still pass it directly
+            splitter = build_splitter(_collection_settings(doc))
+            reader = None if text else TextBlockReader(file_path)
+            chunks = splitter.iter_chunks_stream([text] if text else reader)
+            embedder = build_embedder(ingestion=True)
+            collection_id, user_id = doc.collection_id, doc.user_id
+
+            if incremental:
+                diff = ChunkDiff.load(session, doc_id)
+                old_count = len(diff.old_hashes)
+            else:
+                # a full (re-)ingestion replaces whatever was stored
+                diff = None
+                old_count = session.query(ChunkModel).filter_by(document_id=doc_id).delete(synchronize_session=False)
+
+            timings = PipelineTimings()
+
+            def on_window(done: int, timings: PipelineTimings):
+                fraction = reader.fraction if reader is not None else 1.0
+                progress = 10 + int(fraction * 75)  # 10-85% while streaming
+                update_progress(
+                    "embedding", progress, f"Embedded and stored {done} chunks ({timings.summary()})", timings
                 )
-                
-                # Close the client properly
-                if hasattr(vector_store, 'close'):
-                    await vector_store.close()
-            
-            asyncio.run(store_vectors())
-            
-            update_progress("storing", 85, "Saving chunks to database...")
-            
-            # Save chunks using sync operations
-            from privategpt.infra.database.models import Chunk as ChunkModel
-            
-            for i, (part, emb) in enumerate(zip(parts, embeddings)):
-                chunk = ChunkModel(
-                    document_id=doc_id,
-                    position=i,
-                    text=part,
-                    embedding=json.dumps(emb)  # Convert to JSON string
+
+            async def ingest() -> int:
+                vector_store = build_vector_store()
+
+                async def store_vectors(position: int, parts: List[str], embeddings):
+                    indices = range(len(parts)) if diff is None else diff.changed(position, parts)
+                    if not indices:
+                        return
+                    # document/collection/user/position are indexed for filtered search;
+                    # ids are derived from the position, so rewritten chunks are upserted
+                    await vector_store.add_vectors(
+                        embeddings[list(indices)],
+                        [
+                            {
+                                "text": parts[i],
+                                "document_id": doc_id,
+                                "collection_id": collection_id,
+                                "user_id": user_id,
+                                "position": position + i,
+                            }
+                            for i in indices
+                        ],
+                        [_vector_id(doc_id, position + i) for i in indices],
+                    )
+
+                def store_chunks(position: int, parts: List[str], embeddings):
+                    # runs in a worker thread, one window at a time; rows are
+                    # COPY'd / bulk-inserted in the session's transaction
+                    rows = chunk_rows(doc_id, collection_id, position, parts, embeddings)
+                    if diff is not None:
+                        rows = [rows[i] for i in diff.changed(position, parts)]
+                        if not rows:
+                            return
+                        session.query(ChunkModel).filter(
+                            ChunkModel.document_id == doc_id,
+                            ChunkModel.position.in_([row["position"] for row in rows]),
+                        ).delete(synchronize_session=False)
+                    write_chunk_rows(session.connection(), rows)
+
+                # window N+1 is split and embedded while window N is written
+                total = await pipeline_windows(
+                    chunks,
+                    embedder if diff is None else diff.embedder(embedder),
+                    [("vectors", store_vectors), ("chunks", in_thread(store_chunks))],
+                    on_window=on_window,
+                    timings=timings,
                 )
-                session.add(chunk)
-            
+                # chunks past the new end of a shortened document
+                removed = diff.removed_positions(total) if diff is not None else range(total, old_count)
+                if removed:
+                    # the owner names the Weaviate tenant; no other tenant is searched or reloaded
+                    await vector_store.delete_vectors(
+                        [_vector_id(doc_id, p) for p in removed],
+                        filters={"document_id": doc_id, "user_id": user_id},
+                    )
+                    session.query(ChunkModel).filter(
+                        ChunkModel.document_id == doc_id, ChunkModel.position >= total
+                    ).delete(synchronize_session=False)
+                return total
+
+            num_chunks = run_in_worker_loop(ingest())
             session.commit()
-            
-            update_progress("finalizing", 95, "Finalizing document processing...")
+            # an IVF-PQ collection that crossed its training size is (re)trained in the background
+            stale_collections = getattr(build_vector_store(), "stale_collections", None)
+            if stale_collections is not None and stale_collections():
+                from privategpt.infra.tasks.celery_app import train_vector_index_task
+                train_vector_index_task.delay()
+            # an HNSW store with a long unlinked tail is snapshotted in the background
+            needs_snapshot = getattr(build_vector_store(), "needs_snapshot", None)
+            if needs_snapshot is not None and needs_snapshot():
+                from privategpt.infra.tasks.celery_app import snapshot_vector_index_task
+                snapshot_vector_index_task.delay()
+            if hasattr(embedder, "stats"):
+                logger.info(f"Embedder stats after document {doc_id}: {embedder.stats()}")
+
+            update_progress("finalizing", 95, "Finalizing document processing...", timings)
             
             # Update document status
             doc.status = DocumentStatus.COMPLETE.value
-            doc.processing_progress = json.dumps({
+            progress = {
                 "stage": "complete", 
                 "progress": 100,
                 "chunks_total": num_chunks,
-                "completed_at": "now"
-            })
+                "completed_at": "now",
+                "timings": timings.to_dict(),
+            }
+            message = f"Successfully processed {num_chunks} chunks"
+            if diff is not None:
+                progress["incremental"] = report = diff.report()
+                message += f" ({report['reused']} reused, {report['embedded']} embedded, {report['removed']} removed)"
+                logger.info(f"Incremental re-ingestion of document {doc_id}: {report}")
+            doc.processing_progress = json.dumps(progress)
+            if spooled:
+                doc.file_path = ""  # the spool file is removed below
             session.commit()
             
-            update_progress("complete", 100, f"Successfully processed {num_chunks} chunks")
+            update_progress("complete", 100, message)
             
         except Exception as e:
             logger.error(f"Document processing failed: {e}")
+            # keep the previously stored chunks rather than a half-written set
+            session.rollback()
             
             # Update document with error
             doc = session.query(DocumentModel).filter_by(id=doc_id).first()
             if doc:
                 doc.status = DocumentStatus.FAILED.value
                 doc.error = str(e)
+                if spooled:
+                    doc.file_path = ""
                 doc.processing_progress = json.dumps({
                     "stage": "failed",
                     "progress": 0,
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+"""Bulk document ingestion: one transaction, one Celery group, packed tasks.
+
+``POST /rag/documents/batch`` (and its NDJSON variant) spools every document,
+inserts all document rows in one transaction and enqueues them as a single
+Celery ``group``.  Per-task overhead (broker round trip, task setup, session
+and store checkout) dominates for small documents, so `pack_documents`
+groups documents below ``INGEST_PACK_BYTES`` into shared ``ingest_documents``
+tasks of up to ``INGEST_PACK_MAX_DOCS``.  Larger documents keep a task of
+their own, so they still spread over the workers.
+
+The rows carry the batch id in the indexed ``batch_id`` column (and, for API
+clients, in ``doc_metadata``) and the id of the task that ingests them, from
+which `batch_progress` aggregates the batch's progress.
+"""
+
+import json
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence
+
+from celery import Celery, group
+from celery.result import GroupResult
+
+from privategpt.core.domain.document import Document, DocumentStatus
+from privategpt.shared.settings import settings  # type: ignore[attr-defined]
+
+
+@dataclass
+class BatchItem:
+    """One spooled document of a batch upload."""
+
+    title: str
+    path: str
+    size: int  # bytes, decides packing
+    collection_id: str | None = None
+
+
+def pack_documents(sizes: Sequence[int], pack_bytes: int | None = None, max_docs: int | None = None) -> List[List[int]]:
+    """Group document indices into tasks.
+
+    Documents of at least *pack_bytes* get a task each; smaller ones are
+    packed in upload order until a pack would exceed *pack_bytes* or hold
+    *max_docs* documents.
+    """
+    pack_bytes = settings.ingest_pack_bytes if pack_bytes is None else pack_bytes
+    max_docs = max(settings.ingest_pack_max_docs if max_docs is None else max_docs, 1)
+    packs: List[List[int]] = []
+    current: List[int] = []
+    current_bytes = 0
+    for i, size in enumerate(sizes):
+        if size >= pack_bytes:
+            packs.append([i])
+            continue
+        if current and (current_bytes + size > pack_bytes or len(current) >= max_docs):
+            packs.append(current)
+            current, current_bytes = [], 0
+        current.append(i)
+        current_bytes += size
+    if current:
+        packs.append(current)
+    return packs
+
+
+def plan_batch(
+    items: Sequence[BatchItem], user_id: int, batch_id: str, uploaded_at
+) -> tuple[List[Document], List[List[int]]]:
+    """Pending documents for *items*, each with the id of the (packed) task that will ingest it."""
+    packs = pack_documents([item.size for item in items])
+    task_ids: Dict[int, str] = {}
+    for pack in packs:
+        task_id = str(uuid.uuid4())
+        task_ids.update((i, task_id) for i in pack)
+    docs = [
+        Document(
+            id=None,
+            collection_id=item.collection_id,
+            user_id=user_id,
+            title=item.title,
+            file_path=item.path,
+            file_size=item.size,
+            uploaded_at=uploaded_at,
+            status=DocumentStatus.PENDING,
+            task_id=task_ids[i],
+            batch_id=batch_id,
+            doc_metadata={"batch_id": batch_id},
+        )
+        for i, item in enumerate(items)
+    ]
+    return docs, packs
+
+
+def enqueue_batch(app: Celery, docs: Sequence[Document], packs: Sequence[List[int]]) -> GroupResult:
+    """Send one group with a task per pack; single documents use the regular ``ingest_document`` task."""
+    signatures = []
+    for pack in packs:
+        first = docs[pack[0]]
+        if len(pack) == 1:
+            signature = app.signature("ingest_document", args=(first.id, first.file_path, first.title, ""))
+        else:
+            signature = app.signature(
+                "ingest_documents", args=([[docs[i].id, docs[i].file_path, docs[i].title] for i in pack],)
+            )
+        signatures.append(signature.set(task_id=first.task_id))
+    result = group(signatures).apply_async()
+    result.save()  # restorable with GroupResult.restore(result.id)
+    return result
+
+
+def batch_progress(docs: Sequence[Document], task_meta: Callable[[str], Dict[str, Any] | None]) -> Dict[str, Any]:
+    """Aggregate status of a batch's *docs*.
+
+    Finished documents count as 100%, pending ones as 0%; a document that is
+    being processed reports the progress its task publishes (*task_meta*
+    returns a task's ``PROGRESS`` meta), or else the last progress stored on
+    the row.
+    """
+    counts = {status.value: 0 for status in DocumentStatus}
+    total_progress = 0
+    metas: Dict[str, Dict[str, Any] | None] = {}
+    for doc in docs:
+        counts[doc.status.value] += 1
+        if doc.status in (DocumentStatus.COMPLETE, DocumentStatus.FAILED):
+            total_progress += 100
+        elif doc.status == DocumentStatus.PROCESSING:
+            if doc.task_id and doc.task_id not in metas:
+                metas[doc.task_id] = task_meta(doc.task_id)
+            meta = metas.get(doc.task_id) or {}
+            if meta.get("document_id") == doc.id:
+                total_progress += int(meta.get("progress", 0))
+            else:
+                stored = doc.processing_progress
+                if isinstance(stored, str):  # the worker stores it JSON-encoded
+                    stored = json.loads(stored or "{}")
+                total_progress += int((stored or {}).get("progress", 0))
+    finished = counts[DocumentStatus.COMPLETE.value] + counts[DocumentStatus.FAILED.value]
+    return {
+        "documents": len(docs),
+        "counts": counts,
+        "progress": round(total_progress / len(docs)) if docs else 100,
+        "done": finished == len(docs),
+        "tasks": len({doc.task_id for doc in docs}),
+    }
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+"""Diff-based re-ingestion of an edited document.
+
+Re-uploading a document normally re-embeds and rewrites every chunk.  With
+``incremental=True`` the worker first loads the content hash and embedding
+of each stored chunk (`ChunkDiff.load`) and then, as the new text is split:
+
+* a chunk whose hash matches the stored chunk at the same position is
+  *kept*: its row and vector are left untouched;
+* a chunk whose text is stored at another position was *moved*: its old
+  embedding is reused (`ChunkDiff.embedder`), only its row and vector are
+  rewritten at the new position;
+* any other chunk is embedded and upserted;
+* stored positions past the new end are *removed* from ``chunks`` and from
+  the vector store.
+
+Chunks stored before content hashes existed never match, so the first
+incremental run over such a document re-embeds it completely.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from privategpt.core.domain.chunk import content_hash
+from privategpt.core.ports.embedder import EmbedderPort, EmbeddingMatrix, ProgressCallback
+from privategpt.infra.database.models import Chunk
+
+
+@dataclass
+class ChunkDiff:
+    """Stored chunks of one document, matched against its new chunks by hash and position."""
+
+    old_hashes: Dict[int, str | None]  # position -> content hash
+    vectors: Dict[str, str]  # content hash -> stored embedding (JSON)
+    counts: Dict[str, int] = field(default_factory=lambda: {"kept": 0, "moved": 0, "embedded": 0, "removed": 0})
+    _changed: Dict[int, List[int]] = field(default_factory=dict, repr=False)
+    _seen: int = 0  # chunks passed through `embedder`
+
+    @classmethod
+    def load(cls, session: Session, document_id: int) -> "ChunkDiff":
+        old_hashes: Dict[int, str | None] = {}
+        vectors: Dict[str, str] = {}
+        query = session.query(Chunk.position, Chunk.content_hash, Chunk.embedding).filter(
+            Chunk.document_id == document_id
+        )
+        for position, digest, embedding in query:
+            old_hashes[position] = digest
+            if digest and embedding:
+                vectors.setdefault(digest, embedding)
+        return cls(old_hashes, vectors)
+
+    def changed(self, position: int, parts: List[str]) -> List[int]:
+        """Indices into the window at *position* that must be (re)written.
+
+        Computed once per window, so every sink sees the same answer and the
+        counts are not doubled.
+        """
+        indices = self._changed.get(position)
+        if indices is None:
+            indices = [i for i, part in enumerate(parts) if self.old_hashes.get(position + i) != content_hash(part)]
+            self._changed[position] = indices
+            self.counts["kept"] += len(parts) - len(indices)
+        return indices
+
+    def removed_positions(self, total: int) -> List[int]:
+        """Stored positions past the end of a document that now has *total* chunks."""
+        removed = sorted(p for p in self.old_hashes if p >= total)
+        self.counts["removed"] = len(removed)
+        return removed
+
+    def embedder(self, inner: EmbedderPort) -> "ReusingEmbedder":
+        return ReusingEmbedder(inner, self)
+
+    def report(self) -> Dict[str, int]:
+        # every chunk is kept, moved (embedding reused) or embedded
+        self.counts["moved"] = self._seen - self.counts["kept"] - self.counts["embedded"]
+        return {**self.counts, "reused": self.counts["kept"] + self.counts["moved"]}
+
+
+class ReusingEmbedder:
+    """Embedder that returns stored vectors for known chunk texts and embeds only the rest."""
+
+    def __init__(self, inner: EmbedderPort, diff: ChunkDiff):
+        self.inner = inner
+        self.diff = diff
+
+    async def embed_documents(
+        self, texts: List[str], on_progress: ProgressCallback | None = None
+    ) -> EmbeddingMatrix:
+        digests = [content_hash(t) for t in texts]
+        missing = [i for i, d in enumerate(digests) if d not in self.diff.vectors]
+        fresh = await self.inner.embed_documents([texts[i] for i in missing], on_progress) if missing else None
+        self.diff._seen += len(texts)
+        self.diff.counts["embedded"] += len(missing)
+        if fresh is not None and len(missing) == len(texts):
+            return fresh
+
+        reused = {
+            d: np.asarray(json.loads(self.diff.vectors[d]), dtype=np.float32)
+            for d in digests
+            if d in self.diff.vectors
+        }
+        dim = fresh.shape[1] if fresh is not None else len(next(iter(reused.values())))
+        matrix = np.empty((len(texts), dim), dtype=np.float32)
+        for i, digest in enumerate(digests):
+            if digest in reused:
+                matrix[i] = reused[digest]
+        if fresh is not None:
+            matrix[missing] = fresh
+        return matrix
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
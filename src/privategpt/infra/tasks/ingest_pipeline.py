@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+"""Overlapping ingestion stages for the Celery worker.
+
+`embed_windows` runs read/split, embed and write strictly in turn, so the CPU
+idles while Weaviate and Postgres are written and the network idles while
+windows are embedded.  `pipeline_windows` runs the same steps as concurrent
+stages joined by bounded queues::
+
+    split (thread) ──▶ embed ──▶ sink 1 ──▶ sink 2 …
+
+so window N+1 is split and embedded while window N is written.  Each queue
+holds at most ``INGEST_PIPELINE_QUEUE`` windows, which bounds memory to about
+``stages + queues`` windows.  The first error in any stage cancels the others
+and is re-raised once every thread a stage started has returned, so no
+blocking sink is still writing on a connection the caller rolls back.  Busy time and window counts per stage are collected in
+`PipelineTimings`, which the worker reports with its progress updates.
+
+Celery tasks run their coroutines on `worker_loop`, one event loop per
+process, instead of a fresh ``asyncio.run`` loop per document.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Iterable, List, Sequence, Tuple, TypeVar
+
+from privategpt.core.ports.embedder import EmbedderPort
+from privategpt.infra.tasks.ingest_stream import WindowSink, iter_windows
+from privategpt.shared.logging import get_logger
+from privategpt.shared.settings import settings  # type: ignore[attr-defined]
+
+logger = get_logger("ingest.pipeline")
+
+T = TypeVar("T")
+_DONE = object()
+
+
+@dataclass
+class PipelineTimings:
+    """Seconds each stage spent working (not waiting on its queues), and windows seen."""
+
+    busy_s: Dict[str, float] = field(default_factory=dict)
+    windows: Dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.busy_s[stage] = self.busy_s.get(stage, 0.0) + seconds
+        self.windows[stage] = self.windows.get(stage, 0) + 1
+
+    @property
+    def wall_s(self) -> float:
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_s": round(self.wall_s, 3),
+            "stages": {
+                name: {"busy_s": round(busy, 3), "windows": self.windows[name]} for name, busy in self.busy_s.items()
+            },
+        }
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {busy:.1f}s" for name, busy in self.busy_s.items())
+
+
+async def pipeline_windows(
+    chunks: Iterable[str],
+    embedder: EmbedderPort,
+    sinks: Sequence[Tuple[str, WindowSink]],
+    window_chunks: int | None = None,
+    queue_windows: int | None = None,
+    on_window: Callable[[int, PipelineTimings], None] | None = None,
+    timings: PipelineTimings | None = None,
+) -> int:
+    """Split, embed and hand *chunks* to the named *sinks* as overlapping stages.
+
+    Windows reach every sink in order, one at a time per sink.  Returns the
+    number of chunks processed; *on_window* is called with the running total
+    once a window has passed the last sink.
+    """
+    timings = timings if timings is not None else PipelineTimings()
+    queue_size = max(queue_windows or settings.ingest_pipeline_queue, 1)
+    windows = iter_windows(chunks, window_chunks or settings.ingest_window_chunks)
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in range(len(sinks) + 1)]
+
+    async def split() -> None:
+        # reading and splitting are blocking, so they run off the event loop
+        position = 0
+        while True:
+            started = time.perf_counter()
+            window = await _to_thread(next, windows, None)
+            if window is None:
+                break
+            timings.add("split", time.perf_counter() - started)
+            await queues[0].put((position, window, None))
+            position += len(window)
+        await queues[0].put(_DONE)
+
+    async def embed() -> None:
+        while (item := await queues[0].get()) is not _DONE:
+            position, window, _ = item
+            started = time.perf_counter()
+            vectors = await embedder.embed_documents(window)
+            timings.add("embed", time.perf_counter() - started)
+            await queues[1].put((position, window, vectors))
+        await queues[1].put(_DONE)
+
+    done = 0
+
+    async def sink_stage(index: int, name: str, sink: WindowSink) -> None:
+        nonlocal done
+        last = index == len(sinks) - 1
+        while (item := await queues[index + 1].get()) is not _DONE:
+            position, window, vectors = item
+            started = time.perf_counter()
+            await sink(position, window, vectors)
+            timings.add(name, time.perf_counter() - started)
+            if last:
+                done = position + len(window)
+                if on_window is not None:
+                    on_window(done, timings)
+            else:
+                await queues[index + 2].put(item)
+        if not last:
+            await queues[index + 2].put(_DONE)
+
+    tasks = [asyncio.create_task(split()), asyncio.create_task(embed())]
+    tasks += [asyncio.create_task(sink_stage(i, name, sink)) for i, (name, sink) in enumerate(sinks)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    logger.info("ingest.pipeline.done", chunks=done, **timings.to_dict())
+    return done
+
+
+async def _to_thread(fn: Callable[..., T], *args: Any) -> T:
+    """``asyncio.to_thread`` that, when cancelled, returns only after the thread has.
+
+    Threads cannot be interrupted: cancelling a plain ``to_thread`` await
+    leaves the call running behind the caller's back.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+
+def in_thread(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Wrap a blocking sink (e.g. a sync SQLAlchemy write) to run in a worker thread.
+
+    A cancelled sink waits for its thread to return before it stops.
+    """
+
+    async def run(*args: Any) -> T:
+        return await _to_thread(fn, *args)
+
+    return run
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_pid = 0
+_loop_lock = threading.Lock()
+
+
+def worker_loop() -> asyncio.AbstractEventLoop:
+    """This process's event loop for Celery task coroutines (recreated after fork)."""
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+            _loop, _loop_pid = asyncio.new_event_loop(), os.getpid()
+        return _loop
+
+
+def run_in_worker_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """``asyncio.run`` for Celery tasks, without a new event loop per call."""
+    return worker_loop().run_until_complete(coro)
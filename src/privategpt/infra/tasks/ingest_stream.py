@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+"""Bounded-memory document ingestion.
+
+Uploads are spooled to ``INGEST_SPOOL_DIR`` (a volume shared by rag-service and
+the Celery workers) and only the file path travels through the broker.  The
+worker then reads the file in fixed-size blocks, splits it with
+`RecursiveTokenSplitter.iter_chunks_stream` and embeds/stores the chunks in
+windows of ``INGEST_WINDOW_CHUNKS``, so peak memory follows the window size
+instead of the document size.
+"""
+
+import asyncio
+import codecs
+import os
+import shutil
+import uuid
+from itertools import islice
+from pathlib import Path
+from typing import IO, Awaitable, Callable, Iterable, Iterator, List
+
+from privategpt.core.ports.embedder import EmbedderPort, EmbeddingMatrix
+from privategpt.shared.logging import get_logger
+from privategpt.shared.settings import settings  # type: ignore[attr-defined]
+
+logger = get_logger("ingest.stream")
+
+# (position of the first chunk, chunk texts, their embeddings)
+WindowSink = Callable[[int, List[str], EmbeddingMatrix], Awaitable[None]]
+
+
+def _new_spool_path(suffix: str) -> Path:
+    directory = Path(settings.ingest_spool_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{uuid.uuid4().hex}{suffix}"
+
+
+def spool_upload(src: IO[bytes], suffix: str = ".txt") -> Path:
+    """Copy an uploaded file object to the spool directory block by block."""
+    path = _new_spool_path(suffix)
+    with open(path, "wb") as dst:
+        shutil.copyfileobj(src, dst, length=settings.ingest_read_block_bytes)
+    logger.info("ingest.spool", path=str(path), bytes=path.stat().st_size)
+    return path
+
+
+def spool_text(text: str) -> Path:
+    """Write request text to the spool directory so it need not ride the broker."""
+    path = _new_spool_path(".txt")
+    path.write_text(text, encoding="utf-8")
+    logger.info("ingest.spool", path=str(path), chars=len(text))
+    return path
+
+
+def remove_spool(path: str | Path) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class TextBlockReader:
+    """Iterate a text file (path or binary handle) as decoded blocks.
+
+    Multi-byte characters split across block boundaries are handled by an
+    incremental decoder; undecodable bytes are replaced.  ``bytes_read`` and
+    ``total_bytes`` allow progress reporting while iterating.
+    """
+
+    def __init__(self, source: str | Path | IO[bytes], block_bytes: int | None = None, encoding: str = "utf-8"):
+        self.source = source
+        self.block_bytes = block_bytes or settings.ingest_read_block_bytes
+        self.encoding = encoding
+        self.bytes_read = 0
+        self.total_bytes = 0
+
+    @property
+    def fraction(self) -> float:
+        return self.bytes_read / self.total_bytes if self.total_bytes else 1.0
+
+    def __iter__(self) -> Iterator[str]:
+        if isinstance(self.source, (str, Path)):
+            with open(self.source, "rb") as fp:
+                yield from self._read(fp)
+        else:
+            yield from self._read(self.source)
+
+    def _read(self, fp: IO[bytes]) -> Iterator[str]:
+        try:
+            self.total_bytes = os.fstat(fp.fileno()).st_size - fp.tell()
+        except (AttributeError, OSError, ValueError):  # in-memory or spooled handle
+            self.total_bytes = 0
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        while True:
+            raw = fp.read(self.block_bytes)
+            if not raw:
+                break
+            self.bytes_read += len(raw)
+            text = decoder.decode(raw)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def iter_windows(chunks: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(chunks)
+    while window := list(islice(iterator, max(size, 1))):
+        yield window
+
+
+async def embed_windows(
+    chunks: Iterable[str],
+    embedder: EmbedderPort,
+    sink: WindowSink,
+    window_chunks: int | None = None,
+    on_window: Callable[[int], None] | None = None,
+) -> int:
+    """Embed *chunks* window by window and hand each window to *sink*.
+
+    Returns the number of chunks processed.  Nothing from a finished window
+    is kept once *sink* returns.
+    """
+    done = 0
+    windows = iter_windows(chunks, window_chunks or settings.ingest_window_chunks)
+    while True:
+        # reading and splitting block, so they run off the event loop
+        window = await asyncio.to_thread(next, windows, None)
+        if window is None:
+            break
+        vectors = await embedder.embed_documents(window)
+        await sink(done, window, vectors)
+        done += len(window)
+        if on_window is not None:
+            on_window(done)
+    return done
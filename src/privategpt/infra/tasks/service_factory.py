@@ -1,24 +1,222 @@
 from __future__ import annotations
 
+import os
+from functools import lru_cache
+from typing import List
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from privategpt.core.domain.collection import CollectionSettings
+from privategpt.core.ports.embedder import EmbedderPort
+from privategpt.core.ports.vector_store import VectorStorePort
 from privategpt.infra.database.document_repository import SqlDocumentRepository
 from privategpt.infra.database.chunk_repository import SqlChunkRepository
-from privategpt.infra.splitters.simple import SimpleSplitterAdapter
+from privategpt.infra.splitters.recursive import RecursiveTokenSplitter
 from privategpt.infra.embedder.bge_adapter import BgeEmbedderAdapter
+from privategpt.infra.embedder.batching import MicroBatchingEmbedder
+from privategpt.infra.embedder.onnx_adapter import OnnxEmbedderAdapter
+from privategpt.infra.embedder.model_pool import BACKENDS, parse_model_spec
+from privategpt.infra.embedder.process_pool import ProcessPoolEmbedder, ThreadPlan, plan_threads
+from privategpt.infra.embedder.cache import CachedEmbedderAdapter, LruVectorCache, SqliteVectorCache
+from privategpt.infra.vector_store.hnsw import HnswVectorStore
+from privategpt.infra.vector_store.ivfpq import IvfPqVectorStore
+from privategpt.infra.vector_store.segmented import SegmentedVectorStore
 from privategpt.infra.vector_store.weaviate_adapter import WeaviateAdapter
 from privategpt.services.rag.core.service import RagService
 from privategpt.infra.chat.echo import EchoChatAdapter
+from privategpt.shared.logging import get_logger
+from privategpt.shared.settings import settings  # type: ignore[attr-defined]
+
+logger = get_logger("tasks.service_factory")
+
+# prefork concurrency of the running Celery worker, recorded in its main process
+_worker_concurrency: int | None = None
+
+
+@lru_cache(maxsize=1)
+def _document_vector_cache() -> SqliteVectorCache:
+    return SqliteVectorCache(settings.embed_cache_path, max_entries=settings.embed_cache_max_entries)
+
+
+@lru_cache(maxsize=1)
+def _query_vector_cache() -> LruVectorCache:
+    return LruVectorCache(max_entries=settings.embed_query_cache_size)
+
+
+def resolve_model_spec(model_name: str | None = None) -> str:
+    """Qualify *model_name* with ``EMBED_BACKEND`` unless it names a backend itself."""
+    name = model_name or settings.embed_model
+    backend, bare = parse_model_spec(name)
+    if backend == "torch" and settings.embed_backend in BACKENDS and settings.embed_backend != "torch":
+        return f"{settings.embed_backend}:{bare}"
+    return name
+
+
+def set_worker_concurrency(concurrency: int) -> None:
+    """Record the Celery worker's real prefork concurrency (``-c`` wins over ``CELERY_CONCURRENCY``)."""
+    global _worker_concurrency
+    _worker_concurrency = concurrency or None
+
+
+def ingestion_thread_plan() -> ThreadPlan:
+    """Core split between Celery children, embedding workers and intra-op threads."""
+    return plan_threads(
+        parent_processes=_worker_concurrency or settings.celery_concurrency or (os.cpu_count() or 1),
+        workers=settings.embed_worker_processes if settings.embed_process_pool else 1,
+    )
+
+
+def warn_if_process_pool_idle(plan: ThreadPlan, pool: str = "") -> None:
+    """Warn when ``EMBED_PROCESS_POOL`` cannot shard.
+
+    Prefork children are daemons and may not start processes; otherwise the
+    pool is idle when each child's core share fits only one worker.
+    """
+    if not settings.embed_process_pool:
+        return
+    if pool == "prefork":
+        logger.warning(
+            "embedder.process_pool.disabled",
+            reason="prefork children are daemonic and cannot start embedding workers; run the worker with --pool=solo",
+            pool=pool,
+        )
+    elif plan.workers <= 1:
+        logger.warning(
+            "embedder.process_pool.disabled",
+            reason="one embedding worker per Celery child; lower CELERY_CONCURRENCY to give each child spare cores",
+            **plan.to_dict(),
+        )
+
+
+def preload_model_names() -> List[str]:
+    """Models that should be loaded eagerly when a service or worker starts."""
+    extra = [m.strip() for m in settings.embed_preload_models.split(",") if m.strip()]
+    return list(dict.fromkeys(resolve_model_spec(m) for m in [settings.embed_model, *extra]))
+
+
+def build_splitter(collection_settings: CollectionSettings | None = None) -> RecursiveTokenSplitter:
+    """Token-aware splitter sized by the collection's ``default_chunk_size``."""
+    chunk_size = (collection_settings or CollectionSettings()).default_chunk_size
+    return RecursiveTokenSplitter(chunk_size=chunk_size, chunk_overlap=settings.split_chunk_overlap)
+
+
+@lru_cache(maxsize=None)
+def build_embedder(model_name: str | None = None, ingestion: bool = False) -> EmbedderPort:
+    """Return the process-wide embedder for *model_name* (default: ``EMBED_MODEL``).
+
+    Adapters share weights through the model pool and vectors through the
+    process-wide cache, so one instance per model is kept for the process.
+    Only the *ingestion* embedder of Celery workers shards documents over the
+    ``EMBED_PROCESS_POOL``; API processes embed in-process.
+    """
+
+    spec = resolve_model_spec(model_name)
+    backend, name = parse_model_spec(spec)
+    base: EmbedderPort
+    if backend == "torch":
+        base = BgeEmbedderAdapter(
+            name,
+            token_budget=settings.embed_token_budget,
+            max_batch=settings.embed_document_max_batch,
+        )
+    else:
+        base = OnnxEmbedderAdapter(
+            name,
+            quantized=backend == "onnx-int8",
+            token_budget=settings.embed_token_budget,
+            max_batch=settings.embed_document_max_batch,
+        )
+    embedder: EmbedderPort = base
+    if ingestion and settings.embed_process_pool:
+        embedder = ProcessPoolEmbedder(
+            embedder,
+            model_spec=spec,
+            plan=ingestion_thread_plan(),
+            min_chunks=settings.embed_process_pool_min_chunks,
+            token_budget=settings.embed_token_budget,
+            max_batch=settings.embed_document_max_batch,
+        )
+    if settings.embed_query_batching:
+        embedder = MicroBatchingEmbedder(
+            embedder,
+            max_wait_ms=settings.embed_batch_window_ms,
+            max_batch=settings.embed_batch_max_size,
+        )
+    if not settings.embed_cache_enabled:
+        return embedder
+    return CachedEmbedderAdapter(
+        embedder,
+        # ONNX and torch vectors drift slightly, so they are cached apart
+        model_name=spec,
+        store=_document_vector_cache(),
+        query_cache=_query_vector_cache(),
+    )
+
+
+@lru_cache(maxsize=1)
+def _hnsw_store() -> HnswVectorStore:
+    return HnswVectorStore(
+        settings.hnsw_path,
+        M=settings.hnsw_m,
+        ef_construction=settings.hnsw_ef_construction,
+        ef_search=settings.hnsw_ef_search,
+        snapshot_rows=settings.hnsw_snapshot_rows,
+    )
+
+
+@lru_cache(maxsize=1)
+def _segmented_store() -> SegmentedVectorStore:
+    return SegmentedVectorStore(
+        settings.segment_path,
+        compact_min_rows=settings.segment_compact_min_rows,
+        compact_max_small=settings.segment_compact_max_small,
+        dedup=settings.segment_dedup,
+    )
+
+
+@lru_cache(maxsize=1)
+def _ivfpq_store() -> IvfPqVectorStore:
+    return IvfPqVectorStore(
+        settings.ivfpq_path,
+        nlist=settings.ivfpq_nlist,
+        m=settings.ivfpq_m,
+        nprobe=settings.ivfpq_nprobe,
+        rerank=settings.ivfpq_rerank,
+        train_min_rows=settings.ivfpq_train_min_rows,
+        compact_min_rows=settings.segment_compact_min_rows,
+        compact_max_small=settings.segment_compact_max_small,
+    )
+
+
+@lru_cache(maxsize=1)
+def _weaviate_store() -> WeaviateAdapter:
+    return WeaviateAdapter(settings.weaviate_url, multi_tenancy=settings.weaviate_multi_tenancy)
+
+
+def build_vector_store() -> VectorStorePort:
+    """Vector store selected by ``VECTOR_STORE``.
+
+    Every store is opened once per process.  The local stores pick up changes
+    made by other processes on their own.  Weaviate shares one client per process (see
+    `weaviate_client`).
+    """
+    if settings.vector_store == "hnsw":
+        return _hnsw_store()
+    if settings.vector_store == "segmented":
+        return _segmented_store()
+    if settings.vector_store == "ivfpq":
+        return _ivfpq_store()
+    return _weaviate_store()
 
 
 def build_rag_service(session: AsyncSession) -> RagService:  # noqa: D401
     """Assemble a `RagService` with production adapters."""
 
-    splitter = SimpleSplitterAdapter()
-    embedder = BgeEmbedderAdapter()
-    vector_store = WeaviateAdapter()
+    splitter = build_splitter()
+    embedder = build_embedder()
+    vector_store = build_vector_store()
     doc_repo = SqlDocumentRepository(session)
     chunk_repo = SqlChunkRepository(session)
     chat_llm = EchoChatAdapter()  # replace with real LLM adapter later
 
-    return RagService(doc_repo, splitter, embedder, vector_store, chunk_repo, chat_llm) 
\ No newline at end of file
+    return RagService(doc_repo, splitter, embedder, vector_store, chunk_repo, chat_llm)
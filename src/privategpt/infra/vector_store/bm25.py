@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+"""Incrementally maintained BM25 index over the chunk text of a row-based store.
+
+Postings are ``term -> {row: term frequency}`` and are updated as rows are
+appended, replaced or removed, so the index never has to be rebuilt.  At
+query time the postings of each query term are turned into NumPy arrays
+(cached until the term changes) and scored in one pass.  The cost of a query
+is bounded by the postings it reads: at most ``max_terms`` distinct terms are
+used, and terms found in more than ``max_df_ratio`` of the rows – which carry
+almost no BM25 weight – are skipped when rarer terms are present.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; ``"INV-2024/17"`` gives ``["inv", "2024", "17"]``."""
+    return _TOKEN.findall(text.lower())
+
+
+class Bm25Index:
+    """Okapi BM25 over one text per store row, rows numbered like the store's."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_terms: int = 32, max_df_ratio: float = 0.5):
+        self.k1, self.b = k1, b
+        self.max_terms = max_terms
+        self.max_df_ratio = max_df_ratio
+        self._reset()
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._terms: List[Dict[str, int]] = []  # row -> term counts, for removal
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._docs = 0  # rows with text
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def append(self, text: str | None) -> None:
+        row = len(self._terms)
+        if row == len(self._lengths):
+            grown = np.zeros(max(1024, 2 * row), dtype=np.float32)
+            grown[:row] = self._lengths
+            self._lengths = grown
+        self._terms.append({})
+        self._link(row, text)
+
+    def replace(self, row: int, text: str | None) -> None:
+        self.remove(row)
+        self._link(row, text)
+
+    def remove(self, row: int) -> None:
+        counts = self._terms[row]
+        if not counts:
+            return
+        for term in counts:
+            postings = self._postings[term]
+            del postings[row]
+            if not postings:
+                del self._postings[term]
+            self._arrays.pop(term, None)
+        self._docs -= 1
+        self._total_length -= int(self._lengths[row])
+        self._lengths[row] = 0
+        self._terms[row] = {}
+
+    def keep(self, rows: Sequence[int]) -> None:
+        """Keep only *rows*, renumbered ``0..len(rows)-1`` in the given order."""
+        kept = [self._terms[i] for i in rows]
+        self._reset()
+        for counts in kept:
+            row = len(self._terms)
+            self.append(None)
+            self._link_counts(row, counts)
+
+    def scores(self, query: str, top_n: int, rows: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Best *top_n* rows for *query* (limited to *rows* if given) and their scores, best first."""
+        terms = list(dict.fromkeys(t for t in tokenize(query) if t in self._postings))[: self.max_terms]
+        if not terms or top_n <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        rare = [t for t in terms if len(self._postings[t]) <= self.max_df_ratio * self._docs]
+        terms = rare or terms
+
+        avg_length = self._total_length / max(self._docs, 1)
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[: len(self._terms)] / max(avg_length, 1e-9))
+        total = np.zeros(len(self._terms), dtype=np.float32)
+        for term in terms:
+            posted, tf = self._posting_arrays(term)
+            df = len(posted)
+            idf = math.log(1 + (self._docs - df + 0.5) / (df + 0.5))
+            total[posted] += idf * tf * (self.k1 + 1) / (tf + norm[posted])
+
+        if rows is not None:
+            candidates = rows[total[rows] > 0]
+        else:
+            candidates = np.flatnonzero(total)
+        scores = total[candidates]
+        if top_n < len(candidates):
+            best = np.argpartition(-scores, top_n - 1)[:top_n]
+            candidates, scores = candidates[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return candidates[order], scores[order]
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.intp, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+        return arrays
+
+    def _link(self, row: int, text: str | None) -> None:
+        self._link_counts(row, dict(Counter(tokenize(text or ""))))
+
+    def _link_counts(self, row: int, counts: Dict[str, int]) -> None:
+        if not counts:
+            return
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[row] = tf
+            self._arrays.pop(term, None)
+        length = sum(counts.values())
+        self._terms[row] = counts
+        self._lengths[row] = length
+        self._docs += 1
+        self._total_length += length
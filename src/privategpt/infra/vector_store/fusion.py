@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+"""Reciprocal rank fusion of a vector and a lexical ranking."""
+
+from typing import Dict, List, Sequence, Tuple
+
+RRF_K = 60  # damping constant from the original RRF paper
+
+
+def reciprocal_rank_fusion(
+    vector_ids: Sequence[str],
+    lexical_ids: Sequence[str],
+    alpha: float = 0.5,
+    top_k: int = 5,
+    k: int = RRF_K,
+) -> List[Tuple[str, float]]:
+    """Fuse two best-first id rankings into ``(id, score)`` pairs, best first.
+
+    Each id scores ``alpha / (k + vector rank) + (1 - alpha) / (k + lexical
+    rank)``, ranks starting at 1; an id missing from one ranking gets nothing
+    from it.  ``alpha=1`` is pure vector order and ``alpha=0`` pure lexical, as
+    with Weaviate's ``hybrid``.
+    """
+    alpha = min(max(alpha, 0.0), 1.0)
+    fused: Dict[str, float] = {}
+    for weight, ranking in ((alpha, vector_ids), (1.0 - alpha, lexical_ids)):
+        if weight == 0.0:
+            continue
+        for rank, eid in enumerate(ranking, start=1):
+            fused[eid] = fused.get(eid, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
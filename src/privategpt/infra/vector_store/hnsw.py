@@ -0,0 +1,660 @@
+from __future__ import annotations
+
+"""Local HNSW vector store for single-node deployments without Weaviate.
+
+`HnswIndex` is a small NumPy implementation of Hierarchical Navigable Small
+World graphs (Malkov & Yashunin): cosine similarity on L2-normalised rows,
+neighbour selection by the diversity heuristic, ``M``/``ef_construction``/
+``ef_search`` as the usual knobs.  Layer 0 adjacency is a fixed-width int32
+matrix so that it can be saved as ``.npy`` and memory-mapped back in.
+
+`HnswVectorStore` wraps the index with string ids, upserts, tombstone deletes
+(rebuilt away past ``compact_ratio``) and the metadata filters of
+`VectorStorePort`.  Filtered searches whose candidate set is small are scored
+exactly; larger ones walk the graph and only accept matching rows.
+
+On disk the graph lives in a generation directory named by ``CURRENT``.
+Writes never rewrite it: each `add_vectors`/`delete_vectors` call takes an
+exclusive ``flock`` just long enough to append one record to the
+generation's ``delta.log``.  Every process replays new records on its next
+search; added rows join an unlinked tail that is scored exactly.  Once the
+tail reaches ``snapshot_rows`` (or tombstones pass ``compact_ratio``),
+`snapshot` links it into the graph and writes a new generation, switching
+``CURRENT`` atomically, so readers never see a half-written index.
+"""
+
+import fcntl
+import json
+import math
+import os
+import shutil
+import struct
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from privategpt.core.ports.embedder import EmbeddingMatrix, EmbeddingVector, as_embedding_matrix
+from privategpt.core.ports.vector_store import VectorStorePort, normalize_filters
+from privategpt.infra.vector_store.metadata_index import MetadataIndex
+from privategpt.shared.logging import get_logger
+
+logger = get_logger("vector.hnsw")
+
+_CURRENT = "CURRENT"
+_DELTA = "delta.log"
+_LOCK = ".lock"
+_SNAPSHOT_LOCK = ".snapshot.lock"
+# delta record: header length, body length, JSON header, float32 body
+_RECORD = struct.Struct("<II")
+_REFRESH_ATTEMPTS = 3
+# candidates expanded together in one step of a layer search
+_EXPAND = 8
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class HnswIndex:
+    """HNSW graph over normalised float32 rows; nodes are numbered in insertion order."""
+
+    def __init__(
+        self,
+        dim: int,
+        M: int = 16,
+        ef_construction: int = 128,
+        ef_search: int = 64,
+        capacity: int = 1024,
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.M = max(M, 2)
+        self.M0 = 2 * self.M
+        self.ef_construction = max(ef_construction, self.M)
+        self.ef_search = ef_search
+        self._level_mult = 1 / math.log(self.M)
+        self._rng = np.random.default_rng(seed)
+        capacity = max(capacity, 1)
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.layer0 = np.full((capacity, self.M0), -1, dtype=np.int32)
+        self.levels = np.zeros(capacity, dtype=np.int8)
+        self.deleted = np.zeros(capacity, dtype=bool)
+        self.upper: Dict[int, Dict[int, List[int]]] = {}  # level -> node -> neighbours
+        self.count = 0
+        self.linked = 0  # nodes [0, linked) are in the graph, the rest only appended
+        self.entry = -1
+        self.max_level = -1
+
+    # -- storage ------------------------------------------------------------
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.vectors)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        n = self.count
+
+        def grown(array: np.ndarray, fill) -> np.ndarray:
+            out = np.full((capacity, *array.shape[1:]), fill, dtype=array.dtype)
+            out[:n] = array[:n]
+            return out
+
+        # also turns memory-mapped arrays into private in-memory ones
+        self.vectors = grown(self.vectors, 0)
+        self.layer0 = grown(self.layer0, -1)
+        self.levels = grown(self.levels, 0)
+        self.deleted = grown(self.deleted, False)
+
+    def _neighbours(self, node: int, level: int) -> List[int]:
+        if level == 0:
+            row = self.layer0[node]
+            return row[row >= 0].tolist()
+        return self.upper[level].get(node, [])
+
+    def _set_neighbours(self, node: int, level: int, neighbours: List[int]) -> None:
+        if level == 0:
+            self.layer0[node] = -1
+            self.layer0[node, : len(neighbours)] = neighbours
+        else:
+            self.upper[level][node] = list(neighbours)
+
+    # -- graph search -------------------------------------------------------
+
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        entry_points: List[int],
+        ef: int,
+        level: int,
+        accept: np.ndarray | None = None,
+    ) -> List[Tuple[float, int]]:
+        """Best ≤ *ef* ``(similarity, node)`` pairs on *level*, best first.
+
+        Rejected nodes (``accept[node]`` false) are traversed but not returned.
+        """
+        visited = np.zeros(self.count, dtype=bool)
+        slot = np.empty(self.count, dtype=np.intp)  # scratch for de-duplication
+        entry = np.asarray(entry_points, dtype=np.intp)
+        visited[entry] = True
+        cand_n = entry
+        cand_s = self.vectors[entry] @ query
+        ok = accept[entry] if accept is not None else slice(None)
+        res_n, res_s = cand_n[ok], cand_s[ok]
+
+        while len(cand_n):
+            bound = res_s.min() if len(res_s) >= ef else -np.inf
+            # candidates worse than the worst kept result can never improve it
+            alive = cand_s >= bound
+            if not alive.any():
+                break
+            cand_n, cand_s = cand_n[alive], cand_s[alive]
+            # expand the best few candidates together: one gather and one
+            # matrix product per step instead of a Python iteration per node
+            if len(cand_n) > _EXPAND:
+                pick = np.argpartition(-cand_s, _EXPAND - 1)[:_EXPAND]
+                rest = np.ones(len(cand_n), dtype=bool)
+                rest[pick] = False
+                nodes, cand_n, cand_s = cand_n[pick], cand_n[rest], cand_s[rest]
+            else:
+                nodes, cand_n, cand_s = cand_n, cand_n[:0], cand_s[:0]
+            if level == 0:
+                fresh = self.layer0[nodes].ravel()
+                fresh = fresh[fresh >= 0]
+            else:
+                adjacency = self.upper[level]
+                fresh = np.fromiter((n for node in nodes.tolist() for n in adjacency.get(node, ())), dtype=np.intp)
+            fresh = fresh[~visited[fresh]]
+            if not len(fresh):
+                continue
+            # neighbours shared by several expanded nodes: keep one copy
+            order = np.arange(len(fresh))
+            slot[fresh] = order
+            fresh = fresh[slot[fresh] == order]
+            visited[fresh] = True
+            scores = self.vectors[fresh] @ query
+            better = scores > bound
+            fresh, scores = fresh[better], scores[better]
+            cand_n, cand_s = np.concatenate([cand_n, fresh]), np.concatenate([cand_s, scores])
+            if accept is not None:
+                ok = accept[fresh]
+                fresh, scores = fresh[ok], scores[ok]
+            res_n, res_s = np.concatenate([res_n, fresh]), np.concatenate([res_s, scores])
+            if len(res_n) > ef:
+                top = np.argpartition(-res_s, ef - 1)[:ef]
+                res_n, res_s = res_n[top], res_s[top]
+
+        order = np.argsort(-res_s, kind="stable")
+        return list(zip(res_s[order].tolist(), res_n[order].tolist()))
+
+    def _select(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """Diversity heuristic: keep a candidate (best first) only if it is
+        closer to the base point than to every neighbour already kept."""
+        if len(candidates) <= 1:
+            return [n for _, n in candidates]
+        # far candidates are almost never kept; scoring them all is quadratic
+        candidates = candidates[: 3 * m]
+        sims = [s for s, _ in candidates]
+        nodes = [n for _, n in candidates]
+        pairwise = self.vectors[nodes] @ self.vectors[nodes].T
+        selected: List[int] = []
+        for i, sim in enumerate(sims):
+            if len(selected) >= m:
+                break
+            if selected and pairwise[i, selected].max() >= sim:
+                continue
+            selected.append(i)
+        return [nodes[i] for i in selected]
+
+    def _link(self, node: int, new: int, level: int) -> None:
+        neighbours = self._neighbours(node, level)
+        limit = self.M0 if level == 0 else self.M
+        if len(neighbours) < limit:
+            self._set_neighbours(node, level, neighbours + [new])
+            return
+        pool = neighbours + [new]
+        sims = (self.vectors[pool] @ self.vectors[node]).tolist()
+        ranked = sorted(zip(sims, pool), reverse=True)
+        self._set_neighbours(node, level, self._select(ranked, limit))
+
+    # -- public -------------------------------------------------------------
+
+    def append(self, vector: np.ndarray) -> int:
+        """Store a normalised *vector* without linking it into the graph yet."""
+        node = self.count
+        self._grow(node + 1)
+        self.vectors[node] = vector
+        self.levels[node] = 0
+        self.count += 1
+        return node
+
+    def link_pending(self) -> None:
+        """Link every appended node, in order, into the graph."""
+        while self.linked < self.count:
+            self._link_node(self.linked)
+
+    def insert(self, vector: np.ndarray) -> int:
+        """Add a normalised *vector*; returns its node number."""
+        node = self.append(vector)
+        self.link_pending()
+        return node
+
+    def _link_node(self, node: int) -> None:
+        vector = self.vectors[node]
+        level = min(int(-math.log(1.0 - self._rng.random()) * self._level_mult), 127)
+        self.levels[node] = level
+        self.linked = node + 1
+        for lc in range(1, level + 1):
+            self.upper.setdefault(lc, {})[node] = []
+        if self.entry < 0:
+            self.entry, self.max_level = node, level
+            return
+
+        entry = [self.entry]
+        for lc in range(self.max_level, level, -1):
+            entry = [self._search_layer(vector, entry, 1, lc)[0][1]]
+        for lc in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(vector, entry, self.ef_construction, lc)
+            neighbours = self._select(found, self.M)
+            self._set_neighbours(node, lc, neighbours)
+            for other in neighbours:
+                self._link(other, node, lc)
+            entry = [n for _, n in found]
+        if level > self.max_level:
+            self.entry, self.max_level = node, level
+
+    def search(
+        self, query: np.ndarray, k: int, ef: int | None = None, accept: np.ndarray | None = None
+    ) -> List[Tuple[float, int]]:
+        """Approximate top-*k* ``(similarity, node)`` among accepted, non-deleted linked nodes."""
+        if self.entry < 0 or k <= 0:
+            return []
+        entry = [self.entry]
+        for lc in range(self.max_level, 0, -1):
+            entry = [self._search_layer(query, entry, 1, lc)[0][1]]
+        live = ~self.deleted[: self.count]
+        if accept is not None:
+            live &= accept[: self.count]
+        mask = None if live.all() else live
+        return self._search_layer(query, entry, max(ef or self.ef_search, k), 0, mask)[:k]
+
+    def save(self, directory: Path) -> None:
+        n = self.count
+        np.save(directory / "vectors.npy", self.vectors[:n])
+        np.save(directory / "layer0.npy", self.layer0[:n])
+        np.save(directory / "levels.npy", self.levels[:n])
+        np.save(directory / "deleted.npy", self.deleted[:n])
+        nodes, node_levels, links = [], [], []
+        for level, adjacency in self.upper.items():
+            for node, neighbours in adjacency.items():
+                nodes.append(node)
+                node_levels.append(level)
+                links.append(neighbours + [-1] * (self.M - len(neighbours)))
+        np.savez(
+            directory / "upper.npz",
+            nodes=np.asarray(nodes, dtype=np.int32),
+            levels=np.asarray(node_levels, dtype=np.int16),
+            links=np.asarray(links, dtype=np.int32).reshape(-1, self.M),
+        )
+
+    @classmethod
+    def load(cls, directory: Path, params: dict, mmap: bool = True) -> "HnswIndex":
+        index = cls(params["dim"], params["M"], params["ef_construction"], params["ef_search"], capacity=1)
+        mode = "c" if mmap else None  # copy-on-write: pages are shared until written
+        index.vectors = np.load(directory / "vectors.npy", mmap_mode=mode)
+        index.layer0 = np.load(directory / "layer0.npy", mmap_mode=mode)
+        index.levels = np.load(directory / "levels.npy")
+        index.deleted = np.load(directory / "deleted.npy")
+        index.count = len(index.levels)
+        index.linked = params.get("linked", index.count)
+        index.entry, index.max_level = params["entry"], params["max_level"]
+        index._rng = np.random.default_rng(params.get("seed", 0) + index.count)
+        with np.load(directory / "upper.npz") as upper:
+            for node, level, links in zip(upper["nodes"], upper["levels"], upper["links"]):
+                index.upper.setdefault(int(level), {})[int(node)] = links[links >= 0].tolist()
+        if index.count == 0:
+            index._grow(1)
+        return index
+
+    def params(self) -> dict:
+        return {
+            "dim": self.dim,
+            "M": self.M,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "entry": self.entry,
+            "max_level": self.max_level,
+            "linked": self.linked,
+        }
+
+
+class HnswVectorStore(VectorStorePort):
+    """`VectorStorePort` on an `HnswIndex`, optionally persisted under *path*.
+
+    In memory, vectors are linked into the graph as they are added.  With a
+    *path*, writes are appended to the delta log of the current generation
+    and their rows stay in an exactly scanned tail until `snapshot` links
+    them into the graph.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        M: int = 16,
+        ef_construction: int = 128,
+        ef_search: int = 64,
+        exact_threshold: int = 2_000,
+        compact_ratio: float = 0.5,
+        snapshot_rows: int = 10_000,
+    ):
+        self.path = Path(path) if path else None
+        self.M, self.ef_construction, self.ef_search = M, ef_construction, ef_search
+        self.exact_threshold = exact_threshold
+        self.compact_ratio = compact_ratio
+        self.snapshot_rows = snapshot_rows
+        self._index: HnswIndex | None = None
+        self._ids: List[str | None] = []  # node -> id, None once deleted
+        self._rows: Dict[str, int] = {}
+        self._meta = MetadataIndex()
+        self._generation: str | None = None
+        self._offset = 0  # bytes of the generation's delta log applied so far
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -- persistence --------------------------------------------------------
+
+    def _current_generation(self) -> str | None:
+        try:
+            return (self.path / _CURRENT).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self) -> None:
+        """Catch up with the newest generation and its delta log.
+
+        A generation can be removed by a snapshot while it is being read; the
+        read is then retried against the generation ``CURRENT`` names now.
+        """
+        if self.path is None:
+            return
+        for attempt in range(_REFRESH_ATTEMPTS):
+            try:
+                generation = self._current_generation()
+                if generation is None:
+                    return
+                if generation != self._generation:
+                    self._load(generation)
+                self._apply_deltas()
+                return
+            except FileNotFoundError:
+                if attempt == _REFRESH_ATTEMPTS - 1:
+                    raise
+                self._generation = None  # reload from scratch
+
+    def _load(self, generation: str) -> None:
+        directory = self.path / generation
+        state = json.loads((directory / "state.json").read_text())
+        self._index = HnswIndex.load(directory, state["params"]) if state["params"] else None
+        self._ids = state["ids"]
+        self._rows = {eid: row for row, eid in enumerate(self._ids) if eid is not None}
+        self._meta = MetadataIndex.from_list(state["metadata"])
+        self._generation, self._offset = generation, 0
+        logger.info("vector.hnsw.load", generation=generation, vectors=len(self._rows))
+
+    def _apply_deltas(self) -> None:
+        """Apply the records other processes appended since the last refresh."""
+        log = self.path / self._generation / _DELTA
+        if log.stat().st_size <= self._offset:
+            return
+        with open(log, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        start, position = self._offset, 0
+        while position + _RECORD.size <= len(data):
+            header_len, body_len = _RECORD.unpack_from(data, position)
+            end = position + _RECORD.size + header_len + body_len
+            if end > len(data):
+                break  # a record still being appended
+            header = json.loads(data[position + _RECORD.size : position + _RECORD.size + header_len])
+            self._apply(header, data[end - body_len : end])
+            position = end
+            self._offset = start + position
+
+    def _apply(self, header: dict, body: bytes) -> None:
+        if header["op"] == "delete":
+            for eid in header["ids"]:
+                self._tombstone(eid)
+            return
+        vectors = np.frombuffer(body, dtype=np.float32).reshape(len(header["ids"]), header["dim"])
+        self._append(vectors, header["metadata"], header["ids"], link=False)
+
+    @contextmanager
+    def _locked(self, name: str = _LOCK, blocking: bool = True):
+        """Hold the ``flock`` on *name*; yields False if it is taken and *blocking* is off."""
+        fd = os.open(self.path / name, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+            else:
+                yield True
+        finally:
+            os.close(fd)  # also releases the lock
+
+    def _write(self, header: dict, body: bytes = b"") -> None:
+        """Append one record to the current delta log and apply it, under the writer lock."""
+        with self._locked():
+            self._refresh()
+            if self._generation is None:
+                self._save_generation()  # first write to an empty store
+                self._switch(self._generation)
+            if header["op"] == "add" and self._index is not None and header["dim"] != self._index.dim:
+                raise ValueError(f"embedding dimension {header['dim']} does not match index dimension {self._index.dim}")
+            encoded = json.dumps(header).encode()
+            with open(self.path / self._generation / _DELTA, "r+b") as f:
+                # drop the partial record of a writer that died while appending
+                f.truncate(self._offset)
+                f.seek(self._offset)
+                f.write(_RECORD.pack(len(encoded), len(body)) + encoded + body)
+            self._apply(header, body)
+            self._offset += _RECORD.size + len(encoded) + len(body)
+
+    def _save_generation(self) -> str:
+        """Write the in-memory state as a new generation directory (not yet current)."""
+        generation = f"gen-{uuid.uuid4().hex[:12]}"
+        directory = self.path / generation
+        directory.mkdir()
+        if self._index is not None:
+            self._index.save(directory)
+        state = {
+            "params": self._index.params() if self._index is not None else None,
+            "ids": self._ids,
+            "metadata": self._meta.to_list(),
+        }
+        (directory / "state.json").write_text(json.dumps(state))
+        (directory / _DELTA).touch()
+        self._generation, self._offset = generation, 0
+        return generation
+
+    def _switch(self, generation: str) -> None:
+        tmp = self.path / f"{_CURRENT}.tmp"
+        tmp.write_text(generation)
+        os.replace(tmp, self.path / _CURRENT)
+
+    def needs_snapshot(self) -> bool:
+        """Whether enough rows are outside the graph, or tombstoned, to fold them in."""
+        self._refresh()
+        index = self._index
+        if index is None:
+            return False
+        return index.count - index.linked >= self.snapshot_rows or self._tombstones() > self.compact_ratio * index.count
+
+    def _tombstones(self) -> int:
+        return self._index.count - len(self._rows) if self._index is not None else 0
+
+    def snapshot(self) -> bool:
+        """Link the tail into the graph and write it as a new generation.
+
+        The graph is built and saved without the writer lock; the lock is only
+        taken to carry over records appended in the meantime and to switch
+        ``CURRENT``.  Returns False if another process is snapshotting.
+        """
+        if self.path is None:
+            return False
+        with self._locked(_SNAPSHOT_LOCK, blocking=False) as acquired:
+            if not acquired:
+                return False
+            self._refresh()
+            if self._index is None:
+                return False
+            previous, offset = self._generation, self._offset
+            try:
+                if self._tombstones() > self.compact_ratio * self._index.count:
+                    self.compact()
+                else:
+                    self._index.link_pending()
+                generation = self._save_generation()
+                with self._locked():
+                    # records appended while the graph was built continue the new log
+                    with open(self.path / previous / _DELTA, "rb") as src:
+                        src.seek(offset)
+                        (self.path / generation / _DELTA).write_bytes(src.read())
+                    self._switch(generation)
+            except BaseException:
+                self._generation = None  # reload whatever is current
+                raise
+            # readers still loading the previous generation keep it; older ones go
+            for old in self.path.glob("gen-*"):
+                if old.name not in (generation, previous):
+                    shutil.rmtree(old, ignore_errors=True)
+            self._refresh()
+            logger.info("vector.hnsw.snapshot", generation=generation, vectors=len(self._rows))
+            return True
+
+    # -- VectorStorePort ----------------------------------------------------
+
+    async def add_vectors(self, embeddings: EmbeddingMatrix, metadatas: List[dict], ids: List[str]) -> None:
+        logger.info("vector.add", adapter="hnsw", count=len(ids))
+        matrix = as_embedding_matrix(embeddings)
+        if not len(ids):
+            return
+        if len(ids) != len(matrix):
+            raise ValueError(f"{len(ids)} ids for {len(matrix)} embeddings")
+        vectors = _normalize_rows(np.array(matrix, dtype=np.float32, copy=True))
+        metadatas = list(metadatas) + [{}] * (len(ids) - len(metadatas))
+        if self.path is None:
+            self._append(vectors, metadatas, list(ids), link=True)
+            return
+        header = {"op": "add", "ids": list(ids), "dim": vectors.shape[1], "metadata": metadatas}
+        self._write(header, vectors.tobytes())
+
+    def _append(self, vectors: np.ndarray, metadatas: List[dict], ids: List[str], link: bool) -> None:
+        if self._index is None:
+            self._index = HnswIndex(vectors.shape[1], self.M, self.ef_construction, self.ef_search)
+        elif vectors.shape[1] != self._index.dim:
+            raise ValueError(f"embedding dimension {vectors.shape[1]} does not match index dimension {self._index.dim}")
+        for eid, vector, meta in zip(ids, vectors, metadatas):
+            # graph nodes cannot be moved, so an upsert is delete + insert
+            self._tombstone(eid)
+            row = self._index.insert(vector) if link else self._index.append(vector)
+            self._ids.append(eid)
+            self._rows[eid] = row
+            self._meta.append(meta)
+
+    def _tombstone(self, eid: str) -> bool:
+        row = self._rows.pop(eid, None)
+        if row is None:
+            return False
+        self._index.deleted[row] = True
+        self._ids[row] = None
+        self._meta.remove(row)
+        return True
+
+    async def delete_vectors(self, ids: Iterable[str], filters: Dict[str, Any] | None = None) -> int:
+        """Tombstone *ids*; returns how many were present.
+
+        A persisted store appends the delete to the current generation's delta
+        log under the writer flock; the rows stay in the graph until the next
+        `snapshot`. *filters* is unused.
+        """
+        ids = list(ids)
+        if self.path is not None:
+            self._refresh()
+            present = [eid for eid in ids if eid in self._rows]
+            if present:
+                self._write({"op": "delete", "ids": present})
+            removed = len(present)
+        else:
+            removed = sum(self._tombstone(eid) for eid in ids) if self._index is not None else 0
+            # a persisted store is compacted by `snapshot`
+            if removed and self._tombstones() > self.compact_ratio * self._index.count:
+                self.compact()
+        logger.info("vector.delete", adapter="hnsw", count=removed)
+        return removed
+
+    def compact(self) -> None:
+        """Rebuild the graph from the live rows only."""
+        old = self._index
+        if old is None or (len(self._rows) == old.count and old.linked == old.count):
+            return
+        keep = [row for row, eid in enumerate(self._ids) if eid is not None]
+        index = HnswIndex(old.dim, self.M, self.ef_construction, self.ef_search, capacity=max(len(keep), 1))
+        for row in keep:
+            index.insert(old.vectors[row])
+        self._index = index
+        self._ids = [self._ids[row] for row in keep]
+        self._rows = {eid: row for row, eid in enumerate(self._ids)}
+        self._meta.keep(keep)
+        logger.info("vector.compact", adapter="hnsw", dropped=old.count - len(keep), rows=len(keep))
+
+    async def similarity_search(
+        self,
+        embedding: EmbeddingVector,
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> List[Tuple[str, float]]:
+        self._refresh()
+        logger.info("vector.search", adapter="hnsw", top_k=top_k, store_size=len(self._rows))
+        if self._index is None or not self._rows or top_k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        query = query / norm
+
+        accept = None
+        wanted = normalize_filters(filters)
+        if wanted:
+            candidates = self._meta.rows(wanted)
+            if not len(candidates):
+                return []
+            if len(candidates) <= self.exact_threshold:
+                # few matches: scoring them all is cheaper and exact
+                scores = self._index.vectors[candidates] @ query
+                best = np.argsort(-scores, kind="stable")[:top_k]
+                return [(self._ids[candidates[i]], float(scores[i])) for i in best]
+            accept = np.zeros(self._index.count, dtype=bool)
+            accept[candidates] = True
+        hits = self._index.search(query, top_k, ef=self.ef_search, accept=accept)
+        index = self._index
+        if index.linked < index.count:
+            # rows appended since the last snapshot are not in the graph yet
+            tail = np.arange(index.linked, index.count)
+            live = ~index.deleted[tail]
+            if accept is not None:
+                live &= accept[tail]
+            tail = tail[live]
+            scores = index.vectors[tail] @ query
+            hits = sorted(hits + list(zip(scores.tolist(), tail.tolist())), reverse=True)[:top_k]
+        return [(self._ids[node], sim) for sim, node in hits]
@@ -0,0 +1,513 @@
+from __future__ import annotations
+
+"""IVF-PQ vector store: compressed approximate search for large collections.
+
+Every collection (the ``collection_id`` chunk metadata; chunks without one
+share a default collection) gets its own inverted-file index with product
+quantisation:
+
+* ``nlist`` coarse centroids partition the vectors; a query only scans the
+  ``nprobe`` lists whose centroids are closest to it;
+* the residual of each vector to its centroid is cut into ``m`` sub-vectors,
+  each replaced by the index of the nearest of 256 codewords, so a 384-d
+  float32 vector (1536 bytes) is held in memory as ``m`` bytes;
+* scoring is asymmetric: the query stays exact, and one ``(m, 256)`` table
+  of query·codeword products turns every candidate into ``m`` lookups;
+* the best ``top_k * rerank`` approximate candidates are re-scored against
+  the full-precision vectors, which stay on disk.
+
+The full-precision vectors, ids, metadata and tombstones of a collection are
+a `SegmentedVectorStore`; this module adds the trained codec
+(``codec-<version>.npz``, selected by ``CODEC``) and the codes of every
+segment (``pq-<version>.npz`` inside the segment directory).  `train` – run
+by the ``train_vector_index`` Celery task – fits a collection once it has
+``train_min_rows`` vectors and again after it has grown ``retrain_growth``
+times; until then the collection is searched exactly.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from privategpt.core.ports.embedder import EmbeddingMatrix, EmbeddingVector, as_embedding_matrix
+from privategpt.core.ports.vector_store import VectorStorePort, normalize_filters
+from privategpt.infra.vector_store.segmented import SegmentedVectorStore
+from privategpt.shared.logging import get_logger
+
+logger = get_logger("vector.ivfpq")
+
+_CODEC = "CODEC"
+_COLLECTION = "collection.json"
+_TRAIN_LOCK = ".train.lock"
+_KSUB = 256  # codewords per sub-quantiser, so codes fit in uint8
+_BLOCK = 16_384  # rows per distance block, bounds the temporary matrices
+_POINTS_PER_CENTRE = 64  # k-means sample cap; more points barely move the centres
+
+
+def _nearest(data: np.ndarray, centres: np.ndarray) -> np.ndarray:
+    """Index of the nearest (L2) centre for every row of *data*."""
+    half_norms = 0.5 * np.einsum("ij,ij->i", centres, centres)
+    nearest = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), _BLOCK):
+        scores = np.asarray(data[start : start + _BLOCK], dtype=np.float32) @ centres.T
+        scores -= half_norms
+        nearest[start : start + len(scores)] = np.argmax(scores, axis=1)
+    return nearest
+
+
+def _kmeans(data: np.ndarray, k: int, iters: int, seed: int) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centres = np.array(data[rng.choice(len(data), k, replace=False)], dtype=np.float32)
+    for _ in range(iters):
+        labels = _nearest(data, centres)
+        counts = np.bincount(labels, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = (np.cumsum(counts) - counts)[filled]
+        sums = np.add.reduceat(data[np.argsort(labels, kind="stable")], starts, axis=0)
+        centres[filled] = sums / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centres[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centres
+
+
+def _subquantizers(dim: int, m: int) -> int:
+    """Largest divisor of *dim* not above *m*."""
+    m = max(1, min(m, dim))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _save_npz(path: Path, **arrays: np.ndarray) -> None:
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "wb") as fh:
+        np.savez(fh, **arrays)
+    os.replace(tmp, path)
+
+
+@dataclass
+class IvfPqCodec:
+    """Coarse centroids and PQ codebooks trained on one collection."""
+
+    coarse: np.ndarray  # (nlist, dim)
+    codebooks: np.ndarray  # (m, 256, dim // m)
+    trained_rows: int = 0
+    _half_norms: np.ndarray = field(init=False, repr=False)
+    _offsets: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._half_norms = 0.5 * np.einsum("ij,ij->i", self.coarse, self.coarse)
+        self._offsets = np.arange(self.m, dtype=np.intp) * _KSUB
+
+    @property
+    def nlist(self) -> int:
+        return len(self.coarse)
+
+    @property
+    def m(self) -> int:
+        return len(self.codebooks)
+
+    @classmethod
+    def train(cls, sample: np.ndarray, nlist: int, m: int, iters: int = 20, seed: int = 0) -> "IvfPqCodec":
+        dim = sample.shape[1]
+        m = _subquantizers(dim, m)
+        dsub = dim // m
+        rng = np.random.default_rng(seed)
+
+        def subsample(k: int) -> np.ndarray:
+            return sample[np.sort(rng.permutation(len(sample))[: _POINTS_PER_CENTRE * k])]
+
+        coarse = _kmeans(subsample(nlist), nlist, iters, seed)
+        points = subsample(_KSUB)
+        residuals = points - coarse[_nearest(points, coarse)]
+        # unused codewords (samples < 256) stay zero
+        codebooks = np.zeros((m, _KSUB, dsub), dtype=np.float32)
+        for j in range(m):
+            book = _kmeans(np.ascontiguousarray(residuals[:, j * dsub : (j + 1) * dsub]), _KSUB, iters, seed + 1 + j)
+            codebooks[j, : len(book)] = book
+        return cls(coarse, codebooks)
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Coarse list and PQ codes of every row of *vectors*."""
+        lists = _nearest(vectors, self.coarse)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        dsub = self.codebooks.shape[2]
+        for start in range(0, len(vectors), _BLOCK):
+            block = np.asarray(vectors[start : start + _BLOCK], dtype=np.float32)
+            residuals = block - self.coarse[lists[start : start + len(block)]]
+            for j in range(self.m):
+                codes[start : start + len(block), j] = _nearest(
+                    residuals[:, j * dsub : (j + 1) * dsub], self.codebooks[j]
+                )
+        return lists, codes
+
+    def probe(self, query: np.ndarray, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The *nprobe* lists nearest to *query*, and query·centroid for all lists."""
+        coarse_scores = self.coarse @ query
+        ranked = coarse_scores - self._half_norms  # L2 order for a unit query
+        nprobe = min(nprobe, self.nlist)
+        return np.argpartition(-ranked, nprobe - 1)[:nprobe], coarse_scores
+
+    def table(self, query: np.ndarray) -> np.ndarray:
+        """Query·codeword products, flattened to ``m * 256``."""
+        return np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.m, -1)).ravel()
+
+    def approximate(self, table: np.ndarray, coarse_scores: np.ndarray, lists: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Asymmetric scores: query·centroid plus the looked-up residual products."""
+        return coarse_scores[lists] + table[codes.astype(np.intp) + self._offsets].sum(axis=1)
+
+    def save(self, path: Path) -> None:
+        _save_npz(path, coarse=self.coarse, codebooks=self.codebooks, trained_rows=np.int64(self.trained_rows))
+
+    @classmethod
+    def load(cls, path: Path) -> "IvfPqCodec":
+        with np.load(path) as saved:
+            return cls(saved["coarse"], saved["codebooks"], int(saved["trained_rows"]))
+
+
+@dataclass
+class _SegmentCodes:
+    lists: np.ndarray  # (rows,) int32
+    codes: np.ndarray  # (rows, m) uint8
+    order: np.ndarray  # rows grouped by list
+    offsets: np.ndarray  # (nlist + 1,) start of each list in ``order``
+
+    @classmethod
+    def build(cls, lists: np.ndarray, codes: np.ndarray, nlist: int) -> "_SegmentCodes":
+        order = np.argsort(lists, kind="stable").astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=nlist))])
+        return cls(lists, codes, order, offsets)
+
+    def rows(self, probed: np.ndarray) -> np.ndarray:
+        return np.concatenate([self.order[self.offsets[p] : self.offsets[p + 1]] for p in probed])
+
+
+class _Collection:
+    """One collection: its segment store, current codec and cached codes."""
+
+    def __init__(self, directory: Path, key: str, store: SegmentedVectorStore):
+        self.directory = directory
+        self.key = key
+        self.store = store
+        self.version: str | None = None
+        self.codec: IvfPqCodec | None = None
+        self._codes: Dict[str, _SegmentCodes] = {}
+
+    def refresh_codec(self) -> None:
+        try:
+            version = (self.directory / _CODEC).read_text().strip() or None
+        except FileNotFoundError:
+            version = None
+        if version == self.version:
+            return
+        self.codec = IvfPqCodec.load(self.directory / f"codec-{version}.npz") if version else None
+        self.version = version
+        self._codes = {}
+
+    def codes(self, segment: Any) -> _SegmentCodes:
+        cached = self._codes.get(segment.name)
+        if cached is not None:
+            return cached
+        path = self.directory / segment.name / f"pq-{self.version}.npz"
+        try:
+            with np.load(path) as saved:
+                lists, codes = saved["lists"], saved["codes"]
+        except FileNotFoundError:
+            # written after the last training, or merged by compaction since
+            lists, codes = self.codec.encode(segment.vectors)
+            try:
+                _save_npz(path, lists=lists, codes=codes)
+            except OSError:
+                pass  # segment compacted away meanwhile; the codes are still valid for this search
+        cached = self._codes[segment.name] = _SegmentCodes.build(lists, codes, self.codec.nlist)
+        return cached
+
+    def forget(self, segments: List[Any]) -> None:
+        """Drop cached codes of segments that are gone."""
+        if len(self._codes) > len(segments):
+            names = {s.name for s in segments}
+            self._codes = {name: codes for name, codes in self._codes.items() if name in names}
+
+
+def _collection_key(metadata: dict | None) -> str:
+    value = (metadata or {}).get("collection_id")
+    return "" if value is None else str(value)
+
+
+class IvfPqVectorStore(VectorStorePort):
+    """Per-collection IVF-PQ indexes over full-precision segments under *path*."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        nlist: int = 1024,
+        m: int = 48,
+        nprobe: int = 16,
+        rerank: int = 10,
+        train_min_rows: int = 20_000,
+        retrain_growth: float = 2.0,
+        train_sample: int = 100_000,
+        exact_threshold: int = 2_000,
+        compact_min_rows: int = 65_536,
+        compact_max_small: int = 8,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.nlist, self.m, self.nprobe, self.rerank = nlist, m, nprobe, rerank
+        self.train_min_rows = train_min_rows
+        self.retrain_growth = retrain_growth
+        self.train_sample = train_sample
+        self.exact_threshold = exact_threshold
+        self.compact_min_rows = compact_min_rows
+        self.compact_max_small = compact_max_small
+        self._collections: Dict[str, _Collection] = {}
+        self._listed: int | None = None
+        self._discover()
+
+    def __len__(self) -> int:
+        self._discover()
+        return sum(len(c.store) for c in self._collections.values())
+
+    # -- collections --------------------------------------------------------
+
+    def _open(self, directory: Path, key: str) -> _Collection:
+        store = SegmentedVectorStore(
+            directory, compact_min_rows=self.compact_min_rows, compact_max_small=self.compact_max_small
+        )
+        return _Collection(directory, key, store)
+
+    def _discover(self) -> None:
+        """Open collections that other processes have created."""
+        listed = os.stat(self.path).st_mtime_ns
+        if listed == self._listed:
+            return
+        known = {c.directory.name for c in self._collections.values()}
+        for directory in sorted(self.path.glob("col-*")):
+            if directory.name not in known:
+                key = json.loads((directory / _COLLECTION).read_text())["collection_id"]
+                self._collections[key] = self._open(directory, key)
+        self._listed = listed
+
+    def _collection(self, key: str) -> _Collection:
+        collection = self._collections.get(key)
+        if collection is not None:
+            return collection
+        directory = self.path / f"col-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+        if not directory.exists():
+            # renamed into place complete, so readers never list a half-made collection
+            tmp = self.path / f".{directory.name}.{uuid.uuid4().hex[:8]}"
+            tmp.mkdir()
+            (tmp / _COLLECTION).write_text(json.dumps({"collection_id": key}))
+            try:
+                os.rename(tmp, directory)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)  # another process created it first
+        collection = self._collections[key] = self._open(directory, key)
+        return collection
+
+    # -- writes -------------------------------------------------------------
+
+    async def add_vectors(self, embeddings: EmbeddingMatrix, metadatas: List[dict], ids: List[str]) -> None:
+        logger.info("vector.add", adapter="ivfpq", count=len(ids))
+        matrix = as_embedding_matrix(embeddings)
+        if not len(ids):
+            return
+        if len(ids) != len(matrix):
+            raise ValueError(f"{len(ids)} ids for {len(matrix)} embeddings")
+        metadatas = list(metadatas) + [{}] * (len(ids) - len(metadatas))
+        self._discover()
+        groups: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            groups.setdefault(_collection_key(meta), []).append(i)
+        for key, rows in groups.items():
+            group_ids = [ids[i] for i in rows]
+            # an id that moves collection must not stay behind in the old one;
+            # ids belong to documents, so only collections holding them are touched
+            documents = {metadatas[i].get("document_id") for i in rows}
+            moved = {"document_id": sorted(documents)} if None not in documents else None
+            for other in [c for k, c in self._collections.items() if k != key]:
+                if moved is None or other.store.contains(moved):
+                    await other.store.delete_vectors(group_ids, filters=moved)
+            collection = self._collection(key)
+            await collection.store.add_vectors(matrix[rows], [metadatas[i] for i in rows], group_ids)
+            collection.refresh_codec()
+            if collection.codec is not None:
+                # encode the new segment now instead of on the first search
+                collection.codes(collection.store.segments()[-1])
+
+    async def delete_vectors(self, ids: Iterable[str], filters: Dict[str, Any] | None = None) -> int:
+        """Tombstone *ids*; returns how many were present.
+
+        Without *filters* every collection is searched; with them (e.g. the
+        ids' ``document_id``) only collections holding matching rows are.
+        """
+        self._discover()
+        ids = list(ids)
+        wanted = normalize_filters(filters)
+        keys = wanted.pop("collection_id", None)
+        collections = [
+            c
+            for k, c in self._collections.items()
+            if (keys is None or k in keys) and (not wanted or c.store.contains(wanted))
+        ]
+        return sum([await c.store.delete_vectors(ids, filters=wanted or None) for c in collections])
+
+    # -- training -----------------------------------------------------------
+
+    def stale_collections(self) -> List[str]:
+        """Collections that are big enough to train, or have outgrown their codec."""
+        self._discover()
+        stale = []
+        for key, collection in self._collections.items():
+            collection.refresh_codec()
+            rows = len(collection.store)
+            if collection.codec is None:
+                if rows >= self.train_min_rows:
+                    stale.append(key)
+            elif rows >= self.retrain_growth * collection.codec.trained_rows:
+                stale.append(key)
+        return stale
+
+    def train(self, collection_ids: Iterable[str] | None = None) -> List[str]:
+        """(Re)train *collection_ids*, by default the stale ones; returns those trained.
+
+        Returns immediately if another process is already training.
+        """
+        fd = os.open(self.path / _TRAIN_LOCK, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return []
+            keys = self.stale_collections() if collection_ids is None else list(collection_ids)
+            return [key for key in keys if key in self._collections and self._train(self._collections[key])]
+        finally:
+            os.close(fd)
+
+    def _train(self, collection: _Collection) -> bool:
+        segments = collection.store.segments()
+        live = [np.flatnonzero(s.live()) for s in segments]
+        total = sum(len(rows) for rows in live)
+        if total < _KSUB:
+            return False
+        picks = np.sort(np.random.default_rng(total).choice(total, min(total, self.train_sample), replace=False))
+        bounds = np.cumsum([0] + [len(rows) for rows in live])
+        sample = np.concatenate(
+            [
+                np.asarray(segment.vectors[rows[picks[(picks >= lo) & (picks < hi)] - lo]])
+                for segment, rows, lo, hi in zip(segments, live, bounds[:-1], bounds[1:])
+            ]
+        )
+        # at least ~40 training points per coarse centroid
+        codec = IvfPqCodec.train(sample, min(self.nlist, max(1, len(sample) // 40)), self.m)
+        codec.trained_rows = total
+
+        version = uuid.uuid4().hex[:12]
+        codec.save(collection.directory / f"codec-{version}.npz")
+        for segment in segments:
+            lists, codes = codec.encode(segment.vectors)
+            try:
+                _save_npz(collection.directory / segment.name / f"pq-{version}.npz", lists=lists, codes=codes)
+            except OSError:
+                pass  # compacted away meanwhile, encoded on first use instead
+        tmp = collection.directory / f"{_CODEC}.tmp"
+        tmp.write_text(version)
+        os.replace(tmp, collection.directory / _CODEC)
+        collection.refresh_codec()
+        for stale in collection.directory.glob("codec-*.npz"):
+            if stale.name != f"codec-{version}.npz":
+                stale.unlink(missing_ok=True)
+        for stale in collection.directory.glob("seg-*/pq-*.npz"):
+            if stale.name != f"pq-{version}.npz":
+                stale.unlink(missing_ok=True)
+        logger.info(
+            "vector.ivfpq.train",
+            collection=collection.key,
+            rows=total,
+            sample=len(sample),
+            nlist=codec.nlist,
+            m=codec.m,
+            version=version,
+        )
+        return True
+
+    # -- search -------------------------------------------------------------
+
+    def _candidates(
+        self, collection: _Collection, query: np.ndarray, top_k: int, wanted: Dict[str, List[Any]]
+    ) -> Iterable[Tuple[Any, np.ndarray]]:
+        """(segment, rows) to be scored exactly, per segment of *collection*."""
+        codec = collection.codec
+        if codec is not None:
+            probed, coarse_scores = codec.probe(query, self.nprobe)
+            table = codec.table(query)
+        shortlist = top_k * self.rerank
+        segments = collection.store.segments()
+        collection.forget(segments)
+        for segment in segments:
+            mask = segment.match(wanted) if wanted else segment.live()
+            matched = int(np.count_nonzero(mask))
+            if not matched:
+                continue
+            if codec is None or (wanted and matched <= self.exact_threshold):
+                # untrained, or few filtered rows: exact is cheap and misses nothing
+                yield segment, np.flatnonzero(mask)
+                continue
+            codes = collection.codes(segment)
+            rows = codes.rows(probed)
+            rows = rows[mask[rows]]
+            if len(rows) > shortlist:
+                approx = codec.approximate(table, coarse_scores, codes.lists[rows], codes.codes[rows])
+                rows = rows[np.argpartition(-approx, shortlist - 1)[:shortlist]]
+            yield segment, np.sort(rows)  # ascending rows read the mapped file in order
+
+    async def similarity_search(
+        self,
+        embedding: EmbeddingVector,
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> List[Tuple[str, float]]:
+        self._discover()
+        wanted = normalize_filters(filters)
+        keys = wanted.get("collection_id")
+        collections = [c for k, c in self._collections.items() if keys is None or k in keys]
+        logger.info("vector.search", adapter="ivfpq", top_k=top_k, collections=len(collections))
+        if not collections or top_k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        query = query / norm
+
+        best_scores: List[np.ndarray] = []
+        best_refs: List[Tuple[Any, np.ndarray]] = []
+        for collection in collections:
+            collection.refresh_codec()
+            for segment, rows in self._candidates(collection, query, top_k, wanted):
+                if not len(rows):
+                    continue
+                scores = (segment.vectors if len(rows) == segment.rows else segment.vectors[rows]) @ query
+                k = min(top_k, len(rows))
+                top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+                best_scores.append(scores[top])
+                best_refs.append((segment, rows[top]))
+        if not best_scores:
+            return []
+
+        scores = np.concatenate(best_scores)
+        owners = np.concatenate([np.full(len(rows), i) for i, (_, rows) in enumerate(best_refs)])
+        rows = np.concatenate([rows for _, rows in best_refs])
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(best_refs[owners[i]][0].id_at(int(rows[i])), float(scores[i])) for i in order]
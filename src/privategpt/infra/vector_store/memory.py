@@ -1,36 +1,466 @@
 from __future__ import annotations
 
-from typing import Sequence, List, Tuple, Dict
+"""In-process vector store on a single float32 matrix.
+
+Rows are L2-normalised when they are added, so a query is scored against the
+whole store with one matrix–vector product and the best ``top_k`` are picked
+with ``argpartition`` instead of a full sort.  The matrix grows by doubling.
+Deleted rows are tombstoned (masked out of searches) and squeezed out by
+`compact`, which also runs on its own once tombstones outnumber
+``compact_ratio`` of the rows.
+
+The filterable metadata fields (`FILTER_FIELDS`) are kept in an inverted
+index of ``field -> value -> rows``; a filtered search intersects those row
+sets first and only scores the candidates.  `similarity_search_many` scores
+every query that shares a filter with one matrix–matrix product.
+
+Chunk texts (the ``text`` metadata) feed an incremental `Bm25Index`;
+`hybrid_search` fuses its ranking with the vector ranking, both taken
+``hybrid_depth`` deep, by reciprocal rank fusion.
+
+With ``binary=True`` the store also keeps the sign bit of every component,
+packed eight to a byte – 1/32 of the float32 matrix.  A search then ranks the
+rows by Hamming distance to the query's bits (``bitwise_xor`` plus a
+popcount), and only the ``top_k * rescore`` closest rows are scored with
+float32 dot products.  The scan touches 32× less memory than the exact one at
+the price of some recall; small candidate sets are still scored exactly.
+
+With ``dedup=True`` chunks of the same user with identical text (boilerplate
+such as disclaimers or signature blocks) share one row.  The row keeps the
+list of chunk ids that reference it, and their filter fields are indexed as
+multiple values.  A search ranks rows and then expands each hit into the
+references that match the filters, which all get the row's score.  The store
+(and the scanned matrix) grows with the number of distinct texts rather than
+the number of chunks.
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
 import numpy as np
 
-from privategpt.core.ports.vector_store import VectorStorePort
+from privategpt.core.domain.chunk import content_hash
+from privategpt.core.ports.embedder import EmbeddingMatrix, EmbeddingVector, as_embedding_matrix
+from privategpt.core.ports.vector_store import VectorStorePort, normalize_filters, per_query_filters
+from privategpt.infra.vector_store.bm25 import Bm25Index
+from privategpt.infra.vector_store.fusion import reciprocal_rank_fusion
+from privategpt.infra.vector_store.metadata_index import MetadataIndex
 from privategpt.shared.logging import get_logger
 
 logger = get_logger("vector.memory")
 
+_BLOCK = 65_536  # rows per Hamming block, bounds the xor temporaries
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _pack_signs(matrix: np.ndarray) -> np.ndarray:
+    """One bit per component, set where it is positive."""
+    return np.packbits(matrix > 0, axis=-1)
+
+
+def _hamming(bits: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Hamming distance from every row of packed *bits* to packed *query*."""
+    distances = np.empty(len(bits), dtype=np.uint16)
+    for start in range(0, len(bits), _BLOCK):
+        xor = np.bitwise_xor(bits[start : start + _BLOCK], query)
+        # np.bitwise_count is NumPy >= 2.0; the byte table works everywhere
+        counts = np.bitwise_count(xor) if hasattr(np, "bitwise_count") else _POPCOUNT[xor]
+        distances[start : start + len(xor)] = counts.sum(axis=1, dtype=np.uint16)
+    return distances
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # zero vectors stay zero and score 0 against everything
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
 
 class InMemoryVectorStore(VectorStorePort):
-    def __init__(self):
-        self._store: Dict[str, Sequence[float]] = {}
+    def __init__(
+        self,
+        initial_capacity: int = 1024,
+        compact_ratio: float = 0.25,
+        binary: bool = False,
+        rescore: int = 10,
+        hybrid_depth: int = 50,
+        dedup: bool = False,
+    ):
+        self._initial_capacity = max(initial_capacity, 1)
+        self.compact_ratio = compact_ratio
+        self.binary = binary
+        self.rescore = rescore  # Hamming shortlist, as a multiple of top_k
+        self.hybrid_depth = hybrid_depth  # candidates per ranking before fusion
+        self.dedup = dedup
+        self._matrix: np.ndarray | None = None  # (capacity, dim); allocated on first add
+        self._bits: np.ndarray | None = None  # (capacity, ceil(dim / 8)) sign bits when binary
+        self._ids: List[str | None] = []  # row -> id, None for tombstones
+        self._live = np.zeros(0, dtype=bool)
+        self._rows: Dict[str, int] = {}  # id -> row
+        self._size = 0  # rows in use, live or tombstoned
+        self._count = 0  # live rows; fewer than ids when rows are shared
+        # dedup only: row -> {id: indexed metadata}, and (user, text hash) -> row
+        self._refs: List[Dict[str, Dict]] = []
+        self._keys: List[Tuple | None] = []
+        self._shared: Dict[Tuple, int] = {}
+        self._meta = MetadataIndex()
+        self._lexical = Bm25Index()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def dim(self) -> int | None:
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, rows)
+            self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+            self._live = np.zeros(capacity, dtype=bool)
+            if self.binary:
+                self._bits = np.zeros((capacity, (dim + 7) // 8), dtype=np.uint8)
+            return
+        if dim != self._matrix.shape[1]:
+            raise ValueError(f"embedding dimension {dim} does not match store dimension {self._matrix.shape[1]}")
+        capacity = self._matrix.shape[0]
+        if self._size + rows <= capacity:
+            return
+        while capacity < self._size + rows:
+            capacity *= 2
+        grown = np.zeros((capacity, dim), dtype=np.float32)
+        grown[: self._size] = self._matrix[: self._size]
+        live = np.zeros(capacity, dtype=bool)
+        live[: self._size] = self._live[: self._size]
+        self._matrix, self._live = grown, live
+        if self._bits is not None:
+            bits = np.zeros((capacity, self._bits.shape[1]), dtype=np.uint8)
+            bits[: self._size] = self._bits[: self._size]
+            self._bits = bits
 
-    async def add_vectors(self, embeddings: List[Sequence[float]], metadatas: List[dict], ids: List[str]) -> None:
+    async def add_vectors(self, embeddings: EmbeddingMatrix, metadatas: List[dict], ids: List[str]) -> None:
         logger.info("vector.add", adapter="memory", count=len(ids))
-        for eid, emb in zip(ids, embeddings):
-            self._store[eid] = emb
+        matrix = as_embedding_matrix(embeddings)
+        if not len(ids):
+            return
+        if len(ids) != len(matrix):
+            raise ValueError(f"{len(ids)} ids for {len(matrix)} embeddings")
+        vectors = _normalize(np.array(matrix, dtype=np.float32, copy=True))
+
+        if len(metadatas) < len(ids):
+            metadatas = list(metadatas) + [{}] * (len(ids) - len(metadatas))
+        if self.dedup:
+            self._add_shared(vectors, metadatas, ids)
+            return
+
+        # existing ids are overwritten in place, the rest appended
+        new_rows: List[int] = []
+        for i, eid in enumerate(ids):
+            row = self._rows.get(eid)
+            if row is None:
+                new_rows.append(i)
+            else:
+                self._matrix[row] = vectors[i]
+                if self._bits is not None:
+                    self._bits[row] = _pack_signs(vectors[i])
+                self._meta.replace(row, metadatas[i])
+                self._lexical.replace(row, metadatas[i].get("text"))
+        if not new_rows:
+            return
+        new_ids = [ids[i] for i in new_rows]
+        if len(set(new_ids)) != len(new_ids):
+            # duplicate ids inside one call: the last vector wins
+            last = {ids[i]: i for i in new_rows}
+            new_rows = sorted(last.values())
+            new_ids = [ids[i] for i in new_rows]
+        self._reserve(len(new_rows), vectors.shape[1])
+        start, end = self._size, self._size + len(new_rows)
+        self._matrix[start:end] = vectors[new_rows]
+        if self._bits is not None:
+            self._bits[start:end] = _pack_signs(vectors[new_rows])
+        self._live[start:end] = True
+        self._ids.extend(new_ids)
+        self._rows.update((eid, start + n) for n, eid in enumerate(new_ids))
+        for i in new_rows:
+            self._meta.append(metadatas[i])
+            self._lexical.append(metadatas[i].get("text"))
+        self._size = end
+        self._count += len(new_rows)
+
+    def _add_shared(self, vectors: np.ndarray, metadatas: List[dict], ids: List[str]) -> None:
+        """`add_vectors` with ``dedup``: a chunk whose text is already stored only adds a reference."""
+        self._reserve(0, vectors.shape[1])  # checks the dimension before anything changes
+        # a re-added id is dropped first, its text may have changed
+        self._unref([eid for eid in dict.fromkeys(ids) if eid in self._rows])
+        last = {eid: i for i, eid in enumerate(ids)}  # duplicate ids: the last one wins
+        new_rows: List[int] = []
+        new_keys: Dict[Tuple, int] = {}  # key -> row it will be appended at
+        attach: Dict[int, List[int]] = {}  # existing or new row -> metadata indices
+        for i, eid in enumerate(ids):
+            if last[eid] != i:
+                continue
+            text = metadatas[i].get("text")
+            key = None if text is None else (metadatas[i].get("user_id"), content_hash(text))
+            row = self._shared.get(key) if key is not None else None
+            if row is None and key is not None:
+                row = new_keys.get(key)
+            if row is None:
+                row = self._size + len(new_rows)
+                new_rows.append(i)
+                if key is not None:
+                    new_keys[key] = row
+                self._keys.append(key)
+                self._refs.append({})
+            attach.setdefault(row, []).append(i)
+
+        if new_rows:
+            self._reserve(len(new_rows), vectors.shape[1])
+            start, end = self._size, self._size + len(new_rows)
+            self._matrix[start:end] = vectors[new_rows]
+            if self._bits is not None:
+                self._bits[start:end] = _pack_signs(vectors[new_rows])
+            self._live[start:end] = True
+            self._ids.extend(ids[i] for i in new_rows)
+            for i in new_rows:
+                self._meta.append(None)
+                self._lexical.append(metadatas[i].get("text"))
+            self._size = end
+            self._count += len(new_rows)
+            self._shared.update(new_keys)
+        for row, members in attach.items():
+            refs = self._refs[row]
+            for i in members:
+                refs[ids[i]] = MetadataIndex.indexed(metadatas[i])
+                self._rows[ids[i]] = row
+            self._meta.replace(row, _merged(refs))
+
+    async def delete_vectors(self, ids: Iterable[str], filters: Dict[str, Any] | None = None) -> int:
+        """Tombstone *ids*; returns how many were present.
+
+        *filters* only narrows the lookup in other stores; ids map to rows here.
+        """
+        removed = self._unref(ids)
+        logger.info("vector.delete", adapter="memory", count=removed)
+        if self._size and (self._size - self._count) > self.compact_ratio * self._size:
+            self.compact()
+        return removed
+
+    def _unref(self, ids: Iterable[str]) -> int:
+        removed = 0
+        for eid in ids:
+            row = self._rows.pop(eid, None)
+            if row is None:
+                continue
+            removed += 1
+            if self.dedup:
+                refs = self._refs[row]
+                del refs[eid]
+                if refs:
+                    # the row stays for its other references
+                    if self._ids[row] == eid:
+                        self._ids[row] = next(iter(refs))
+                    self._meta.replace(row, _merged(refs))
+                    continue
+                self._shared.pop(self._keys[row], None)
+                self._keys[row] = None
+            self._live[row] = False
+            self._ids[row] = None
+            self._meta.remove(row)
+            self._lexical.remove(row)
+            self._count -= 1
+        return removed
+
+    def compact(self) -> None:
+        """Drop tombstoned rows and reindex; capacity is kept."""
+        if self._matrix is None or self._count == self._size:
+            return
+        keep = np.flatnonzero(self._live[: self._size])
+        count = len(keep)
+        self._matrix[:count] = self._matrix[keep]
+        self._matrix[count : self._size] = 0
+        if self._bits is not None:
+            self._bits[:count] = self._bits[keep]
+            self._bits[count : self._size] = 0
+        self._live[:count] = True
+        self._live[count : self._size] = False
+        self._ids = [self._ids[i] for i in keep]
+        self._meta.keep(keep)
+        self._lexical.keep(keep)
+        if self.dedup:
+            self._refs = [self._refs[i] for i in keep]
+            self._keys = [self._keys[i] for i in keep]
+            self._rows = {eid: row for row, refs in enumerate(self._refs) for eid in refs}
+            self._shared = {key: row for row, key in enumerate(self._keys) if key is not None}
+        else:
+            self._rows = {eid: row for row, eid in enumerate(self._ids)}
+        logger.info("vector.compact", adapter="memory", dropped=self._size - count, rows=count)
+        self._size = count
 
     async def similarity_search(
         self,
-        embedding: Sequence[float],
+        embedding: EmbeddingVector,
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> List[Tuple[str, float]]:
+        logger.info("vector.search", adapter="memory", top_k=top_k, store_size=len(self._rows))
+        wanted = normalize_filters(filters)
+        return self._expand(self._search(embedding, top_k, wanted), wanted)
+
+    def _search(self, embedding: EmbeddingVector, top_k: int, wanted: Dict[str, List]) -> List[Tuple[str, float]]:
+        """Best *top_k* rows for *embedding*, one id per row."""
+        if not self._rows or top_k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        query = query / norm
+
+        candidates = self._meta.rows(wanted) if wanted else None
+        if candidates is not None and not len(candidates):
+            return []
+        live = self._count if candidates is None else len(candidates)
+        k = min(top_k, live)
+        shortlist = k * max(self.rescore, 1)
+
+        if self._bits is not None and live > shortlist:
+            # Hamming prefilter, then exact scores for the shortlist only
+            if candidates is None:
+                distances = _hamming(self._bits[: self._size], _pack_signs(query))
+                if self._count < self._size:
+                    distances[~self._live[: self._size]] = np.iinfo(np.uint16).max
+            else:
+                distances = _hamming(self._bits[candidates], _pack_signs(query))
+            nearest = np.argpartition(distances, shortlist - 1)[:shortlist]
+            rows = nearest if candidates is None else candidates[nearest]
+            scores = self._matrix[rows] @ query
+        elif candidates is not None:
+            rows = candidates
+            scores = self._matrix[rows] @ query
+        else:
+            rows = None
+            scores = self._matrix[: self._size] @ query
+            if self._count < self._size:
+                scores[~self._live[: self._size]] = -np.inf
+        return self._best(scores, k, rows)
+
+    def _expand(self, hits: List[Tuple[str, float]], wanted: Dict[str, List]) -> List[Tuple[str, float]]:
+        """With ``dedup``, every id referencing a hit row that matches *wanted*, with the row's score."""
+        if not self.dedup:
+            return hits
+        expanded: List[Tuple[str, float]] = []
+        for eid, score in hits:
+            for ref, meta in self._refs[self._rows[eid]].items():
+                # the row index matched any reference per field; check each reference on all fields
+                if all(meta.get(field) in values for field, values in wanted.items()):
+                    expanded.append((ref, score))
+        return expanded
+
+    def dedup_stats(self) -> Dict[str, int]:
+        """Chunk ids versus stored rows; ``shared_rows`` are referenced by more than one chunk."""
+        return {
+            "ids": len(self._rows),
+            "rows": self._count,
+            "shared_rows": sum(1 for refs in self._refs if len(refs) > 1),
+        }
+
+    def _best(self, scores: np.ndarray, k: int, rows: np.ndarray | None) -> List[Tuple[str, float]]:
+        """The *k* highest *scores*, sorted; *rows* maps scores to matrix rows (``None``: identity)."""
+        if k < len(scores):
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")][:k]
+        if rows is not None:
+            return [(self._ids[rows[i]], float(scores[i])) for i in best]
+        return [(self._ids[i], float(scores[i])) for i in best]
+
+    async def similarity_search_many(
+        self,
+        embeddings: EmbeddingMatrix,
+        top_k: int = 5,
+        filters: dict | Sequence[dict | None] | None = None,
+    ) -> List[List[Tuple[str, float]]]:
+        queries = np.array(as_embedding_matrix(embeddings), dtype=np.float32, copy=True)
+        per_query = per_query_filters(filters, len(queries))
+        logger.info(
+            "vector.search_many", adapter="memory", queries=len(queries), top_k=top_k, store_size=len(self._rows)
+        )
+        results: List[List[Tuple[str, float]]] = [[] for _ in range(len(queries))]
+        if not self._rows or top_k <= 0 or not len(queries):
+            return results
+        norms = np.linalg.norm(queries, axis=1)
+        _normalize(queries)
+
+        # queries with the same filters share one candidate set and one product
+        groups: Dict[str, Tuple[Dict[str, List], List[int]]] = {}
+        for i, query_filters in enumerate(per_query):
+            if norms[i] == 0.0:
+                continue
+            wanted = normalize_filters(query_filters)
+            groups.setdefault(repr(sorted(wanted.items())), (wanted, []))[1].append(i)
+
+        for wanted, members in groups.values():
+            candidates = self._meta.rows(wanted) if wanted else None
+            if candidates is not None and not len(candidates):
+                continue
+            live = self._count if candidates is None else len(candidates)
+            k = min(top_k, live)
+            if self._bits is not None and live > k * max(self.rescore, 1):
+                # the Hamming prefilter shortlists differ per query
+                for i in members:
+                    results[i] = self._expand(self._search(queries[i], top_k, wanted), wanted)
+                continue
+            if candidates is None:
+                rows = None
+                scores = self._matrix[: self._size] @ queries[members].T
+                if self._count < self._size:
+                    scores[~self._live[: self._size]] = -np.inf
+            else:
+                rows = candidates
+                scores = self._matrix[rows] @ queries[members].T
+            for column, i in enumerate(members):
+                results[i] = self._expand(self._best(np.ascontiguousarray(scores[:, column]), k, rows), wanted)
+        return results
+
+    async def hybrid_search(
+        self,
+        text: str,
+        embedding: EmbeddingVector,
         top_k: int = 5,
         filters: dict | None = None,
+        alpha: float = 0.5,
     ) -> List[Tuple[str, float]]:
-        logger.info("vector.search", adapter="memory", top_k=top_k, store_size=len(self._store))
-        if not self._store:
+        if not self._rows or top_k <= 0:
             return []
-        query = np.array(embedding)
-        results: List[Tuple[str, float]] = []
-        for k, v in self._store.items():
-            score = float(np.dot(query, v) / (np.linalg.norm(query) * np.linalg.norm(v)))
-            results.append((k, score))
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:top_k] 
\ No newline at end of file
+        depth = max(top_k, self.hybrid_depth)
+        wanted = normalize_filters(filters)
+        started = time.perf_counter()
+        vector_hits = self._search(embedding, depth, wanted) if alpha > 0 else []
+        vector_done = time.perf_counter()
+
+        lexical_ids: List[str] = []
+        if alpha < 1:
+            candidates = self._meta.rows(wanted) if wanted else None
+            if candidates is None or len(candidates):
+                rows, _ = self._lexical.scores(text, depth, candidates)
+                lexical_ids = [self._ids[row] for row in rows]
+        fused = reciprocal_rank_fusion([eid for eid, _ in vector_hits], lexical_ids, alpha=alpha, top_k=top_k)
+        logger.info(
+            "vector.hybrid_search",
+            adapter="memory",
+            top_k=top_k,
+            vector_ms=round((vector_done - started) * 1000, 3),
+            lexical_ms=round((time.perf_counter() - vector_done) * 1000, 3),
+            lexical_hits=len(lexical_ids),
+        )
+        return self._expand(fused, wanted)
+
+
+def _merged(refs: Dict[str, Dict]) -> Dict[str, List]:
+    """Filter fields of all *refs* of a shared row, as value lists for `MetadataIndex`."""
+    merged: Dict[str, Dict] = {}
+    for meta in refs.values():
+        for field, value in meta.items():
+            merged.setdefault(field, {})[value] = None
+    return {field: list(values) for field, values in merged.items()}
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+"""Inverted index over the filterable chunk metadata of a row-based store."""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence, Set
+
+import numpy as np
+
+from privategpt.core.ports.vector_store import FILTER_FIELDS
+
+
+class MetadataIndex:
+    """``field -> value -> rows`` for `FILTER_FIELDS`, one entry per store row.
+
+    Rows are appended in the same order as the store's own rows; removed rows
+    keep an empty entry until the store compacts and calls `keep`.  A field
+    may hold a list of values (a row shared by several chunks); the row is
+    then indexed under each of them.
+    """
+
+    def __init__(self) -> None:
+        self._meta: List[Dict[str, Any]] = []
+        self._index: Dict[str, Dict[Any, Set[int]]] = {f: defaultdict(set) for f in FILTER_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    @staticmethod
+    def indexed(metadata: dict | None) -> Dict[str, Any]:
+        meta = metadata or {}
+        indexed: Dict[str, Any] = {}
+        for f, cast in FILTER_FIELDS.items():
+            value = meta.get(f)
+            if isinstance(value, (list, tuple)):
+                indexed[f] = tuple(dict.fromkeys(cast(v) for v in value if v is not None))
+            elif value is not None:
+                indexed[f] = cast(value)
+        return indexed
+
+    def append(self, metadata: dict | None) -> None:
+        row = len(self._meta)
+        self._meta.append(self.indexed(metadata))
+        self._link(row)
+
+    def replace(self, row: int, metadata: dict | None) -> None:
+        self.remove(row)
+        self._meta[row] = self.indexed(metadata)
+        self._link(row)
+
+    def remove(self, row: int) -> None:
+        for field, value in self._meta[row].items():
+            for v in _values(value):
+                rows = self._index[field].get(v)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del self._index[field][v]
+        self._meta[row] = {}
+
+    def keep(self, rows: Sequence[int]) -> None:
+        """Keep only *rows*, renumbered ``0..len(rows)-1`` in the given order."""
+        self._meta = [self._meta[i] for i in rows]
+        self._index = {f: defaultdict(set) for f in FILTER_FIELDS}
+        for row in range(len(self._meta)):
+            self._link(row)
+
+    def rows(self, wanted: Dict[str, List[Any]]) -> np.ndarray:
+        """Sorted rows matching every field of *wanted* (any of its values)."""
+        per_field: List[Set[int]] = []
+        for field, values in wanted.items():
+            index = self._index[field]
+            rows: Set[int] = set()
+            for value in values:
+                rows |= index.get(value, set())
+            if not rows:
+                return np.empty(0, dtype=np.intp)
+            per_field.append(rows)
+        per_field.sort(key=len)
+        matched = per_field[0].intersection(*per_field[1:])
+        return np.fromiter(sorted(matched), dtype=np.intp, count=len(matched))
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return list(self._meta)
+
+    @classmethod
+    def from_list(cls, metas: List[Dict[str, Any]]) -> "MetadataIndex":
+        index = cls()
+        for meta in metas:
+            index.append(meta)
+        return index
+
+    def _link(self, row: int) -> None:
+        for field, value in self._meta[row].items():
+            for v in _values(value):
+                self._index[field][v].add(row)
+
+
+def _values(value: Any) -> tuple:
+    return value if isinstance(value, tuple) else (value,)
@@ -0,0 +1,560 @@
+from __future__ import annotations
+
+"""Exact vector store on append-only, memory-mapped segments.
+
+Every ``add_vectors`` call writes one immutable segment directory::
+
+    seg-000042/
+        vectors.npy       (rows, dim) float32, L2-normalised
+        ids.npy           uint8 blob of the utf-8 ids
+        id_offsets.npy    (rows + 1,) int64 offsets into ids.npy
+        <field>.npy       one column per filterable field (FILTER_FIELDS);
+                          ints as int64, strings as int32 codes into
+        vocab.json        ...the per-segment string vocabularies
+        tombstones.npy    (rows,) uint8, the only file changed in place
+        vector_rows.npy   (rows,) int64 row in vectors.npy of each id, and
+        content.npy       (rows,) int64 text hash; only with ``dedup``
+
+and ``MANIFEST.json`` (replaced atomically) lists the live segments.  Opening
+the store only memory-maps those files, so restart cost does not depend on
+the corpus size and the resident set is whatever the OS page cache keeps.
+
+A search scores each segment with one matrix–vector product, masks
+tombstoned and filtered-out rows, takes a per-segment ``argpartition``
+top-k and merges those.  Deletes set tombstone bytes; the shared mapping
+makes them visible to every process at once.  Small segments are merged –
+and tombstoned rows dropped – by a compaction that runs in a background
+thread once ``compact_max_small`` small segments have piled up.
+
+With ``dedup=True`` chunks of the same user with identical text (disclaimers,
+headers, signature blocks) share one vector: the rows of a segment are
+references, and ``vector_rows`` points each at its vector.  Copies within one
+``add_vectors`` call share at once, copies in different calls once compaction
+merges their segments.  A search ranks the distinct vectors and expands each
+hit into every reference that matches the filters, all with the vector's
+score, so ``top_k`` counts distinct texts.
+
+Writers serialise on an ``flock``; readers notice a new manifest on their
+next search.  The sources of a compaction stay on disk until the next one,
+for readers that read the previous manifest but have not opened them yet.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from privategpt.core.domain.chunk import content_hash
+from privategpt.core.ports.embedder import EmbeddingMatrix, EmbeddingVector, as_embedding_matrix
+from privategpt.core.ports.vector_store import FILTER_FIELDS, VectorStorePort, normalize_filters
+from privategpt.shared.logging import get_logger
+
+logger = get_logger("vector.segmented")
+
+_MANIFEST = "MANIFEST.json"
+_LOCK = ".lock"
+_REFRESH_ATTEMPTS = 3
+_MISSING_INT = np.iinfo(np.int64).min
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _content_key(meta: dict) -> int:
+    """60 bits of the text's `content_hash`, or `_MISSING_INT` for chunks without text."""
+    text = (meta or {}).get("text")
+    return _MISSING_INT if text is None else int(content_hash(text)[:15], 16)
+
+
+def _share(users: np.ndarray, content: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct vectors for references keyed by (user, content).
+
+    Returns the reference that supplies each distinct vector, and the vector
+    row of every reference.  References without text keep a vector of their own.
+    """
+    shareable = content != _MISSING_INT
+    keys = np.stack([users, content], axis=1)
+    keys[~shareable, 1] = _MISSING_INT
+    keys[~shareable, 0] = np.flatnonzero(~shareable)  # unique per reference
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    # keep the vectors in reference order
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse.ravel()].astype(np.int64)
+
+
+@dataclass
+class _Segment:
+    name: str
+    vectors: np.ndarray
+    tombstones: np.ndarray
+    id_blob: np.ndarray
+    id_offsets: np.ndarray
+    columns: Dict[str, np.ndarray]
+    vocab: Dict[str, Dict[str, int]]
+    vector_rows: np.ndarray | None = None  # reference -> vector row; None when none are shared
+    content: np.ndarray | None = None
+    _id_hashes: np.ndarray | None = field(default=None, repr=False)  # sorted hash(id)
+    _id_order: np.ndarray | None = field(default=None, repr=False)  # row of each sorted hash
+    _names: Dict[str, List[str]] | None = field(default=None, repr=False)
+
+    @property
+    def rows(self) -> int:
+        return len(self.tombstones)
+
+    def vector_row(self, rows: np.ndarray) -> np.ndarray:
+        """Rows of `vectors` holding the vectors of references *rows*."""
+        return rows if self.vector_rows is None else self.vector_rows[rows]
+
+    def content_keys(self, rows: np.ndarray) -> np.ndarray:
+        if self.content is None:
+            return np.full(len(rows), _MISSING_INT, dtype=np.int64)
+        return np.asarray(self.content[rows])
+
+    def id_at(self, row: int) -> str:
+        return bytes(self.id_blob[self.id_offsets[row] : self.id_offsets[row + 1]]).decode("utf-8")
+
+    def row_of(self, eid: str) -> int | None:
+        """Live row holding *eid*.
+
+        Looked up in a sorted array of id hashes built on first use (writers
+        only), 16 bytes per row instead of a dict of every id string.
+        """
+        if self._id_hashes is None:
+            hashes = np.fromiter((hash(self.id_at(row)) for row in range(self.rows)), dtype=np.int64, count=self.rows)
+            self._id_order = np.argsort(hashes, kind="stable")
+            self._id_hashes = hashes[self._id_order]
+        target = hash(eid)
+        i = int(np.searchsorted(self._id_hashes, target))
+        while i < len(self._id_hashes) and self._id_hashes[i] == target:
+            row = int(self._id_order[i])
+            if not self.tombstones[row] and self.id_at(row) == eid:
+                return row
+            i += 1
+        return None
+
+    def live(self) -> np.ndarray:
+        return self.tombstones == 0
+
+    def match(self, wanted: Dict[str, List[Any]]) -> np.ndarray:
+        mask = self.live()
+        for name, values in wanted.items():
+            if FILTER_FIELDS[name] is str:
+                codes = [self.vocab[name][v] for v in values if v in self.vocab.get(name, {})]
+                if not codes:
+                    return np.zeros(self.rows, dtype=bool)
+                mask &= np.isin(self.columns[name], codes)
+            else:
+                mask &= np.isin(self.columns[name], values)
+        return mask
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        if self._names is None:
+            # codes are assigned 0..n-1 in insertion order
+            self._names = {name: list(codes) for name, codes in self.vocab.items()}
+        meta: Dict[str, Any] = {}
+        for name, cast in FILTER_FIELDS.items():
+            value = int(self.columns[name][row])
+            if cast is str:
+                if value >= 0:
+                    meta[name] = self._names[name][value]
+            elif value != _MISSING_INT:
+                meta[name] = value
+        return meta
+
+    @classmethod
+    def open(cls, directory: Path) -> "_Segment":
+        load = lambda name, mode="r": np.load(directory / f"{name}.npy", mmap_mode=mode)  # noqa: E731
+        optional = lambda name: load(name) if (directory / f"{name}.npy").exists() else None  # noqa: E731
+        return cls(
+            name=directory.name,
+            vectors=load("vectors"),
+            # r+ maps the file shared, so tombstones set by any process are seen by all
+            tombstones=load("tombstones", "r+"),
+            id_blob=load("ids"),
+            id_offsets=load("id_offsets"),
+            columns={name: load(name) for name in FILTER_FIELDS},
+            vocab=json.loads((directory / "vocab.json").read_text()),
+            vector_rows=optional("vector_rows"),
+            content=optional("content"),
+        )
+
+    @staticmethod
+    def write(
+        directory: Path,
+        vectors: np.ndarray,
+        ids: List[str],
+        metadatas: List[dict],
+        vector_rows: np.ndarray | None = None,
+        content: np.ndarray | None = None,
+    ) -> None:
+        """Write a segment; with *vector_rows* the ids reference the (fewer) *vectors*."""
+        tmp = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        np.save(tmp / "vectors.npy", vectors)
+        encoded = [eid.encode("utf-8") for eid in ids]
+        np.save(tmp / "ids.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(tmp / "id_offsets.npy", np.concatenate([[0], np.cumsum([len(e) for e in encoded])]).astype(np.int64))
+        vocab: Dict[str, Dict[str, int]] = {}
+        for name, cast in FILTER_FIELDS.items():
+            values = [(m or {}).get(name) for m in metadatas]
+            if cast is str:
+                codes = vocab.setdefault(name, {})
+                column = np.array(
+                    [-1 if v is None else codes.setdefault(str(v), len(codes)) for v in values], dtype=np.int32
+                )
+            else:
+                column = np.array([_MISSING_INT if v is None else int(v) for v in values], dtype=np.int64)
+            np.save(tmp / f"{name}.npy", column)
+        (tmp / "vocab.json").write_text(json.dumps(vocab))
+        np.save(tmp / "tombstones.npy", np.zeros(len(ids), dtype=np.uint8))
+        if vector_rows is not None:
+            np.save(tmp / "vector_rows.npy", vector_rows)
+            np.save(tmp / "content.npy", content)
+        os.replace(tmp, directory)
+
+
+class SegmentedVectorStore(VectorStorePort):
+    """Flat (exact) vector store on memory-mapped segments under *path*."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        compact_min_rows: int = 65_536,
+        compact_max_small: int = 8,
+        background_compaction: bool = True,
+        dedup: bool = False,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.compact_min_rows = compact_min_rows
+        self.compact_max_small = compact_max_small
+        self.background_compaction = background_compaction
+        self.dedup = dedup
+        self._segments: List[_Segment] = []
+        self._manifest_stamp: Tuple[int, int] | None = None
+        self._next_seq = 0
+        self._dim: int | None = None
+        self._retired: List[str] = []  # sources of the last compaction, deleted by the next one
+        self._compacting = threading.Lock()
+        self._state = threading.RLock()  # guards the segment list within this process
+        self._refresh()
+
+    # -- manifest -----------------------------------------------------------
+
+    def _stamp(self) -> Tuple[int, int] | None:
+        try:
+            st = os.stat(self.path / _MANIFEST)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _refresh(self) -> None:
+        """Re-open the segment list if another process replaced the manifest.
+
+        A segment named by the manifest just read can be removed before it is
+        opened (its retirement was two compactions ago); the manifest is then
+        read again.
+        """
+        for attempt in range(_REFRESH_ATTEMPTS):
+            stamp = self._stamp()
+            if stamp == self._manifest_stamp:
+                return
+            try:
+                with self._state:
+                    manifest = json.loads((self.path / _MANIFEST).read_text()) if stamp else {}
+                    opened = {s.name: s for s in self._segments}
+                    self._segments = [
+                        opened.get(name) or _Segment.open(self.path / name) for name in manifest.get("segments", [])
+                    ]
+                    self._next_seq = manifest.get("next_seq", 0)
+                    self._dim = manifest.get("dim")
+                    self._retired = manifest.get("retired", [])
+                    self._manifest_stamp = stamp
+                return
+            except FileNotFoundError:
+                if attempt == _REFRESH_ATTEMPTS - 1:
+                    raise
+
+    def _write_manifest(self, segments: List[_Segment]) -> None:
+        manifest = {
+            "dim": self._dim,
+            "next_seq": self._next_seq,
+            "segments": [s.name for s in segments],
+            "retired": self._retired,
+        }
+        tmp = self.path / f"{_MANIFEST}.tmp"
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, self.path / _MANIFEST)
+        self._segments = segments
+        self._manifest_stamp = self._stamp()
+
+    @contextmanager
+    def _writer(self) -> Iterator[None]:
+        fd = os.open(self.path / _LOCK, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with self._state:
+                self._refresh()
+                yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _new_segment_dir(self) -> Path:
+        directory = self.path / f"seg-{self._next_seq:06d}"
+        self._next_seq += 1
+        return directory
+
+    def __len__(self) -> int:
+        self._refresh()
+        return sum(int(np.count_nonzero(s.live())) for s in self._segments)
+
+    def segments(self) -> List[_Segment]:
+        """The current segments, after picking up other processes' changes."""
+        self._refresh()
+        return self._segments
+
+    # -- writes -------------------------------------------------------------
+
+    def contains(self, filters: Dict[str, Any]) -> bool:
+        """Whether any live row matches *filters* (column scans only, no id lookups)."""
+        wanted = normalize_filters(filters)
+        return any(segment.match(wanted).any() for segment in self.segments())
+
+    def _tombstone(self, eid: str, segments: List[_Segment] | None = None) -> bool:
+        for segment in self._segments if segments is None else segments:
+            row = segment.row_of(eid)
+            if row is not None:
+                segment.tombstones[row] = 1
+                return True
+        return False
+
+    async def add_vectors(self, embeddings: EmbeddingMatrix, metadatas: List[dict], ids: List[str]) -> None:
+        logger.info("vector.add", adapter="segmented", count=len(ids))
+        matrix = as_embedding_matrix(embeddings)
+        if not len(ids):
+            return
+        if len(ids) != len(matrix):
+            raise ValueError(f"{len(ids)} ids for {len(matrix)} embeddings")
+        # within one call the last vector for an id wins
+        last = {eid: i for i, eid in enumerate(ids)}
+        keep = sorted(last.values())
+        vectors = _normalize_rows(np.array(matrix[keep], dtype=np.float32, copy=True))
+        metadatas = list(metadatas) + [{}] * (len(ids) - len(metadatas))
+        with self._writer():
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"embedding dimension {vectors.shape[1]} does not match store dimension {self._dim}")
+            for i in keep:
+                self._tombstone(ids[i])  # upsert: the old row stays behind as a tombstone
+            directory = self._new_segment_dir()
+            self._write_segment(directory, vectors, [ids[i] for i in keep], [metadatas[i] for i in keep])
+            self._write_manifest(self._segments + [_Segment.open(directory)])
+        self._maybe_compact()
+
+    def _write_segment(
+        self,
+        directory: Path,
+        vectors: np.ndarray,
+        ids: List[str],
+        metadatas: List[dict],
+        content: np.ndarray | None = None,
+    ) -> None:
+        """`_Segment.write` with one row per id, shared by equal texts when ``dedup``.
+
+        *content* holds the text keys when *metadatas* carry no text (compaction).
+        """
+        if not self.dedup:
+            _Segment.write(directory, vectors, ids, metadatas)
+            return
+        if content is None:
+            content = np.array([_content_key(m) for m in metadatas], dtype=np.int64)
+        users = np.array(
+            [_MISSING_INT if m.get("user_id") is None else int(m["user_id"]) for m in metadatas], dtype=np.int64
+        )
+        distinct, vector_rows = _share(users, content)
+        _Segment.write(directory, vectors[distinct], ids, metadatas, vector_rows, content)
+
+    async def delete_vectors(self, ids: Iterable[str], filters: Dict[str, Any] | None = None) -> int:
+        """Tombstone *ids*; returns how many were present.
+
+        *filters* (e.g. the ids' ``document_id``) limits the id lookup to the
+        segments holding matching rows.
+        """
+        wanted = normalize_filters(filters)
+        with self._writer():
+            segments = [s for s in self._segments if s.match(wanted).any()] if wanted else None
+            removed = sum(self._tombstone(eid, segments) for eid in ids)
+        logger.info("vector.delete", adapter="segmented", count=removed)
+        return removed
+
+    # -- compaction ---------------------------------------------------------
+
+    def _small_segments(self) -> List[_Segment]:
+        return [s for s in self._segments if s.rows < self.compact_min_rows]
+
+    def _maybe_compact(self) -> None:
+        if len(self._small_segments()) < self.compact_max_small or self._compacting.locked():
+            return
+        if self.background_compaction:
+            threading.Thread(target=self.compact, name="vector-compaction", daemon=True).start()
+        else:
+            self.compact()
+
+    def compact(self) -> bool:
+        """Merge the small segments into one, dropping tombstoned rows.
+
+        The merge itself runs without the writer lock; rows deleted meanwhile
+        are carried over to the merged segment before the manifest is swapped.
+        """
+        if not self._compacting.acquire(blocking=False):
+            return False
+        try:
+            self._refresh()
+            sources = self._small_segments()
+            if len(sources) < 2:
+                return False
+            keep = [np.flatnonzero(s.live()) for s in sources]
+            ids = [s.id_at(r) for s, rows in zip(sources, keep) for r in rows.tolist()]
+            vectors = (
+                np.concatenate([np.asarray(s.vectors[s.vector_row(rows)]) for s, rows in zip(sources, keep)])
+                if ids
+                else np.zeros((0, self._dim or 0), dtype=np.float32)
+            )
+            metadatas = [s.metadata(r) for s, rows in zip(sources, keep) for r in rows.tolist()]
+            content = (
+                np.concatenate([s.content_keys(rows) for s, rows in zip(sources, keep)])
+                if ids
+                else np.zeros(0, dtype=np.int64)
+            )
+            with self._writer():
+                names = {s.name for s in self._segments}
+                if any(s.name not in names for s in sources):
+                    return False  # another process compacted them already
+                directory = self._new_segment_dir()
+                # copies of a text from different sources now share one vector
+                self._write_segment(directory, vectors, ids, metadatas, content)
+                merged = _Segment.open(directory)
+                # rows tombstoned while we were merging
+                late = np.concatenate(
+                    [s.tombstones[rows] != 0 for s, rows in zip(sources, keep)]
+                ) if ids else np.zeros(0, dtype=bool)
+                merged.tombstones[late] = 1
+                merged.tombstones.flush()
+                source_names = {s.name for s in sources}
+                rest = [s for s in self._segments if s.name not in source_names]
+                # a reader may have read the old manifest without opening the
+                # sources yet, so they are only removed by the next compaction
+                self._retired = sorted(source_names)
+                # the merged rows are the oldest data, so they go first
+                self._write_manifest([merged] + rest)
+                # segments retired last time, plus leftovers of writers that died
+                # before their manifest swap; mappings readers hold stay valid
+                keep_dirs = {s.name for s in self._segments} | source_names
+                for directory in self.path.glob("seg-*"):
+                    if directory.name not in keep_dirs:
+                        shutil.rmtree(directory, ignore_errors=True)
+            logger.info(
+                "vector.compact", adapter="segmented", merged=len(sources), rows=len(ids), segments=len(self._segments)
+            )
+            return True
+        finally:
+            self._compacting.release()
+
+    # -- search -------------------------------------------------------------
+
+    async def similarity_search(
+        self,
+        embedding: EmbeddingVector,
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> List[Tuple[str, float]]:
+        self._refresh()
+        segments = self._segments
+        logger.info("vector.search", adapter="segmented", top_k=top_k, segments=len(segments))
+        if not segments or top_k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        query = query / norm
+        wanted = normalize_filters(filters)
+
+        best_scores: List[np.ndarray] = []
+        best_refs: List[Tuple[_Segment, np.ndarray]] = []
+        for segment in segments:
+            mask = segment.match(wanted) if wanted else segment.live()
+            if not mask.any():
+                continue
+            scores = segment.vectors @ query
+            if segment.vector_rows is None:
+                scores[~mask] = -np.inf
+                live = int(np.count_nonzero(mask))
+            else:
+                # rank vectors that a matching reference points at
+                referenced = np.zeros(len(scores), dtype=bool)
+                referenced[segment.vector_rows[mask]] = True
+                scores[~referenced] = -np.inf
+                live = int(np.count_nonzero(referenced))
+            k = min(top_k, live)
+            top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            top = top[np.isfinite(scores[top])]
+            if segment.vector_rows is not None:
+                # ...and expand the winners into those references
+                chosen = np.zeros(len(scores), dtype=bool)
+                chosen[top] = True
+                top = np.flatnonzero(mask & chosen[segment.vector_rows])
+                best_scores.append(scores[segment.vector_rows[top]])
+            else:
+                best_scores.append(scores[top])
+            best_refs.append((segment, top))
+        if not best_scores:
+            return []
+
+        # merge the per-segment winners: top_k distinct vectors, with all their references
+        scores = np.concatenate(best_scores)
+        owners = np.concatenate([np.full(len(rows), i) for i, (_, rows) in enumerate(best_refs)])
+        rows = np.concatenate([rows for _, rows in best_refs])
+        vector_rows = np.concatenate([segment.vector_row(rows) for segment, rows in best_refs])
+        content = np.concatenate([segment.content_keys(rows) for segment, rows in best_refs])
+        users = np.concatenate([segment.columns["user_id"][rows] for segment, rows in best_refs])
+        hits: List[Tuple[str, float]] = []
+        seen: set = set()
+        for i in np.argsort(-scores, kind="stable").tolist():
+            # copies of a text in segments not merged yet count as one hit
+            if content[i] != _MISSING_INT:
+                key = ("text", users[i], content[i])
+            else:
+                key = ("row", owners[i], vector_rows[i])
+            if key not in seen:
+                if len(seen) == top_k:
+                    continue
+                seen.add(key)
+            hits.append((best_refs[owners[i]][0].id_at(int(rows[i])), float(scores[i])))
+        return hits
+
+    def dedup_stats(self) -> Dict[str, int]:
+        """Live ids versus the vectors they use; ``shared_rows`` are used by more than one id."""
+        ids = rows = shared = 0
+        for segment in self.segments():
+            live = np.flatnonzero(segment.live())
+            uses = np.bincount(segment.vector_row(live), minlength=len(segment.vectors))
+            ids += len(live)
+            rows += int(np.count_nonzero(uses))
+            shared += int(np.count_nonzero(uses > 1))
+        return {"ids": ids, "rows": rows, "shared_rows": shared}
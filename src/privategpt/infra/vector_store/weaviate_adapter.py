@@ -3,145 +3,466 @@ from __future__ import annotations
 
 import os
 import asyncio
-from typing import Sequence, List, Tuple, Dict
+from typing import Any, List, Sequence, Tuple, Dict
 import logging
 
-import weaviate
+import numpy as np
 
-from privategpt.core.ports.vector_store import VectorStorePort
+from privategpt.core.ports.embedder import EmbeddingMatrix, EmbeddingVector
+from privategpt.core.ports.vector_store import FILTER_FIELDS, VectorStorePort, normalize_filters, per_query_filters
+from privategpt.infra.vector_store.weaviate_client import get_weaviate_manager
 
 logger = logging.getLogger(__name__)
 
 _COLLECTION = "PrivateGPTChunks"
+# multi-tenancy cannot be switched on for an existing class, so tenants get their own
+TENANT_COLLECTION = "PrivateGPTChunksByTenant"
+_SHARED_TENANT = "shared"
+
+
+def _filter_properties():
+    """Typed, filterable schema properties for `FILTER_FIELDS`."""
+    from weaviate.classes.config import DataType, Property, Tokenization
+
+    return [
+        Property(name=name, data_type=DataType.INT, index_filterable=True, skip_vectorization=True)
+        if cast is int
+        else Property(
+            name=name,
+            data_type=DataType.TEXT,
+            tokenization=Tokenization.FIELD,  # match whole ids, not words
+            index_filterable=True,
+            skip_vectorization=True,
+        )
+        for name, cast in FILTER_FIELDS.items()
+    ]
+
+
+def build_filter(filters: Dict[str, Any] | None):
+    """Weaviate ``Filter`` for search *filters*, or None when unfiltered.
+
+    Values of one field are OR-ed, fields are AND-ed.
+    """
+    from weaviate.classes.query import Filter
+
+    wanted = normalize_filters(filters)
+    clauses = []
+    for field, values in wanted.items():
+        prop = Filter.by_property(field)
+        clauses.append(prop.equal(values[0]) if len(values) == 1 else prop.contains_any(values))
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else Filter.all_of(clauses)
+
+
+def tenant_name(user_id: Any) -> str:
+    """Weaviate tenant holding the chunks of *user_id*; unowned chunks share one."""
+    return _SHARED_TENANT if user_id is None else f"user-{int(user_id)}"
+
+
+def _active_status():
+    from weaviate.classes.tenants import TenantActivityStatus
+
+    return getattr(TenantActivityStatus, "ACTIVE", None) or TenantActivityStatus.HOT
+
+
+def _chunk_properties(meta: dict) -> Dict[str, Any]:
+    properties = {
+        "text": meta.get("text", ""),
+        "metadata": str(meta.get("metadata", "")),
+    }
+    properties.update((f, cast(meta[f])) for f, cast in FILTER_FIELDS.items() if meta.get(f) is not None)
+    return properties
+
+
+def _ensure_schema(client, name: str = _COLLECTION, multi_tenancy: bool = False) -> None:
+    """Create the chunk collection, or add filter properties it lacks."""
+    try:
+        # Check if collection exists
+        collections = client.collections.list_all()
+        if name in collections:
+            logger.info(f"Collection {name} already exists")
+            # collections created before filter pushdown lack the typed properties
+            collection = client.collections.get(name)
+            existing = {p.name for p in collection.config.get().properties}
+            for prop in _filter_properties():
+                if prop.name not in existing:
+                    collection.config.add_property(prop)
+                    logger.info(f"Added property {prop.name} to {name}")
+            return
+        
+        # Create collection with v4 API
+        from weaviate.classes.config import Configure, Property, DataType
+        
+        client.collections.create(
+            name=name,
+            description="RAG document chunks",
+            vectorizer_config=Configure.Vectorizer.none(),
+            # one shard (and HNSW graph) per tenant; tenants are created on first write
+            multi_tenancy_config=Configure.multi_tenancy(enabled=True) if multi_tenancy else None,
+            properties=[
+                Property(name="text", data_type=DataType.TEXT),
+                Property(name="metadata", data_type=DataType.TEXT),
+                *_filter_properties(),
+            ]
+        )
+        logger.info(f"Created collection {name}")
+    except Exception as e:
+        logger.error(f"Failed to create schema: {e}")
+        # Continue anyway - may already exist
 
 
 class WeaviateAdapter(VectorStorePort):
-    """Weaviate implementation with v3 compatibility."""
+    """Weaviate implementation with v3 compatibility.
 
-    def __init__(self, url: str | None = None):
+    Adapters do not own a connection: they borrow the process-wide client of
+    `get_weaviate_manager`, which connects and checks the schema once.
+
+    With ``multi_tenancy`` chunks live in `TENANT_COLLECTION`, one Weaviate
+    tenant per owning user (`tenant_name`).  Writes go to the tenant of each
+    chunk's ``user_id``; searches with a ``user_id`` filter touch only those
+    tenants plus the shared one holding unowned chunks, and deletes only the
+    named tenants.  Without one they visit every active tenant.  Tenants can
+    be deactivated (`set_tenant_activity`) to unload their shard; a tenant is
+    reactivated when it is next named.  `migrate_to_tenants` copies the
+    shared class into the tenant collection.
+    """
+
+    def __init__(self, url: str | None = None, multi_tenancy: bool = False):
         self.url = url or os.getenv("WEAVIATE_URL", "http://weaviate:8080")
-        self._client = None
+        self.multi_tenancy = multi_tenancy
+        self.collection_name = TENANT_COLLECTION if multi_tenancy else _COLLECTION
+        self._active: set[str] = set()  # tenants this process knows to exist and be active
+        self._manager = get_weaviate_manager(self.url)
+        self._manager.set_schema_check(
+            lambda client: _ensure_schema(client, self.collection_name, multi_tenancy)
+        )
 
     async def _ensure_client(self):
-        if self._client is not None:
-            return self._client
-
-        def _connect():
-            # Extract host from URL
-            url_parts = self.url.replace("http://", "").replace("https://", "").split(":")
-            host = url_parts[0]
-            port = int(url_parts[1]) if len(url_parts) > 1 else 8080
-            
-            logger.info(f"Connecting to Weaviate at {host}:{port}")
-            
-            # Use v4 connection method
-            return weaviate.connect_to_local(
-                host=host,
-                port=port,
-                grpc_port=50051,
-                skip_init_checks=False
-            )
+        if self._manager.connected:
+            return self._manager.get()
+        return await asyncio.to_thread(self._manager.get)
 
-        self._client = await asyncio.to_thread(_connect)
-        
-        # Check if ready
-        try:
-            is_ready = await asyncio.to_thread(lambda: self._client.is_ready())
-            if not is_ready:
-                raise RuntimeError(f"Weaviate not ready at {self.url}")
-        except Exception as e:
-            logger.warning(f"Failed to check readiness: {e}, assuming ready")
-        
-        await self._ensure_schema()
-        return self._client
+    def _on_error(self, client) -> None:
+        # a dropped connection is replaced on the next call
+        self._manager.invalidate(client)
 
-    async def _ensure_schema(self) -> None:
-        client = self._client
-        assert client is not None
-        
-        def _create_schema():
-            try:
-                # Check if collection exists
-                collections = client.collections.list_all()
-                if _COLLECTION in collections:
-                    logger.info(f"Collection {_COLLECTION} already exists")
+    # -- tenants --------------------------------------------------------------
+
+    def _collection(self, client, tenant: str | None = None):
+        collection = client.collections.get(self.collection_name)
+        return collection.with_tenant(tenant) if tenant is not None else collection
+
+    def _tenants(self, client, filters: Dict | None, shared: bool = False) -> List[str | None]:
+        """Tenants a search or delete with *filters* must visit (``[None]`` without tenancy).
+
+        A ``user_id`` filter names its tenants, plus the shared tenant when
+        *shared*; without one every tenant that is active now is visited, so
+        deactivated tenants stay unloaded.
+        """
+        if not self.multi_tenancy:
+            return [None]
+        users = normalize_filters(filters).get("user_id")
+        if users is not None:
+            names = [tenant_name(u) for u in users]
+            return names + [_SHARED_TENANT] if shared and _SHARED_TENANT not in names else names
+        active_status = _active_status()
+        active = sorted(n for n, t in self._collection(client).tenants.get().items() if t.activity_status == active_status)
+        self._active.update(active)
+        return active
+
+    def _where(self, filters: Dict | None):
+        """Search filter; with tenancy the tenant already scopes ``user_id``."""
+        if not self.multi_tenancy:
+            return build_filter(filters)
+        # shared chunks have no user_id to match
+        return build_filter({f: v for f, v in normalize_filters(filters).items() if f != "user_id"})
+
+    def _ensure_tenants(self, client, names: Sequence[str], create: bool) -> List[str]:
+        """Activate *names* (creating them when *create*); returns those that exist."""
+        missing = [n for n in names if n not in self._active]
+        if not missing:
+            return list(names)
+        from weaviate.classes.tenants import Tenant
+
+        active_status = _active_status()
+        tenants = self._collection(client).tenants
+        existing = tenants.get()
+        new = [n for n in missing if n not in existing]
+        if new and create:
+            tenants.create([Tenant(name=n) for n in new])
+            logger.info(f"Created tenants {new} in {self.collection_name}")
+            existing = {**existing, **{n: None for n in new}}
+        inactive = [
+            n for n in missing
+            if n in existing and existing[n] is not None and existing[n].activity_status != active_status
+        ]
+        if inactive:
+            tenants.update([Tenant(name=n, activity_status=active_status) for n in inactive])
+            logger.info(f"Activated tenants {inactive} in {self.collection_name}")
+        self._active.update(n for n in missing if n in existing)
+        return [n for n in names if n in existing]
+
+    async def set_tenant_activity(self, user_ids: Sequence[Any], active: bool) -> List[str]:
+        """Activate or deactivate (unload) the tenants of *user_ids*; returns their names."""
+        if not self.multi_tenancy:
+            return []
+        client = await self._ensure_client()
+        names = [tenant_name(u) for u in user_ids]
+
+        def _update():
+            from weaviate.classes.tenants import Tenant, TenantActivityStatus
+
+            if active:
+                return self._ensure_tenants(client, names, create=False)
+            inactive = getattr(TenantActivityStatus, "INACTIVE", None) or TenantActivityStatus.COLD
+            tenants = self._collection(client).tenants
+            existing = tenants.get()
+            present = [n for n in names if n in existing]
+            if present:
+                tenants.update([Tenant(name=n, activity_status=inactive) for n in present])
+            self._active.difference_update(present)
+            logger.info(f"Deactivated tenants {present} in {self.collection_name}")
+            return present
+
+        return await asyncio.to_thread(_update)
+
+    async def tenant_stats(self) -> Dict[str, str]:
+        """Activity status of every tenant."""
+        if not self.multi_tenancy:
+            return {}
+        client = await self._ensure_client()
+
+        def _stats():
+            tenants = self._collection(client).tenants.get()
+            return {name: str(getattr(t.activity_status, "value", t.activity_status)) for name, t in tenants.items()}
+
+        return await asyncio.to_thread(_stats)
+
+    async def migrate_to_tenants(self, batch_size: int = 1000, drop_source: bool = False) -> Dict[str, int]:
+        """Copy every chunk of the shared class into its user's tenant.
+
+        Object ids and vectors are kept, so chunks can be re-read, deleted or
+        re-ingested under the same uuid5 ids.  Running it again overwrites
+        the copies.  The shared class is deleted only with *drop_source*.
+        Returns the number of chunks copied per tenant.
+        """
+        if not self.multi_tenancy:
+            raise ValueError("migrate_to_tenants needs a multi-tenant adapter")
+        client = await self._ensure_client()
+
+        def _migrate():
+            if _COLLECTION not in client.collections.list_all():
+                return {}
+            source = client.collections.get(_COLLECTION)
+            copied: Dict[str, int] = {}
+            pending: Dict[str, list] = {}
+
+            def _flush(tenant: str) -> None:
+                objects = pending.pop(tenant, [])
+                if not objects:
                     return
-                
-                # Create collection with v4 API
-                from weaviate.classes.config import Configure, Property, DataType
-                
-                client.collections.create(
-                    name=_COLLECTION,
-                    description="RAG document chunks",
-                    vectorizer_config=Configure.Vectorizer.none(),
-                    properties=[
-                        Property(name="text", data_type=DataType.TEXT),
-                        Property(name="metadata", data_type=DataType.TEXT),
-                    ]
-                )
-                logger.info(f"Created collection {_COLLECTION}")
-            except Exception as e:
-                logger.error(f"Failed to create schema: {e}")
-                # Continue anyway - may already exist
-        
-        await asyncio.to_thread(_create_schema)
+                self._ensure_tenants(client, [tenant], create=True)
+                with self._collection(client, tenant).batch.dynamic() as batch:
+                    for obj in objects:
+                        vector = obj.vector.get("default") if isinstance(obj.vector, dict) else obj.vector
+                        batch.add_object(properties=obj.properties, vector=vector, uuid=obj.uuid)
+                copied[tenant] = copied.get(tenant, 0) + len(objects)
+
+            for obj in source.iterator(include_vector=True):
+                tenant = tenant_name(obj.properties.get("user_id"))
+                pending.setdefault(tenant, []).append(obj)
+                if len(pending[tenant]) >= batch_size:
+                    _flush(tenant)
+            for tenant in list(pending):
+                _flush(tenant)
+            logger.info(f"Migrated {sum(copied.values())} chunks into {len(copied)} tenants of {TENANT_COLLECTION}")
+            if drop_source:
+                client.collections.delete(_COLLECTION)
+                logger.info(f"Deleted shared collection {_COLLECTION}")
+            return copied
+
+        return await asyncio.to_thread(_migrate)
 
-    async def add_vectors(self, embeddings: List[Sequence[float]], metadatas: List[dict], ids: List[str]) -> None:
+    # -- vectors --------------------------------------------------------------
+
+    async def add_vectors(self, embeddings: EmbeddingMatrix, metadatas: List[dict], ids: List[str]) -> None:
         client = await self._ensure_client()
+        # the client serializes plain floats; convert the whole matrix once
+        rows = np.asarray(embeddings, dtype=np.float32).tolist()
 
         def _batch():
             try:
-                # Get collection
-                collection = client.collections.get(_COLLECTION)
-                
-                # Add objects in batch with v4 API
-                with collection.batch.dynamic() as batch:
-                    for vector, meta, _id in zip(embeddings, metadatas, ids):
-                        batch.add_object(
-                            properties={
-                                "text": meta.get("text", ""), 
-                                "metadata": str(meta.get("metadata", ""))
-                            },
-                            vector=list(vector),
-                            uuid=_id
-                        )
+                groups: Dict[str | None, List[int]] = {}
+                for i, meta in enumerate(metadatas):
+                    groups.setdefault(tenant_name(meta.get("user_id")) if self.multi_tenancy else None, []).append(i)
+                if self.multi_tenancy:
+                    self._ensure_tenants(client, list(groups), create=True)
+
+                for tenant, members in groups.items():
+                    # Add objects in batch with v4 API
+                    with self._collection(client, tenant).batch.dynamic() as batch:
+                        for i in members:
+                            batch.add_object(
+                                properties=_chunk_properties(metadatas[i]),
+                                vector=rows[i],
+                                uuid=ids[i]
+                            )
             except Exception as e:
                 logger.error(f"Batch insert failed: {e}")
+                self._active.clear()
+                self._on_error(client)
                 raise
         
         await asyncio.to_thread(_batch)
 
+    async def delete_vectors(self, ids: Sequence[str], filters: Dict | None = None) -> int:
+        """Delete *ids*; a ``user_id`` in *filters* limits the tenants searched.
+
+        Without one only active tenants are searched: deactivated ones are
+        not reloaded just to look for the ids.
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        client = await self._ensure_client()
+
+        def _delete():
+            from weaviate.classes.query import Filter
+
+            removed = 0
+            for tenant in self._tenants(client, filters):
+                if tenant is not None and not self._ensure_tenants(client, [tenant], create=False):
+                    continue
+                result = self._collection(client, tenant).data.delete_many(where=Filter.by_id().contains_any(ids))
+                removed += result.successful
+            return removed
+
+        return await asyncio.to_thread(_delete)
+
+    def _query_tenants(self, client, tenants: List[str | None], top_k: int, run, score) -> List[Tuple[str, float]]:
+        """Run ``run(collection)`` in each tenant and merge the hits by ``score(metadata)``."""
+        results = []
+        for tenant in tenants:
+            try:
+                if tenant is not None and not self._ensure_tenants(client, [tenant], create=False):
+                    continue  # user has no chunks yet
+                response = run(self._collection(client, tenant))
+            except Exception as e:
+                logger.error(f"Query failed: {e}")
+                # a tenant deactivated by another process is reactivated on the next call
+                self._active.discard(tenant)
+                self._on_error(client)
+                continue
+
+            for obj in response.objects:
+                # Get UUID as string
+                results.append((str(obj.uuid), score(obj.metadata)))
+
+        if len(tenants) > 1:
+            results.sort(key=lambda r: r[1], reverse=True)
+        return results[:top_k]
+
+    def _near_vector(
+        self, client, vector: List[float], top_k: int, where, tenants: List[str | None]
+    ) -> List[Tuple[str, float]]:
+        return self._query_tenants(
+            client,
+            tenants,
+            top_k,
+            # Query with v4 API
+            lambda collection: collection.query.near_vector(
+                near_vector=vector,
+                limit=top_k,
+                filters=where,
+                return_metadata=["certainty"]
+            ),
+            # Get certainty score
+            lambda metadata: metadata.certainty if hasattr(metadata, 'certainty') else 0.0,
+        )
+
+    def _search(self, client, vector: List[float], top_k: int, filters: Dict | None) -> List[Tuple[str, float]]:
+        try:
+            tenants = self._tenants(client, filters, shared=True)
+        except Exception as e:
+            logger.error(f"Listing tenants failed: {e}")
+            self._on_error(client)
+            return []
+        return self._near_vector(client, vector, top_k, self._where(filters), tenants)
+
     async def similarity_search(
         self,
-        embedding: Sequence[float],
+        embedding: EmbeddingVector,
         top_k: int = 5,
         filters: Dict | None = None,
     ) -> List[Tuple[str, float]]:
         client = await self._ensure_client()
+        if any(not values for values in normalize_filters(filters).values()):
+            return []  # a filter with no allowed values matches nothing
+        query = np.asarray(embedding, dtype=np.float32).tolist()
+        return await asyncio.to_thread(self._search, client, query, top_k, filters)
+
+    async def hybrid_search(
+        self,
+        text: str,
+        embedding: EmbeddingVector,
+        top_k: int = 5,
+        filters: Dict | None = None,
+        alpha: float = 0.5,
+    ) -> List[Tuple[str, float]]:
+        """Weaviate ``hybrid`` (BM25F over ``text`` plus the vector) with ranked fusion."""
+        client = await self._ensure_client()
+        if any(not values for values in normalize_filters(filters).values()):
+            return []
+        vector = np.asarray(embedding, dtype=np.float32).tolist()
+        where = self._where(filters)
+
+        def _hybrid():
+            from weaviate.classes.query import HybridFusion, MetadataQuery
 
-        def _query():
             try:
-                # Get collection
-                collection = client.collections.get(_COLLECTION)
-                
-                # Query with v4 API
-                response = collection.query.near_vector(
-                    near_vector=list(embedding),
-                    limit=top_k,
-                    return_metadata=["certainty"]
-                )
-                
-                results = []
-                for obj in response.objects:
-                    # Get UUID as string
-                    obj_id = str(obj.uuid)
-                    # Get certainty score
-                    certainty = obj.metadata.certainty if hasattr(obj.metadata, 'certainty') else 0.0
-                    results.append((obj_id, certainty))
-                
-                return results
+                tenants = self._tenants(client, filters, shared=True)
             except Exception as e:
-                logger.error(f"Query failed: {e}")
+                logger.error(f"Listing tenants failed: {e}")
+                self._on_error(client)
+                return []
+            return self._query_tenants(
+                client,
+                tenants,
+                top_k,
+                lambda collection: collection.query.hybrid(
+                    query=text,
+                    vector=vector,
+                    alpha=alpha,
+                    limit=top_k,
+                    filters=where,
+                    fusion_type=HybridFusion.RANKED,
+                    query_properties=["text"],
+                    return_metadata=MetadataQuery(score=True),
+                ),
+                lambda metadata: metadata.score or 0.0,
+            )
+
+        return await asyncio.to_thread(_hybrid)
+
+    async def similarity_search_many(
+        self,
+        embeddings: EmbeddingMatrix,
+        top_k: int = 5,
+        filters: Dict | Sequence[Dict | None] | None = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """Run the queries concurrently over the one gRPC channel.
+
+        The client has no multi-vector ``near_vector``, so each query is its
+        own request, but they are in flight together instead of back to back.
+        """
+        client = await self._ensure_client()
+        queries = np.asarray(embeddings, dtype=np.float32).tolist()
+        per_query = per_query_filters(filters, len(queries))
+
+        async def _one(query: List[float], query_filters: Dict | None) -> List[Tuple[str, float]]:
+            if any(not values for values in normalize_filters(query_filters).values()):
                 return []
+            return await asyncio.to_thread(self._search, client, query, top_k, query_filters)
 
-        return await asyncio.to_thread(_query)
\ No newline at end of file
+        return list(await asyncio.gather(*(_one(q, f) for q, f in zip(queries, per_query))))
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+"""Process-wide Weaviate client shared by every `WeaviateAdapter`.
+
+Connecting opens an HTTP session and a gRPC channel and, the first time, the
+schema is checked (``list_all`` plus create or property migration).  Doing
+that per request or per ingested document costs more than most queries, so
+each process keeps one connected client here:
+
+* the first `WeaviateClientManager.get` connects and runs the schema check;
+  later calls return the same client, whose channels stay open;
+* `invalidate` drops a client whose connection broke, and the next `get`
+  reconnects, retrying with exponential backoff;
+* a client inherited through ``fork`` is never used by the child, which
+  connects on its own;
+* `close` is called from the FastAPI lifespan and Celery shutdown hooks.
+
+`stats` counts connects, failures and schema checks so reuse can be verified
+(``/rag/vector-store/stats``).
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from privategpt.shared.logging import get_logger
+
+logger = get_logger("vector.weaviate.client")
+
+
+def _connect_local(url: str, grpc_port: int):
+    import weaviate
+
+    # Extract host from URL
+    url_parts = url.replace("http://", "").replace("https://", "").split(":")
+    host = url_parts[0]
+    port = int(url_parts[1]) if len(url_parts) > 1 else 8080
+    logger.info("weaviate.connect", host=host, port=port, grpc_port=grpc_port)
+    return weaviate.connect_to_local(host=host, port=port, grpc_port=grpc_port, skip_init_checks=False)
+
+
+class WeaviateClientManager:
+    """One connected Weaviate client per process, reconnected on failure."""
+
+    def __init__(
+        self,
+        url: str,
+        grpc_port: int = 50051,
+        connect_retries: int = 5,
+        backoff_s: float = 0.5,
+        max_backoff_s: float = 10.0,
+        connect: Callable[[str, int], Any] = _connect_local,
+    ):
+        self.url = url
+        self.grpc_port = grpc_port
+        self.connect_retries = connect_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self._connect = connect
+        self._schema_check: Callable[[Any], None] | None = None
+        self._client = None
+        self._pid = os.getpid()
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        self._counters = {"connects": 0, "connect_failures": 0, "reconnects": 0, "schema_checks": 0, "closes": 0}
+
+    def set_schema_check(self, check: Callable[[Any], None]) -> None:
+        """Run *check* with the client once per process, before it is first handed out."""
+        self._schema_check = check
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None and self._pid == os.getpid()
+
+    def get(self):
+        """The shared client, connecting (with retries) on first use or after `invalidate`."""
+        client = self._client
+        if client is not None and self._pid == os.getpid():
+            return client
+        with self._lock:
+            if self._pid != os.getpid():
+                # the parent's sockets are not ours to use or close
+                self._client, self._schema_ready, self._pid = None, False, os.getpid()
+            if self._client is None:
+                self._client = self._open()
+            if not self._schema_ready and self._schema_check is not None:
+                self._schema_check(self._client)
+                self._counters["schema_checks"] += 1
+                self._schema_ready = True
+            return self._client
+
+    def _open(self):
+        delay = self.backoff_s
+        for attempt in range(self.connect_retries + 1):
+            try:
+                client = self._connect(self.url, self.grpc_port)
+                try:
+                    if not client.is_ready():
+                        raise RuntimeError(f"Weaviate not ready at {self.url}")
+                except Exception:
+                    client.close()
+                    raise
+            except Exception as exc:
+                self._counters["connect_failures"] += 1
+                if attempt == self.connect_retries:
+                    logger.error("weaviate.connect.failed", url=self.url, attempts=attempt + 1, error=str(exc))
+                    raise
+                logger.warning(
+                    "weaviate.connect.retry", url=self.url, attempt=attempt + 1, delay_s=delay, error=str(exc)
+                )
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff_s)
+                continue
+            self._counters["connects"] += 1
+            if self._counters["connects"] > 1:
+                self._counters["reconnects"] += 1
+            return client
+
+    def invalidate(self, client) -> None:
+        """Drop *client* if it is still the shared one and no longer connected."""
+        with self._lock:
+            if client is not self._client:
+                return  # already replaced by another caller
+            try:
+                if client.is_connected():
+                    return
+            except Exception:  # noqa: BLE001 – a client that cannot answer is broken
+                pass
+            logger.warning("weaviate.connection.lost", url=self.url)
+            self._close_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        client, self._client = self._client, None
+        if client is None or self._pid != os.getpid():
+            return
+        try:
+            client.close()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("weaviate.close.failed", error=str(exc))
+        self._counters["closes"] += 1
+
+    def stats(self) -> Dict[str, object]:
+        return {**self._counters, "connected": self.connected, "schema_ready": self._schema_ready, "pid": os.getpid()}
+
+
+_managers: Dict[str, WeaviateClientManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_weaviate_manager(url: str) -> WeaviateClientManager:
+    """Return the process-wide client manager for *url*."""
+    manager = _managers.get(url)
+    if manager is not None:
+        return manager
+    from privategpt.shared.settings import settings
+
+    with _managers_lock:
+        return _managers.setdefault(
+            url,
+            WeaviateClientManager(
+                url,
+                connect_retries=settings.weaviate_connect_retries,
+                backoff_s=settings.weaviate_connect_backoff_s,
+            ),
+        )
+
+
+def weaviate_client_stats() -> Dict[str, Dict[str, object]]:
+    return {url: manager.stats() for url, manager in list(_managers.items())}
+
+
+def close_weaviate_clients() -> None:
+    """Close every client this process opened (lifespan and worker shutdown hooks)."""
+    for manager in list(_managers.values()):
+        manager.close()
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Dict, Any
+import datetime as _dt
+import os
+import uuid
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from privategpt.infra.database.async_session import get_async_session
@@ -12,7 +17,9 @@ from privategpt.core.domain.document import DocumentStatus, Document
 from privategpt.core.domain.collection import Collection, CollectionSettings
 from privategpt.core.domain.query import SearchQuery
 from privategpt.infra.tasks.celery_app import app as celery_app  # noqa: E501
-from privategpt.infra.tasks.service_factory import build_rag_service
+from privategpt.infra.tasks.ingest_batch import BatchItem, batch_progress, enqueue_batch, plan_batch
+from privategpt.infra.tasks.ingest_stream import remove_spool, spool_text, spool_upload
+from privategpt.infra.tasks.service_factory import build_rag_service, build_embedder, build_vector_store
 from privategpt.infra.tasks.celery_queue import CeleryTaskQueueAdapter
 from celery.result import AsyncResult
 
@@ -74,6 +81,16 @@ class DocumentOut(BaseModel):
     collection_id: Optional[str] = None
 
 
+class BatchDocumentsIn(BaseModel):
+    documents: List[DocumentIn] = Field(..., min_length=1)
+
+
+class DocumentReplace(BaseModel):
+    text: str = Field(..., min_length=1)
+    # "incremental" re-embeds only chunks whose text changed; "full" redoes every chunk
+    mode: Literal["incremental", "full"] = "incremental"
+
+
 class ChatRequest(BaseModel):
     question: str = Field(..., min_length=1)
     collection_ids: Optional[List[str]] = None
@@ -89,22 +106,239 @@ class ChatAnswer(BaseModel):
 async def upload_document(
     data: DocumentIn, session: AsyncSession = Depends(get_async_session)
 ):
-    repo = SqlDocumentRepository(session)
-    import datetime as _dt
+    # the text goes to the shared spool, only its path rides the broker
+    path = await run_in_threadpool(spool_text, data.text)
+    doc = await _enqueue_ingest(session, data.title, path)
+    return {"task_id": doc.task_id, "document_id": doc.id}
+
+
+@router.post("/documents/upload", status_code=status.HTTP_202_ACCEPTED)
+async def upload_document_file(
+    request: Request,
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None),
+    collection_id: Optional[str] = Form(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Upload a UTF-8 text file without holding it in memory.
+
+    The file is copied to the spool block by block and the worker streams it
+    from there.
+    """
+    user_id = None
+    if collection_id:
+        user_id = get_current_user_id(request)
+        collection = await CollectionRepository(session).get_by_id(collection_id)
+        if not collection:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        if collection.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+    suffix = os.path.splitext(file.filename or "")[1] or ".txt"
+    path = await run_in_threadpool(spool_upload, file.file, suffix)
+    doc = await _enqueue_ingest(
+        session, title or file.filename or path.name, path, collection_id=collection_id, user_id=user_id
+    )
+    return {"task_id": doc.task_id, "document_id": doc.id, "collection_id": collection_id}
+
 
+async def _enqueue_ingest(
+    session: AsyncSession,
+    title: str,
+    path,
+    collection_id: Optional[str] = None,
+    user_id: Optional[int] = None,
+) -> Document:
+    """Create a pending document for the spooled file at *path* and queue its ingestion."""
+    repo = SqlDocumentRepository(session)
     new_doc = Document(
         id=None,
-        title=data.title,
-        file_path="memory",
+        collection_id=collection_id,
+        user_id=user_id,
+        title=title,
+        file_path=str(path),
         uploaded_at=_dt.datetime.utcnow(),
         status=DocumentStatus.PENDING,
     )
     doc = await repo.add(new_doc)
     task_queue = CeleryTaskQueueAdapter()
-    task_id = task_queue.enqueue("ingest_document", doc.id, "memory", data.title, data.text)
+    task_id = task_queue.enqueue("ingest_document", doc.id, str(path), title, "")
     doc.task_id = task_id  # type: ignore[attr-defined]
     await repo.update(doc)
-    return {"task_id": task_id, "document_id": doc.id}
+    return doc
+
+
+@router.post("/documents/batch", status_code=status.HTTP_202_ACCEPTED)
+async def upload_documents_batch(
+    data: BatchDocumentsIn, request: Request, session: AsyncSession = Depends(get_async_session)
+):
+    """Upload many documents: one transaction, one Celery group, small documents packed per task."""
+    _check_batch_size(len(data.documents))
+    items: List[BatchItem] = []
+    try:
+        for doc in data.documents:
+            items.append(await _spool_batch_item(doc))
+        return await _enqueue_batch(session, request, items)
+    except Exception:
+        # nothing was enqueued: drop what was spooled so far
+        for item in items:
+            remove_spool(item.path)
+        raise
+
+
+@router.post("/documents/batch/ndjson", status_code=status.HTTP_202_ACCEPTED)
+async def upload_documents_ndjson(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """Like ``/documents/batch``, with one ``DocumentIn`` JSON object per line of the request body.
+
+    Each document is spooled as its line arrives, so the request is never
+    held in memory as a whole.
+    """
+    items: List[BatchItem] = []
+    try:
+        async for number, line in _ndjson_lines(request.stream()):
+            try:
+                doc = DocumentIn.model_validate_json(line)
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=f"line {number}: {e.errors()}")
+            items.append(await _spool_batch_item(doc))
+            _check_batch_size(len(items))
+        if not items:
+            raise HTTPException(status_code=422, detail="No documents in request body")
+        return await _enqueue_batch(session, request, items)
+    except Exception:
+        for item in items:
+            remove_spool(item.path)
+        raise
+
+
+@router.get("/documents/batch/{batch_id}")
+async def get_documents_batch(batch_id: str, session: AsyncSession = Depends(get_async_session)):
+    """Aggregate progress of a batch upload, plus the status of each document."""
+    docs = await SqlDocumentRepository(session).list_by_batch(batch_id)
+    if not docs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    def task_meta(task_id: str):
+        res: AsyncResult = celery_app.AsyncResult(task_id)
+        return res.info if res.state == "PROGRESS" and isinstance(res.info, dict) else None
+
+    return {
+        "batch_id": batch_id,
+        **batch_progress(docs, task_meta),
+        "items": [
+            {"document_id": d.id, "title": d.title, "status": d.status, "error": d.error, "task_id": d.task_id}
+            for d in docs
+        ],
+    }
+
+
+def _check_batch_size(count: int) -> None:
+    from privategpt.shared.settings import settings
+
+    if count > settings.ingest_batch_max_documents:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.ingest_batch_max_documents} documents per batch"
+        )
+
+
+async def _spool_batch_item(doc: DocumentIn) -> BatchItem:
+    path = await run_in_threadpool(spool_text, doc.text)
+    size = len(doc.text.encode("utf-8"))
+    return BatchItem(title=doc.title, path=str(path), size=size, collection_id=doc.collection_id)
+
+
+async def _ndjson_lines(chunks):
+    """Non-blank lines of a streamed NDJSON body with their 1-based line numbers."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+async def _enqueue_batch(session: AsyncSession, request: Request, items: List[BatchItem]) -> Dict[str, Any]:
+    """Create the documents of *items* in one transaction and enqueue them as one Celery group."""
+    user_id = get_current_user_id(request)
+    collection_repo = CollectionRepository(session)
+    for collection_id in {item.collection_id for item in items if item.collection_id}:
+        collection = await collection_repo.get_by_id(collection_id)
+        if not collection:
+            raise HTTPException(status_code=404, detail=f"Collection {collection_id} not found")
+        if collection.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+    batch_id = str(uuid.uuid4())
+    docs, packs = plan_batch(items, user_id, batch_id, _dt.datetime.utcnow())
+    repo = SqlDocumentRepository(session)
+    await repo.add_many(docs)
+    try:
+        group_result = enqueue_batch(celery_app, docs, packs)
+    except Exception as e:
+        for doc in docs:
+            doc.status, doc.error = DocumentStatus.FAILED, f"Could not enqueue batch: {e}"
+            await repo.update(doc)
+        raise HTTPException(status_code=503, detail=f"Could not enqueue batch: {e}")
+    return {
+        "batch_id": batch_id,
+        "group_id": group_result.id,
+        "tasks": len(packs),
+        "documents": [{"document_id": d.id, "title": d.title, "task_id": d.task_id} for d in docs],
+    }
+
+
+@router.put("/documents/{doc_id}", status_code=status.HTTP_202_ACCEPTED)
+async def replace_document(
+    doc_id: int, data: DocumentReplace, request: Request, session: AsyncSession = Depends(get_async_session)
+):
+    """Re-ingest an edited document; by default only changed chunks are re-embedded."""
+    doc = await _owned_document(session, doc_id, request)
+    path = await run_in_threadpool(spool_text, data.text)
+    await _enqueue_reingest(session, doc, path, data.mode == "incremental")
+    return {"task_id": doc.task_id, "document_id": doc.id, "mode": data.mode}
+
+
+@router.put("/documents/{doc_id}/upload", status_code=status.HTTP_202_ACCEPTED)
+async def replace_document_file(
+    doc_id: int,
+    request: Request,
+    file: UploadFile = File(...),
+    mode: Literal["incremental", "full"] = Form("incremental"),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Re-ingest an edited document from an uploaded file (streamed like ``/documents/upload``)."""
+    doc = await _owned_document(session, doc_id, request)
+    suffix = os.path.splitext(file.filename or "")[1] or ".txt"
+    path = await run_in_threadpool(spool_upload, file.file, suffix)
+    await _enqueue_reingest(session, doc, path, mode == "incremental")
+    return {"task_id": doc.task_id, "document_id": doc.id, "mode": mode}
+
+
+async def _owned_document(session: AsyncSession, doc_id: int, request: Request) -> Document:
+    doc = await SqlDocumentRepository(session).get(doc_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if doc.collection_id and doc.user_id != get_current_user_id(request):
+        raise HTTPException(status_code=403, detail="Access denied")
+    if doc.status in (DocumentStatus.PENDING, DocumentStatus.PROCESSING):
+        raise HTTPException(status_code=409, detail="Document is still being processed")
+    return doc
+
+
+async def _enqueue_reingest(session: AsyncSession, doc: Document, path, incremental: bool) -> None:
+    """Queue re-ingestion of *doc* from the spooled file at *path*."""
+    task_id = CeleryTaskQueueAdapter().enqueue(
+        "ingest_document", doc.id, str(path), doc.title, "", incremental=incremental
+    )
+    doc.task_id = task_id
+    doc.status = DocumentStatus.PENDING
+    doc.error = None
+    await SqlDocumentRepository(session).update(doc)
 
 
 @router.get("/documents/{doc_id}", response_model=DocumentOut)
@@ -204,6 +438,8 @@ class SearchRequest(BaseModel):
     limit: int = Field(10, ge=1, le=50, description="Maximum results")
     filters: Optional[Dict[str, Any]] = Field(None, description="Search filters")
     include_metadata: bool = Field(True, description="Include document metadata")
+    mode: Literal["vector", "hybrid"] = Field("vector", description="hybrid adds BM25 keyword matching")
+    alpha: Optional[float] = Field(None, ge=0, le=1, description="Hybrid weight of the vector ranking")
 
 
 class ChunkResult(BaseModel):
@@ -250,38 +486,7 @@ async def search_documents(
     user_id = get_current_user_id(request)
     
     # Build search filters
-    search_filters = {}
-    if req.filters:
-        # Handle collection path filtering (supports nested paths)
-        if "collection_path" in req.filters:
-            # Look up collection by path
-            collection_repo = CollectionRepository(session)
-            collection = await collection_repo.get_by_path(user_id, req.filters["collection_path"])
-            if collection:
-                search_filters["collection_ids"] = [collection.id]
-                # If it's a folder, also include all sub-collections
-                if req.filters.get("recursive", True):
-                    children = await collection_repo.list_children(collection.id)
-                    search_filters["collection_ids"].extend([c.id for c in children])
-        
-        elif "collection_id" in req.filters:
-            search_filters["collection_ids"] = [req.filters["collection_id"]]
-        
-        # Handle document filtering
-        if "document_id" in req.filters:
-            search_filters["document_ids"] = [req.filters["document_id"]]
-        
-        # Handle folder filtering (alias for collection_path with recursive)
-        if "folder_path" in req.filters:
-            req.filters["collection_path"] = req.filters["folder_path"]
-            req.filters["recursive"] = True
-            # Reprocess with collection_path logic above
-            collection_repo = CollectionRepository(session)
-            collection = await collection_repo.get_by_path(user_id, req.filters["folder_path"])
-            if collection:
-                search_filters["collection_ids"] = [collection.id]
-                children = await collection_repo.list_children(collection.id)
-                search_filters["collection_ids"].extend([c.id for c in children])
+    search_filters = await _resolve_search_filters(req.filters, CollectionRepository(session), user_id, {})
     
     # Build RAG service
     rag = build_rag_service(session)
@@ -290,12 +495,147 @@ async def search_documents(
     search_query = SearchQuery(
         text=req.query,
         top_k=req.limit,
-        filters=search_filters
+        filters=search_filters,
+        mode=req.mode,
+        alpha=req.alpha,
     )
     
     # Perform search
     search_results = await rag.search(search_query)
+    chunk_results = _chunk_results(req.query, search_results)
+    
+    search_time = int((time.time() - start_time) * 1000)
     
+    return SearchResponse(
+        chunks=chunk_results,
+        search_time_ms=search_time,
+        total_found=len(chunk_results),
+        query=req.query,
+        filters_applied=req.filters or {}
+    )
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest] = Field(..., min_length=1, max_length=64, description="Searches to run together")
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
+    search_time_ms: int
+
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_documents_batch(
+    req: BatchSearchRequest,
+    session: AsyncSession = Depends(get_async_session),
+    request: Request = None
+):
+    """
+    Run several searches at once (multi-query expansion, evaluation, MCP tools).
+
+    Takes the same per-query fields and filters as ``/rag/search``. All queries
+    are embedded in one call and searched as one batch; collection lookups are
+    shared between queries. Each result's ``search_time_ms`` is the batch time.
+    """
+    import time
+    start_time = time.time()
+
+    user_id = get_current_user_id(request)
+    collection_repo = CollectionRepository(session)
+    resolved: Dict[tuple, Optional[List[str]]] = {}
+    search_queries = [
+        SearchQuery(
+            text=q.query,
+            top_k=q.limit,
+            filters=await _resolve_search_filters(q.filters, collection_repo, user_id, resolved),
+            mode=q.mode,
+            alpha=q.alpha,
+        )
+        for q in req.queries
+    ]
+
+    rag = build_rag_service(session)
+    all_results = await rag.search_many(search_queries)
+    search_time = int((time.time() - start_time) * 1000)
+
+    results = []
+    for q, search_results in zip(req.queries, all_results):
+        chunk_results = _chunk_results(q.query, search_results)
+        results.append(SearchResponse(
+            chunks=chunk_results,
+            search_time_ms=search_time,
+            total_found=len(chunk_results),
+            query=q.query,
+            filters_applied=q.filters or {}
+        ))
+    return BatchSearchResponse(results=results, search_time_ms=search_time)
+
+
+async def _collection_ids(
+    collection_repo: CollectionRepository,
+    user_id: int,
+    path: str,
+    recursive: bool,
+    resolved: Dict[tuple, Optional[List[str]]],
+) -> List[str] | None:
+    """Ids of the collection at *path* (and its children); memoised in *resolved*."""
+    key = (path, recursive)
+    if key not in resolved:
+        collection = await collection_repo.get_by_path(user_id, path)
+        if collection is None:
+            resolved[key] = None
+        else:
+            ids = [collection.id]
+            # If it's a folder, also include all sub-collections
+            if recursive:
+                children = await collection_repo.list_children(collection.id)
+                ids.extend([c.id for c in children])
+            resolved[key] = ids
+    ids = resolved[key]
+    return None if ids is None else list(ids)
+
+
+async def _resolve_search_filters(
+    filters: Optional[Dict[str, Any]],
+    collection_repo: CollectionRepository,
+    user_id: int,
+    resolved: Dict[tuple, Optional[List[str]]],
+) -> Dict[str, Any]:
+    """Vector store filters for the request *filters* of ``/rag/search``."""
+    from privategpt.shared.settings import settings
+
+    search_filters = {}
+    if settings.vector_store == "weaviate" and settings.weaviate_multi_tenancy:
+        # selects the caller's tenant (and the shared one) instead of visiting all of them
+        search_filters["user_id"] = user_id
+    if not filters:
+        return search_filters
+    # Handle collection path filtering (supports nested paths)
+    if "collection_path" in filters:
+        ids = await _collection_ids(
+            collection_repo, user_id, filters["collection_path"], filters.get("recursive", True), resolved
+        )
+        if ids:
+            search_filters["collection_ids"] = ids
+
+    elif "collection_id" in filters:
+        search_filters["collection_ids"] = [filters["collection_id"]]
+
+    # Handle document filtering
+    if "document_id" in filters:
+        search_filters["document_ids"] = [filters["document_id"]]
+
+    # Handle folder filtering (alias for collection_path with recursive)
+    if "folder_path" in filters:
+        filters["collection_path"] = filters["folder_path"]
+        filters["recursive"] = True
+        ids = await _collection_ids(collection_repo, user_id, filters["folder_path"], True, resolved)
+        if ids:
+            search_filters["collection_ids"] = ids
+    return search_filters
+
+
+def _chunk_results(query: str, search_results) -> List[ChunkResult]:
     # For now, return mock results since we need to implement proper chunk retrieval
     chunk_results = []
     for i, (chunk_uuid, score) in enumerate(search_results):
@@ -303,7 +643,7 @@ async def search_documents(
         # This is a temporary mock implementation
         chunk_results.append(ChunkResult(
             id=chunk_uuid,
-            text=f"Sample result {i+1}: This is a chunk about {req.query}...",
+            text=f"Sample result {i+1}: This is a chunk about {query}...",
             score=score,
             document_id=i+1,
             document_title=f"Document {i+1}",
@@ -313,16 +653,30 @@ async def search_documents(
             position=0,
             metadata={"mock": True}
         ))
-    
-    search_time = int((time.time() - start_time) * 1000)
-    
-    return SearchResponse(
-        chunks=chunk_results,
-        search_time_ms=search_time,
-        total_found=len(chunk_results),
-        query=req.query,
-        filters_applied=req.filters or {}
-    )
+    return chunk_results
+
+
+@router.get("/embedder/stats")
+def embedder_stats():
+    """Cache, batching and model-pool counters of this process's embedder."""
+    from privategpt.infra.embedder.model_pool import get_model_pool
+
+    embedder = build_embedder()
+    stats = embedder.stats() if hasattr(embedder, "stats") else {}
+    return {"embedder": stats, "models": get_model_pool().status()}
+
+
+@router.get("/vector-store/stats")
+async def vector_store_stats():
+    """Connection counters of this process's shared Weaviate clients."""
+    from privategpt.infra.vector_store.weaviate_client import weaviate_client_stats
+    from privategpt.shared.settings import settings
+
+    stats = {"backend": settings.vector_store, "weaviate": weaviate_client_stats()}
+    vector_store = build_vector_store()
+    if hasattr(vector_store, "tenant_stats"):
+        stats["tenants"] = await vector_store.tenant_stats()
+    return stats
 
 
 # Helper function to get user ID (placeholder for now)
@@ -588,21 +942,6 @@ async def upload_document_to_collection(
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Create document with collection
-    repo = SqlDocumentRepository(session)
-    import datetime as _dt
-
-    new_doc = Document(
-        id=None,
-        collection_id=collection_id,
-        user_id=user_id,
-        title=data.title,
-        file_path="memory",
-        uploaded_at=_dt.datetime.utcnow(),
-        status=DocumentStatus.PENDING,
-    )
-    doc = await repo.add(new_doc)
-    task_queue = CeleryTaskQueueAdapter()
-    task_id = task_queue.enqueue("ingest_document", doc.id, "memory", data.title, data.text)
-    doc.task_id = task_id  # type: ignore[attr-defined]
-    await repo.update(doc)
-    return {"task_id": task_id, "document_id": doc.id, "collection_id": collection_id} 
\ No newline at end of file
+    path = await run_in_threadpool(spool_text, data.text)
+    doc = await _enqueue_ingest(session, data.title, path, collection_id=collection_id, user_id=user_id)
+    return {"task_id": doc.task_id, "document_id": doc.id, "collection_id": collection_id} 
\ No newline at end of file
@@ -45,7 +45,7 @@ class RagService:
         ids = [f"{doc.id}_{i}" for i in range(len(parts))]
         await self.vector_store.add_vectors(
             embeddings,
-            [{"text": p} for p in parts],
+            [{"text": p, "document_id": doc.id, "position": i} for i, p in enumerate(parts)],
             ids,
         )
 
@@ -59,8 +59,37 @@ class RagService:
 
     async def search(self, query: SearchQuery):
         emb = await self.embedder.embed_query(query.text)
+        if query.mode == "hybrid":
+            return await self._hybrid(query, emb)
         return await self.vector_store.similarity_search(emb, top_k=query.top_k, filters=query.filters)
 
+    async def _hybrid(self, query: SearchQuery, emb):
+        from privategpt.shared.settings import settings
+
+        alpha = settings.hybrid_alpha if query.alpha is None else query.alpha
+        return await self.vector_store.hybrid_search(
+            query.text, emb, top_k=query.top_k, filters=query.filters, alpha=alpha
+        )
+
+    async def search_many(self, queries: List[SearchQuery]):
+        """Results of every query, in order, from one embed and one batch search."""
+        if not queries:
+            return []
+        embs = await self.embedder.embed_queries([q.text for q in queries])
+        results: List[list] = [[] for _ in queries]
+        dense = [i for i, q in enumerate(queries) if q.mode != "hybrid"]
+        if dense:
+            top_k = max(queries[i].top_k for i in dense)
+            hits = await self.vector_store.similarity_search_many(
+                embs[dense], top_k=top_k, filters=[queries[i].filters for i in dense]
+            )
+            for i, found in zip(dense, hits):
+                results[i] = found[: queries[i].top_k]
+        for i, q in enumerate(queries):
+            if q.mode == "hybrid":
+                results[i] = await self._hybrid(q, embs[i])
+        return results
+
     async def chat(self, question: str) -> Answer:
         sim = await self.search(SearchQuery(text=question, top_k=3))
         
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
+import asyncio
 import os
 
 from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 import uuid
 from datetime import datetime
 
@@ -12,17 +15,24 @@ from privategpt.infra.database.async_session import get_async_session, engine
 from privategpt.infra.database import models
 from privategpt.infra.database.document_repository import SqlDocumentRepository
 from privategpt.infra.database.chunk_repository import SqlChunkRepository
-from privategpt.infra.splitters.simple import SimpleSplitterAdapter
 from privategpt.infra.vector_store.memory import InMemoryVectorStore
 from privategpt.core.domain.document import Document
 from privategpt.infra.chat.echo import EchoChatAdapter
 from privategpt.services.rag.core.service import RagService
 from privategpt.core.domain.query import SearchQuery
-from privategpt.infra.vector_store.weaviate_adapter import WeaviateAdapter  # noqa: E501
-from privategpt.infra.embedder.bge_adapter import BgeEmbedderAdapter
+from privategpt.infra.vector_store.weaviate_client import close_weaviate_clients
+from privategpt.infra.tasks.ingest_stream import TextBlockReader, embed_windows
+from privategpt.infra.tasks.service_factory import (
+    build_embedder,
+    build_splitter,
+    build_vector_store,
+    preload_model_names,
+)
+from privategpt.infra.embedder.model_pool import get_model_pool
 from privategpt.infra.embedder.fake import FakeEmbedderAdapter
 from privategpt.infra.http.log_middleware import RequestLogMiddleware
 from privategpt.services.rag.api import rag_router
+from privategpt.shared.settings import settings
 
 # create tables at startup (sync call inside async lifespan is okay for sqlite)
 
@@ -32,21 +42,37 @@ async def lifespan(app: FastAPI):
     # create tables
     async with engine.begin() as conn:
         await conn.run_sync(models.Base.metadata.create_all)
+        if conn.dialect.name == "postgresql":
+            # create_all does not add columns to existing tables
+            await conn.execute(text("ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32)"))
+            await conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS batch_id VARCHAR(36)"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_batch_id ON documents (batch_id)"))
 
     # singletons choose real vs fake
     use_fake = os.getenv("USE_FAKE_ADAPTERS", "true").lower() == "true"
 
-    app.state.splitter = SimpleSplitterAdapter()
+    app.state.splitter = build_splitter()
+    app.state.warmup_task = None
     if use_fake:
         app.state.embedder = FakeEmbedderAdapter()
-        app.state.vector_store = InMemoryVectorStore()
+        app.state.vector_store = InMemoryVectorStore(
+            binary=settings.memory_store_binary,
+            rescore=settings.memory_store_rescore,
+            dedup=settings.memory_store_dedup,
+        )
     else:
-        app.state.embedder = BgeEmbedderAdapter()
-        app.state.vector_store = WeaviateAdapter()
+        app.state.embedder = build_embedder()
+        app.state.vector_store = build_vector_store()
+        # load embedding models in the background; /ready reports progress
+        app.state.warmup_task = asyncio.create_task(
+            asyncio.to_thread(get_model_pool().warmup, preload_model_names())
+        )
 
     yield
 
-    # nothing to cleanup yet
+    if app.state.warmup_task is not None and not app.state.warmup_task.done():
+        app.state.warmup_task.cancel()
+    close_weaviate_clients()
 
 
 def get_splitter(request: Request):
@@ -85,6 +111,17 @@ async def health() -> dict[str, str]:
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def ready(request: Request):
+    """Readiness probe: 503 until the embedding models are loaded."""
+    if request.app.state.warmup_task is None:
+        return {"status": "ready", "embedder": "fake"}
+    status = get_model_pool().status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content={"status": "loading", "embedder": status})
+    return {"status": "ready", "embedder": status}
+
+
 @app.post("/documents")
 async def upload_document(
     file: UploadFile = File(...),
@@ -93,10 +130,6 @@ async def upload_document(
     embedder=Depends(get_embedder),
     store=Depends(get_vector_store),
 ):
-    content = await file.read()
-    text = content.decode(errors="ignore")
-    parts = splitter.split(text)
-
     doc = Document(
         id=None,
         title=file.filename,
@@ -106,11 +139,15 @@ async def upload_document(
     repo = SqlDocumentRepository(session)
     doc = await repo.add(doc)
 
-    embeddings = await embedder.embed_documents(parts)
-    ids = [f"{doc.id}_{i}" for i, _ in enumerate(parts)]
-    await store.add_vectors(embeddings, [{} for _ in parts], ids)
+    # split straight from the upload's temp file instead of reading it whole
+    parts = splitter.iter_chunks_stream(TextBlockReader(file.file))
+
+    async def store_window(position: int, window, embeddings):
+        ids = [f"{doc.id}_{position + i}" for i in range(len(window))]
+        await store.add_vectors(embeddings, [{} for _ in window], ids)
 
-    return {"id": doc.id, "chunks": len(parts)}
+    chunks = await embed_windows(parts, embedder, store_window)
+    return {"id": doc.id, "chunks": chunks}
 
 
 def get_rag_service(request: Request, session=Depends(get_async_session)):
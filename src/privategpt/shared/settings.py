@@ -69,12 +69,105 @@ class _CoreSettings(BaseSettings):
     database_url: str = Field("sqlite+aiosqlite:///./privategpt.db", env="DATABASE_URL")
     redis_url: str = Field("redis://redis:6379/0", env="REDIS_URL")
     weaviate_url: str = Field("http://weaviate:8080", env="WEAVIATE_URL")
+    # one client per process; failed connects are retried with doubling delays
+    weaviate_connect_retries: int = Field(5, env="WEAVIATE_CONNECT_RETRIES")
+    weaviate_connect_backoff_s: float = Field(0.5, env="WEAVIATE_CONNECT_BACKOFF_S")
+    # one Weaviate tenant per user; run the migrate_vector_tenants task once when enabling
+    weaviate_multi_tenancy: bool = Field(False, env="WEAVIATE_MULTI_TENANCY")
+
+    # VECTOR STORE ---------------------------------------------------
+    # weaviate | hnsw (local ANN index) | segmented (local exact search on
+    # memory-mapped segments) | ivfpq (compressed per-collection IVF-PQ with
+    # exact re-ranking); the local stores need no Weaviate container
+    vector_store: str = Field("weaviate", env="VECTOR_STORE")
+    # must be shared by rag-service and celery-worker
+    hnsw_path: str = Field("./data/hnsw", env="HNSW_PATH")
+    hnsw_m: int = Field(16, env="HNSW_M")
+    hnsw_ef_construction: int = Field(128, env="HNSW_EF_CONSTRUCTION")
+    hnsw_ef_search: int = Field(64, env="HNSW_EF_SEARCH")
+    # appended rows searched exactly before a snapshot links them into the graph
+    hnsw_snapshot_rows: int = Field(10_000, env="HNSW_SNAPSHOT_ROWS")
+    segment_path: str = Field("./data/vector-segments", env="SEGMENT_PATH")
+    # segments under this many rows are merged once SEGMENT_COMPACT_MAX_SMALL pile up
+    segment_compact_min_rows: int = Field(65_536, env="SEGMENT_COMPACT_MIN_ROWS")
+    segment_compact_max_small: int = Field(8, env="SEGMENT_COMPACT_MAX_SMALL")
+    # chunks of a user with identical text share one vector; hits expand to all of them
+    segment_dedup: bool = Field(False, env="SEGMENT_DEDUP")
+    ivfpq_path: str = Field("./data/ivfpq", env="IVFPQ_PATH")
+    # coarse lists, PQ bytes per vector (a divisor of the dimension), lists scanned per query
+    ivfpq_nlist: int = Field(1024, env="IVFPQ_NLIST")
+    ivfpq_m: int = Field(48, env="IVFPQ_M")
+    ivfpq_nprobe: int = Field(16, env="IVFPQ_NPROBE")
+    # approximate hits re-scored with the full vectors, as a multiple of top_k
+    ivfpq_rerank: int = Field(10, env="IVFPQ_RERANK")
+    # smaller collections are searched exactly; trained ones are retrained after doubling
+    ivfpq_train_min_rows: int = Field(20_000, env="IVFPQ_TRAIN_MIN_ROWS")
+    # hybrid search: weight of the vector ranking against BM25 (1 = vector only)
+    hybrid_alpha: float = Field(0.5, env="HYBRID_ALPHA")
+    # in-process store (USE_FAKE_ADAPTERS): Hamming prefilter on sign bits, then
+    # float re-scoring of top_k * MEMORY_STORE_RESCORE rows
+    memory_store_binary: bool = Field(False, env="MEMORY_STORE_BINARY")
+    memory_store_rescore: int = Field(10, env="MEMORY_STORE_RESCORE")
+    # chunks of a user with identical text share one row; hits expand to all of them
+    memory_store_dedup: bool = Field(False, env="MEMORY_STORE_DEDUP")
 
     # LLM / EMBEDDINGS ----------------------------------------------
     llm_provider: str = Field("", env="LLM_PROVIDER")
     llm_base_url: str = Field("", env="LLM_BASE_URL")
     llm_default_model: str = Field("", env="LLM_DEFAULT_MODEL")
     embed_model: str = Field("BAAI/bge-small-en-v1.5", env="EMBED_MODEL")
+    # torch | onnx | onnx-int8 – a "backend:" prefix on a model name wins
+    embed_backend: str = Field("torch", env="EMBED_BACKEND")
+    embed_onnx_dir: str = Field("./data/onnx-models", env="EMBED_ONNX_DIR")
+    # extra models (comma separated) loaded at startup next to embed_model
+    embed_preload_models: str = Field("", env="EMBED_PRELOAD_MODELS")
+
+    # EMBEDDING CACHE ----------------------------------------------
+    embed_cache_enabled: bool = Field(True, env="EMBED_CACHE_ENABLED")
+    embed_cache_path: str = Field("./data/embed-cache/embeddings.sqlite3", env="EMBED_CACHE_PATH")
+    embed_cache_max_entries: int = Field(1_000_000, env="EMBED_CACHE_MAX_ENTRIES")
+    embed_query_cache_size: int = Field(10_000, env="EMBED_QUERY_CACHE_SIZE")
+
+    # QUERY MICRO-BATCHING -----------------------------------------
+    embed_query_batching: bool = Field(True, env="EMBED_QUERY_BATCHING")
+    embed_batch_window_ms: float = Field(5.0, env="EMBED_BATCH_WINDOW_MS")
+    embed_batch_max_size: int = Field(32, env="EMBED_BATCH_MAX_SIZE")
+
+    # TEXT SPLITTING ------------------------------------------------
+    # chunk size comes from CollectionSettings.default_chunk_size (tokens)
+    split_chunk_overlap: int = Field(64, env="SPLIT_CHUNK_OVERLAP")
+
+    # STREAMING INGESTION --------------------------------------------
+    # uploads are spooled here; must be shared by rag-service and celery-worker
+    ingest_spool_dir: str = Field("./data/uploads", env="INGEST_SPOOL_DIR")
+    ingest_read_block_bytes: int = Field(1 << 20, env="INGEST_READ_BLOCK_BYTES")
+    # chunks embedded and stored together; bounds worker memory per document.
+    # Keep >= EMBED_PROCESS_POOL_MIN_CHUNKS or windows never reach the pool.
+    ingest_window_chunks: int = Field(512, env="INGEST_WINDOW_CHUNKS")
+    # windows buffered between the split, embed, vector-write and DB-write stages
+    ingest_pipeline_queue: int = Field(2, env="INGEST_PIPELINE_QUEUE")
+    # chunk rows per executemany batch; PostgreSQL uses COPY unless disabled
+    chunk_insert_batch_rows: int = Field(1000, env="CHUNK_INSERT_BATCH_ROWS")
+    chunk_insert_copy: bool = Field(True, env="CHUNK_INSERT_COPY")
+    # batch uploads: documents below INGEST_PACK_BYTES share a Celery task
+    # with up to INGEST_PACK_MAX_DOCS others
+    ingest_pack_bytes: int = Field(256 * 1024, env="INGEST_PACK_BYTES")
+    ingest_pack_max_docs: int = Field(32, env="INGEST_PACK_MAX_DOCS")
+    ingest_batch_max_documents: int = Field(1000, env="INGEST_BATCH_MAX_DOCUMENTS")
+
+    # DOCUMENT EMBEDDING BATCHES -----------------------------------
+    # padded tokens (items × longest item) per forward pass
+    embed_token_budget: int = Field(16_384, env="EMBED_TOKEN_BUDGET")
+    embed_document_max_batch: int = Field(128, env="EMBED_DOCUMENT_MAX_BATCH")
+
+    # MULTI-PROCESS EMBEDDING (ingestion workers) -------------------
+    embed_process_pool: bool = Field(False, env="EMBED_PROCESS_POOL")
+    embed_worker_processes: int = Field(0, env="EMBED_WORKER_PROCESSES")  # 0 = from core count
+    embed_process_pool_min_chunks: int = Field(512, env="EMBED_PROCESS_POOL_MIN_CHUNKS")
+    # Celery prefork children sharing the machine's cores (0 = Celery default: core count)
+    celery_concurrency: int = Field(0, env="CELERY_CONCURRENCY")
+    # load torch models in the Celery / gunicorn master so forked children share them
+    embed_preload_parent: bool = Field(False, env="EMBED_PRELOAD_PARENT")
     
     # LLM PROVIDERS ------------------------------------------------
     # Ollama (Local Models)
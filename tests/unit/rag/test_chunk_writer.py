@@ -0,0 +1,30 @@
+import json
+
+import numpy as np
+
+from privategpt.infra.database.chunk_writer import chunk_rows, write_chunk_rows
+from privategpt.infra.database.models import Chunk
+
+
+def test_bulk_writer_inserts_batches_in_the_session_transaction(db_session):
+    embeddings = np.arange(2500 * 3, dtype=np.float32).reshape(2500, 3)
+    texts = [f"chunk {i}" for i in range(2500)]
+    rows = chunk_rows(7, "col-1", 100, texts, embeddings)
+
+    # SQLite has no COPY, so this exercises the executemany batches
+    assert write_chunk_rows(db_session.connection(), rows, batch_rows=1000) == 2500
+    assert write_chunk_rows(db_session.connection(), []) == 0
+    db_session.commit()
+
+    stored = db_session.query(Chunk).order_by(Chunk.position).all()
+    assert len(stored) == 2500
+    assert [c.position for c in stored[:3]] == [100, 101, 102]
+    assert stored[-1].text == "chunk 2499"
+    assert stored[0].collection_id == "col-1"
+    assert json.loads(stored[1].embedding) == [3.0, 4.0, 5.0]
+
+
+def test_chunk_rows_without_embeddings():
+    rows = chunk_rows(1, None, 0, ["a", "b"])
+    assert [r["position"] for r in rows] == [0, 1]
+    assert all(r["embedding"] is None and r["collection_id"] is None for r in rows)
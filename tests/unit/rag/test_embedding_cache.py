@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from privategpt.infra.embedder.cache import (
+    CachedEmbedderAdapter,
+    LruVectorCache,
+    SqliteVectorCache,
+    cache_key,
+)
+from privategpt.infra.embedder.fake import FakeEmbedderAdapter
+
+
+class CountingEmbedder(FakeEmbedderAdapter):
+    def __init__(self):
+        self.document_calls: list[list[str]] = []
+        self.query_calls = 0
+
+    async def embed_documents(self, texts, on_progress=None):
+        self.document_calls.append(list(texts))
+        return await super().embed_documents(texts, on_progress=on_progress)
+
+    async def embed_query(self, text):
+        self.query_calls += 1
+        return await super().embed_query(text)
+
+
+def test_cache_key_normalizes_whitespace_and_scopes_by_model():
+    assert cache_key("m", "hello   world\n") == cache_key("m", " hello world")
+    assert cache_key("m", "hello") != cache_key("other", "hello")
+
+
+@pytest.mark.asyncio
+async def test_document_vectors_are_reused_across_calls(tmp_path):
+    inner = CountingEmbedder()
+    store = SqliteVectorCache(str(tmp_path / "cache.sqlite3"))
+    embedder = CachedEmbedderAdapter(inner, model_name="fake", store=store)
+
+    first = await embedder.embed_documents(["a", "b", "a"])
+    second = await embedder.embed_documents(["b", "c"])
+
+    # duplicates inside a batch and vectors from earlier batches are not re-embedded
+    assert inner.document_calls == [["a", "b"], ["c"]]
+    assert first.dtype == np.float32 and first.shape == (3, 32)
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(second[0], first[1])
+    assert store.stats.hits == 1
+    assert len(store) == 3
+
+
+@pytest.mark.asyncio
+async def test_persistent_store_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    await CachedEmbedderAdapter(CountingEmbedder(), "fake", store=SqliteVectorCache(path)).embed_documents(["x"])
+
+    inner = CountingEmbedder()
+    await CachedEmbedderAdapter(inner, "fake", store=SqliteVectorCache(path)).embed_documents(["x"])
+    assert inner.document_calls == []
+
+
+def test_sqlite_store_evicts_least_recently_used():
+    store = SqliteVectorCache(":memory:", max_entries=2)
+    store.put_many({"a": [1.0], "b": [2.0]})
+    store.get_many(["a"])
+    store.put_many({"c": [3.0]})
+    assert set(store.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert store.stats.evictions == 1
+    store.put_many({"c": [4.0]})  # replacing a key does not grow the table
+    assert len(store) == 2 and store.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_query_lru_hits_and_evicts():
+    inner = CountingEmbedder()
+    embedder = CachedEmbedderAdapter(inner, "fake", query_cache=LruVectorCache(max_entries=1))
+
+    await embedder.embed_query("q1")
+    await embedder.embed_query("q1")
+    await embedder.embed_query("q2")
+    await embedder.embed_query("q1")
+
+    assert inner.query_calls == 3
+    assert embedder.stats()["query_lru"]["hits"] == 1
+    assert embedder.query_cache.stats.evictions == 2
+
+
+@pytest.mark.asyncio
+async def test_progress_counts_reused_and_embedded_chunks(tmp_path):
+    store = SqliteVectorCache(str(tmp_path / "cache.sqlite3"))
+    embedder = CachedEmbedderAdapter(CountingEmbedder(), "fake", store=store)
+    await embedder.embed_documents(["a", "b"])
+
+    seen: list[tuple[int, int]] = []
+    await embedder.embed_documents(["a", "b", "c", "c"], on_progress=lambda done, total: seen.append((done, total)))
+    assert seen == [(2, 4), (4, 4)]
@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from privategpt.infra.embedder import process_pool
+from privategpt.infra.embedder.fake import FakeEmbedderAdapter
+from privategpt.infra.embedder.process_pool import ProcessPoolEmbedder, plan_threads
+
+
+def test_plan_splits_cores_between_celery_children_and_workers():
+    plan = plan_threads(cpu_count=16, parent_processes=2)
+    assert plan.threads_per_parent == 8
+    assert plan.workers == 4
+    assert plan.workers * plan.threads_per_worker == 8
+
+
+def test_plan_never_oversubscribes_or_drops_below_one_thread():
+    plan = plan_threads(cpu_count=4, parent_processes=8, workers=3)
+    assert (plan.threads_per_parent, plan.workers, plan.threads_per_worker) == (1, 1, 1)
+
+    plan = plan_threads(cpu_count=8, parent_processes=1, workers=3)
+    assert plan.workers * plan.threads_per_worker <= 8
+
+
+@pytest.mark.asyncio
+async def test_small_batches_stay_in_process():
+    embedder = ProcessPoolEmbedder(
+        FakeEmbedderAdapter(), "fake", plan_threads(cpu_count=8, parent_processes=1), min_chunks=100
+    )
+    vectors = await embedder.embed_documents(["a", "b"])
+    assert len(vectors) == 2
+    assert embedder.stats()["process_pool"]["active"] is False
+
+
+def _init_fake_worker():
+    process_pool._worker_embedder = FakeEmbedderAdapter()
+
+
+@pytest.mark.asyncio
+async def test_large_batches_are_sharded_over_worker_processes():
+    embedder = ProcessPoolEmbedder(
+        FakeEmbedderAdapter(), "fake", plan_threads(cpu_count=4, workers=2), shard_size=8, min_chunks=10
+    )
+    # the real initializer loads a model; the fake one keeps the shards cheap
+    embedder._executor = ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("spawn"), initializer=_init_fake_worker
+    )
+    texts = [f"chunk {i}" for i in range(40)]
+    progress = []
+    try:
+        vectors = await embedder.embed_documents(texts, on_progress=lambda done, total: progress.append(done))
+    finally:
+        embedder.shutdown()
+
+    np.testing.assert_array_equal(vectors, await FakeEmbedderAdapter().embed_documents(texts))
+    workers = embedder.stats()["process_pool"]["workers"]
+    assert str(os.getpid()) not in workers
+    assert sum(w["chunks"] for w in workers.values()) == 40
+    assert progress[-1] == 40 and len(progress) == 5  # one update per shard
+
+
+@pytest.mark.asyncio
+async def test_daemonic_processes_embed_in_process_and_warn_once(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(process_pool.multiprocessing, "current_process", lambda: SimpleNamespace(daemon=True))
+    monkeypatch.setattr(process_pool.logger, "warning", lambda event, **kw: warnings.append(event))
+    embedder = ProcessPoolEmbedder(FakeEmbedderAdapter(), "fake", plan_threads(cpu_count=4, workers=2), min_chunks=1)
+
+    assert len(await embedder.embed_documents(["a", "b"])) == 2
+    assert len(await embedder.embed_documents(["c"])) == 1
+    assert warnings == ["embedder.process_pool.daemon"]
+    assert embedder.stats()["process_pool"]["active"] is False
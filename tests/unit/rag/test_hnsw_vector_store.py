@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from privategpt.infra.vector_store.hnsw import HnswVectorStore
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+def _clustered(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((12, dim)).astype(np.float32)
+    return centres[rng.integers(0, 12, n)] + 0.8 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+@pytest.mark.asyncio
+async def test_hnsw_recall_matches_exact_store():
+    vectors = _clustered(800)
+    ids = [f"v{i}" for i in range(800)]
+    hnsw, exact = HnswVectorStore(M=8, ef_construction=64, ef_search=64), InMemoryVectorStore()
+    for store in (hnsw, exact):
+        await store.add_vectors(vectors, [{}] * 800, ids)
+
+    queries = _clustered(20, seed=1)
+    recall = []
+    for q in queries:
+        found = {i for i, _ in await hnsw.similarity_search(q, top_k=10)}
+        truth = {i for i, _ in await exact.similarity_search(q, top_k=10)}
+        recall.append(len(found & truth) / 10)
+    assert np.mean(recall) >= 0.9
+
+
+@pytest.mark.asyncio
+async def test_hnsw_persists_and_reloads_generations(tmp_path):
+    vectors = _clustered(300)
+    ids = [f"v{i}" for i in range(300)]
+    writer = HnswVectorStore(tmp_path, M=8, ef_construction=32)
+    await writer.add_vectors(vectors, [{"document_id": i % 3} for i in range(300)], ids)
+
+    reader = HnswVectorStore(tmp_path)
+    assert len(reader) == 300
+    assert await reader.similarity_search(vectors[7], top_k=3) == await writer.similarity_search(vectors[7], top_k=3)
+
+    # a later generation written by another instance is picked up on search
+    await writer.delete_vectors(["v7"])
+    await writer.add_vectors(vectors[7:8], [{"document_id": 9}], ["again"])
+    hits = await reader.similarity_search(vectors[7], top_k=1)
+    assert hits[0][0] == "again"
+    assert len(list(tmp_path.glob("gen-*"))) == 1
+    assert writer._index.linked == 0  # appended to the delta log only
+
+
+@pytest.mark.asyncio
+async def test_hnsw_snapshot_links_tail_and_keeps_later_writes(tmp_path):
+    vectors = _clustered(400)
+    ids = [f"v{i}" for i in range(400)]
+    writer = HnswVectorStore(tmp_path, M=8, ef_construction=32, snapshot_rows=200)
+    reader = HnswVectorStore(tmp_path)
+    await writer.add_vectors(vectors[:300], [{}] * 300, ids[:300])
+    assert writer.needs_snapshot() and not reader.needs_snapshot()  # reader keeps the default threshold
+    assert writer.snapshot()
+    await writer.add_vectors(vectors[300:], [{}] * 100, ids[300:])  # after the snapshot
+    await writer.delete_vectors(["v3"])
+
+    assert writer._index.linked == 300 and writer._index.count == 400
+    hits = await reader.similarity_search(vectors[3], top_k=5)
+    assert len(reader) == 399 and reader._index.linked == 300
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    best = max((i for i in range(400) if i != 3), key=lambda i: normed[i] @ normed[3])
+    assert hits[0][0] == f"v{best}" and "v3" not in {i for i, _ in hits}
+    assert len(list(tmp_path.glob("gen-*"))) == 2  # the current one and its predecessor
+
+
+@pytest.mark.asyncio
+async def test_hnsw_filtered_search_exact_and_graph_paths():
+    vectors = _clustered(600)
+    ids = [f"v{i}" for i in range(600)]
+    metas = [{"document_id": i % 4, "collection_id": "a" if i < 300 else "b"} for i in range(600)]
+    store = HnswVectorStore(M=8, ef_construction=64, ef_search=64)
+    await store.add_vectors(vectors, metas, ids)
+    filters = {"document_ids": [1], "collection_id": "b"}
+
+    exact = await store.similarity_search(vectors[0], top_k=5, filters=filters)
+    store.exact_threshold = 0  # force the graph walk
+    graph = await store.similarity_search(vectors[0], top_k=5, filters=filters)
+
+    for hits in (exact, graph):
+        assert len(hits) == 5
+        assert all(int(i[1:]) >= 300 and int(i[1:]) % 4 == 1 for i, _ in hits)
+    assert [i for i, _ in graph][:3] == [i for i, _ in exact][:3]
+
+
+@pytest.mark.asyncio
+async def test_hnsw_upsert_delete_and_compact():
+    vectors = _clustered(100)
+    ids = [f"v{i}" for i in range(100)]
+    store = HnswVectorStore(M=8, ef_construction=32, compact_ratio=0.5)
+    await store.add_vectors(vectors, [{}] * 100, ids)
+
+    await store.add_vectors(vectors[50:51], [{}], ["v0"])  # overwrite v0
+    assert (await store.similarity_search(vectors[50], top_k=2))[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert {i for i, _ in await store.similarity_search(vectors[50], top_k=2)} == {"v0", "v50"}
+
+    assert await store.delete_vectors(ids[1:60]) == 59
+    assert len(store) == 41 and store._index.count == 41  # rebuilt without tombstones
+    hits = await store.similarity_search(vectors[70], top_k=41)
+    assert len(hits) == 41 and not {i for i, _ in hits} & set(ids[1:60])
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from privategpt.infra.vector_store.bm25 import Bm25Index, tokenize
+from privategpt.infra.vector_store.fusion import reciprocal_rank_fusion
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+def test_bm25_index_updates_incrementally():
+    index = Bm25Index()
+    for text in ["invoice INV-2024 for Acme", "quarterly report", "acme acme contract", None]:
+        index.append(text)
+    assert tokenize("INV-2024/17") == ["inv", "2024", "17"]
+
+    rows, scores = index.scores("acme", top_n=10)
+    assert list(rows) == [2, 0] and scores[0] > scores[1] > 0
+    assert list(index.scores("acme", top_n=10, rows=np.array([0, 1]))[0]) == [0]
+
+    index.remove(2)
+    index.replace(1, "acme report")
+    assert sorted(index.scores("acme", top_n=10)[0]) == [0, 1]
+    index.keep([1, 3])
+    assert list(index.scores("report", top_n=10)[0]) == [0]
+    assert len(index.scores("unknown words", top_n=10)[0]) == 0
+
+
+def test_reciprocal_rank_fusion_weighs_rankings_by_alpha():
+    vector, lexical = ["a", "b", "c"], ["c", "d"]
+    assert [i for i, _ in reciprocal_rank_fusion(vector, lexical, alpha=0.5, top_k=2)] == ["c", "a"]
+    assert [i for i, _ in reciprocal_rank_fusion(vector, lexical, alpha=1.0, top_k=3)] == vector
+    assert [i for i, _ in reciprocal_rank_fusion(vector, lexical, alpha=0.0, top_k=3)] == lexical
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_surfaces_exact_terms_dense_search_misses():
+    rng = np.random.default_rng(5)
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    vectors[123] = -vectors[7]  # as far from the query as possible
+    metas = [{"text": f"chunk {i} about shipping", "document_id": i % 2} for i in range(200)]
+    metas[123]["text"] = "order SKU-99812 was shipped late"
+    store = InMemoryVectorStore(hybrid_depth=20)
+    await store.add_vectors(vectors, metas, [f"v{i}" for i in range(200)])
+
+    query = vectors[7]
+    assert "v123" not in {i for i, _ in await store.similarity_search(query, top_k=5)}
+    hits = await store.hybrid_search("SKU-99812", query, top_k=5)
+    assert {"v123", "v7"} <= {i for i, _ in hits}
+
+    assert await store.hybrid_search("SKU-99812", query, top_k=5, filters={"document_id": 0}) != []
+    assert "v123" not in {i for i, _ in await store.hybrid_search("SKU-99812", query, filters={"document_id": 0})}
+    await store.delete_vectors(["v123"])
+    assert "v123" not in {i for i, _ in await store.hybrid_search("SKU-99812", query, top_k=5, alpha=0.0)}
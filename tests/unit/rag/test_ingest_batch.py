@@ -0,0 +1,44 @@
+import datetime as dt
+import json
+
+from privategpt.core.domain.document import DocumentStatus
+from privategpt.infra.tasks.ingest_batch import BatchItem, batch_progress, pack_documents, plan_batch
+from privategpt.shared.settings import settings
+
+
+def test_small_documents_are_packed_and_large_ones_run_alone():
+    sizes = [10, 20, 500, 30, 40, 50, 5]
+    packs = pack_documents(sizes, pack_bytes=100, max_docs=3)
+
+    assert packs == [[2], [0, 1, 3], [4, 5, 6]]
+    assert pack_documents([60, 60], pack_bytes=100, max_docs=10) == [[0], [1]]
+    assert pack_documents([], pack_bytes=100) == []
+
+
+def test_plan_batch_shares_task_ids_within_a_pack():
+    large = settings.ingest_pack_bytes
+    items = [BatchItem(f"doc {i}", f"/spool/{i}.txt", size) for i, size in enumerate([10, 10, large])]
+    docs, packs = plan_batch(items, user_id=1, batch_id="b1", uploaded_at=dt.datetime(2024, 1, 1))
+
+    assert len(packs) == 2
+    assert docs[0].task_id == docs[1].task_id != docs[2].task_id
+    assert all(d.batch_id == "b1" and d.doc_metadata == {"batch_id": "b1"} for d in docs)
+    assert all(d.status == DocumentStatus.PENDING for d in docs)
+
+
+def test_batch_progress_aggregates_rows_and_live_task_meta():
+    items = [BatchItem(f"doc {i}", f"/spool/{i}.txt", 10) for i in range(4)]
+    docs, _ = plan_batch(items, user_id=1, batch_id="b1", uploaded_at=dt.datetime(2024, 1, 1))
+    for i, doc in enumerate(docs):
+        doc.id = i + 1
+    docs[0].status = DocumentStatus.COMPLETE
+    docs[1].status = DocumentStatus.FAILED
+    docs[2].status = DocumentStatus.PROCESSING
+    docs[3].status = DocumentStatus.PROCESSING
+    docs[3].processing_progress = json.dumps({"stage": "starting", "progress": 20})
+
+    progress = batch_progress(docs, lambda task_id: {"document_id": 3, "progress": 60})
+
+    assert progress["counts"] == {"pending": 0, "processing": 2, "complete": 1, "failed": 1}
+    assert progress["progress"] == round((100 + 100 + 60 + 20) / 4)
+    assert progress["done"] is False and progress["tasks"] == 1
@@ -0,0 +1,50 @@
+import asyncio
+
+import numpy as np
+
+from privategpt.infra.database.chunk_writer import chunk_rows, write_chunk_rows
+from privategpt.infra.embedder.fake import FakeEmbedderAdapter
+from privategpt.infra.tasks.ingest_diff import ChunkDiff
+
+
+class CountingEmbedder(FakeEmbedderAdapter):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    async def embed_documents(self, texts, on_progress=None):
+        self.embedded.extend(texts)
+        return await super().embed_documents(texts, on_progress)
+
+
+def test_diff_keeps_unchanged_reuses_moved_and_embeds_only_new_chunks(db_session):
+    old = ["intro", "clause one", "clause two", "signature", "appendix"]
+    old_vectors = np.arange(len(old) * 32, dtype=np.float32).reshape(len(old), 32)  # fake embedder dim
+    write_chunk_rows(db_session.connection(), chunk_rows(3, None, 0, old, old_vectors))
+    db_session.commit()
+
+    diff = ChunkDiff.load(db_session, 3)
+    # "clause one" edited, "clause two" moved up, document shortened by one chunk
+    new = ["intro", "clause two", "clause one (amended)", "signature"]
+    inner = CountingEmbedder()
+    vectors = asyncio.run(diff.embedder(inner).embed_documents(new))
+
+    assert inner.embedded == ["clause one (amended)"]
+    assert np.array_equal(vectors[0], old_vectors[0])
+    assert np.array_equal(vectors[1], old_vectors[2])  # reused from its old position
+    assert diff.changed(0, new) == [1, 2]
+    assert diff.changed(0, new) == [1, 2]  # second sink, counted once
+    assert diff.removed_positions(len(new)) == [4]
+    assert diff.report() == {"kept": 2, "moved": 1, "embedded": 1, "removed": 1, "reused": 3}
+
+
+def test_chunks_without_hashes_are_re_embedded(db_session):
+    rows = chunk_rows(4, None, 0, ["a", "b"], np.ones((2, 32), dtype=np.float32))
+    for row in rows:
+        row["content_hash"] = None  # stored before hashes existed
+    write_chunk_rows(db_session.connection(), rows)
+    db_session.commit()
+
+    diff = ChunkDiff.load(db_session, 4)
+    assert diff.changed(0, ["a", "b"]) == [0, 1]
+    assert diff.vectors == {}
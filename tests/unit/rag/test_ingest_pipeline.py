@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from privategpt.infra.embedder.fake import FakeEmbedderAdapter
+from privategpt.infra.tasks.ingest_pipeline import (
+    PipelineTimings,
+    in_thread,
+    pipeline_windows,
+    run_in_worker_loop,
+    worker_loop,
+)
+
+
+def test_pipeline_passes_windows_through_every_sink_in_order():
+    embedder = FakeEmbedderAdapter()
+    seen = {"vectors": [], "chunks": []}
+    progress = []
+
+    async def vectors(position, parts, embeddings):
+        seen["vectors"].append((position, len(parts), embeddings.shape))
+
+    def chunks(position, parts, embeddings):
+        time.sleep(0.01)  # blocking writer, run in a thread
+        seen["chunks"].append(position)
+
+    timings = PipelineTimings()
+    done = run_in_worker_loop(
+        pipeline_windows(
+            (f"chunk {i}" for i in range(10)),
+            embedder,
+            [("vectors", vectors), ("chunks", in_thread(chunks))],
+            window_chunks=4,
+            queue_windows=1,
+            on_window=lambda n, t: progress.append(n),
+            timings=timings,
+        )
+    )
+
+    assert done == 10 and progress == [4, 8, 10]
+    assert seen["vectors"] == [(0, 4, (4, 32)), (4, 4, (4, 32)), (8, 2, (2, 32))]
+    assert seen["chunks"] == [0, 4, 8]
+    assert set(timings.to_dict()["stages"]) == {"split", "embed", "vectors", "chunks"}
+    assert timings.windows["chunks"] == 3 and timings.busy_s["chunks"] >= 0.03
+
+
+def test_pipeline_overlaps_embedding_with_writes():
+    class SlowEmbedder(FakeEmbedderAdapter):
+        async def embed_documents(self, texts, on_progress=None):
+            await asyncio.sleep(0.05)
+            return await super().embed_documents(texts)
+
+    async def write(position, parts, embeddings):
+        await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    run_in_worker_loop(
+        pipeline_windows((f"c{i}" for i in range(8)), SlowEmbedder(), [("vectors", write)], window_chunks=1)
+    )
+    # 8 windows of 50 ms embed + 50 ms write take ~0.45 s overlapped, 0.8 s in turn
+    assert time.perf_counter() - started < 0.7
+
+
+def test_pipeline_error_cancels_other_stages_and_propagates():
+    def chunks():
+        for i in range(1000):
+            yield f"chunk {i}"
+
+    async def failing(position, parts, embeddings):
+        if position >= 8:
+            raise RuntimeError("vector store down")
+
+    with pytest.raises(RuntimeError, match="vector store down"):
+        run_in_worker_loop(
+            pipeline_windows(chunks(), FakeEmbedderAdapter(), [("vectors", failing)], window_chunks=4)
+        )
+    assert worker_loop() is worker_loop() and not worker_loop().is_closed()
+
+
+def test_pipeline_error_waits_for_running_sink_threads():
+    finished = []
+
+    async def failing(position, parts, embeddings):
+        if position > 0:
+            raise RuntimeError("vector store down")
+
+    def chunks(position, parts, embeddings):
+        time.sleep(0.2)  # still writing window 0 when window 1 fails
+        finished.append(position)
+
+    with pytest.raises(RuntimeError, match="vector store down"):
+        run_in_worker_loop(
+            pipeline_windows(
+                (f"chunk {i}" for i in range(8)),
+                FakeEmbedderAdapter(),
+                [("vectors", failing), ("chunks", in_thread(chunks))],
+                window_chunks=4,
+            )
+        )
+    assert finished == [0]  # the write completed before the error reached the caller
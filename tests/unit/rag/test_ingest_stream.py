@@ -0,0 +1,53 @@
+import asyncio
+import io
+
+from privategpt.infra.embedder.fake import FakeEmbedderAdapter
+from privategpt.infra.splitters.recursive import RecursiveTokenSplitter
+from privategpt.infra.tasks import ingest_stream
+from privategpt.infra.tasks.ingest_stream import TextBlockReader, embed_windows
+
+
+def test_reader_decodes_characters_split_across_blocks():
+    text = "naïve café – ünïcödé " * 50
+    reader = TextBlockReader(io.BytesIO(text.encode("utf-8")), block_bytes=7)
+
+    assert "".join(reader) == text
+    assert reader.bytes_read == len(text.encode("utf-8"))
+
+
+def test_stream_from_file_matches_whole_text(tmp_path):
+    text = "\n\n".join(" ".join(f"Sentence {p}.{i} about streaming." for i in range(30)) for p in range(20))
+    path = tmp_path / "doc.txt"
+    path.write_text(text, encoding="utf-8")
+    splitter = RecursiveTokenSplitter(chunk_size=64, chunk_overlap=8)
+
+    reader = TextBlockReader(path, block_bytes=100)
+    assert list(splitter.iter_chunks_stream(reader)) == splitter.split(text)
+    assert reader.fraction == 1.0
+
+
+def test_embed_windows_hands_bounded_windows_to_sink():
+    embedder = FakeEmbedderAdapter()
+    chunks = [f"chunk {i}" for i in range(10)]
+    windows = []
+
+    async def sink(position, parts, vectors):
+        windows.append((position, list(parts), vectors.shape))
+
+    done = asyncio.run(embed_windows(iter(chunks), embedder, sink, window_chunks=4))
+
+    assert done == 10
+    assert [(p, len(parts)) for p, parts, _ in windows] == [(0, 4), (4, 4), (8, 2)]
+    assert all(shape == (len(parts), 32) for _, parts, shape in windows)
+
+
+def test_spool_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_stream.settings, "ingest_spool_dir", str(tmp_path / "spool"))
+
+    path = ingest_stream.spool_upload(io.BytesIO(b"uploaded body"), suffix=".md")
+    assert path.parent == tmp_path / "spool" and path.suffix == ".md"
+    assert "".join(TextBlockReader(path)) == "uploaded body"
+
+    ingest_stream.remove_spool(path)
+    ingest_stream.remove_spool(path)  # already gone is fine
+    assert not path.exists()
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from privategpt.infra.vector_store.ivfpq import IvfPqCodec, IvfPqVectorStore
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+def _clustered(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((16, dim)).astype(np.float32)
+    return centres[rng.integers(0, 16, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def test_codec_scores_approximate_inner_products():
+    vectors = _clustered(3000)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    codec = IvfPqCodec.train(vectors, nlist=16, m=8, iters=10)
+    lists, codes = codec.encode(vectors)
+    assert codes.shape == (3000, 8) and codes.dtype == np.uint8
+
+    query = vectors[0]
+    _, coarse_scores = codec.probe(query, 4)
+    approx = codec.approximate(codec.table(query), coarse_scores, lists, codes)
+    assert np.abs(approx - vectors @ query).mean() < 0.05
+
+
+@pytest.mark.asyncio
+async def test_trained_collection_recall_and_exact_fallback(tmp_path):
+    vectors = _clustered(4000)
+    ids = [f"v{i}" for i in range(4000)]
+    metas = [{"collection_id": "big", "document_id": i % 50} for i in range(4000)]
+    store = IvfPqVectorStore(tmp_path, nlist=32, m=8, nprobe=8, rerank=10, train_min_rows=1000)
+    exact = InMemoryVectorStore()
+    for start in range(0, 4000, 1000):
+        await store.add_vectors(vectors[start : start + 1000], metas[start : start + 1000], ids[start : start + 1000])
+    await store.add_vectors(vectors[:20], [{"collection_id": "small"}] * 20, [f"s{i}" for i in range(20)])
+    await exact.add_vectors(vectors, metas, ids)
+
+    assert store.stale_collections() == ["big"]
+    assert store.train() == ["big"]
+    assert store.stale_collections() == []
+
+    recall = []
+    for query in _clustered(20, seed=1):
+        found = {i for i, _ in await store.similarity_search(query, top_k=10, filters={"collection_id": "big"})}
+        truth = {i for i, _ in await exact.similarity_search(query, top_k=10)}
+        recall.append(len(found & truth) / 10)
+    assert np.mean(recall) >= 0.9
+
+    # the untrained collection and small filtered subsets are scored exactly
+    hits = await store.similarity_search(vectors[3], top_k=1, filters={"collection_id": "small"})
+    assert hits[0][0] == "s3" and hits[0][1] == pytest.approx(1.0, abs=1e-5)
+    hits = await store.similarity_search(vectors[7], top_k=3, filters={"document_id": 7})
+    assert hits[0][0] == "v7" and all(int(i[1:]) % 50 == 7 for i, _ in hits)
+
+
+@pytest.mark.asyncio
+async def test_other_instance_sees_codec_new_rows_and_deletes(tmp_path):
+    vectors = _clustered(1200)
+    ids = [f"v{i}" for i in range(1200)]
+    writer = IvfPqVectorStore(tmp_path, nlist=16, m=8, train_min_rows=500)
+    await writer.add_vectors(vectors[:1000], [{}] * 1000, ids[:1000])
+    reader = IvfPqVectorStore(tmp_path)
+    assert writer.train() == [""]
+
+    await writer.add_vectors(vectors[1000:], [{}] * 200, ids[1000:])  # encoded with the trained codec
+    assert await writer.delete_vectors(["v1100", "v5"]) == 2
+    assert len(reader) == 1198
+    assert (await reader.similarity_search(vectors[1150], top_k=1))[0][0] == "v1150"
+    assert "v1100" not in {i for i, _ in await reader.similarity_search(vectors[1100], top_k=20)}
+    assert len(list(tmp_path.glob("col-*/seg-*/pq-*.npz"))) == 2
+
+
+@pytest.mark.asyncio
+async def test_moved_document_is_tombstoned_only_where_it_lived(tmp_path):
+    vectors = _clustered(30)
+    store = IvfPqVectorStore(tmp_path)
+    await store.add_vectors(vectors[:10], [{"collection_id": "a", "document_id": 1}] * 10, [f"d1-{i}" for i in range(10)])
+    await store.add_vectors(vectors[10:20], [{"collection_id": "b", "document_id": 2}] * 10, [f"d2-{i}" for i in range(10)])
+
+    calls = []
+    for key, collection in store._collections.items():
+        original = collection.store.delete_vectors
+
+        async def spy(ids, filters=None, key=key, original=original):
+            calls.append(key)
+            return await original(ids, filters=filters)
+
+        collection.store.delete_vectors = spy
+    # document 1 moves from "a" to "c"; "b" never holds it and is left alone
+    await store.add_vectors(vectors[20:30], [{"collection_id": "c", "document_id": 1}] * 10, [f"d1-{i}" for i in range(10)])
+
+    assert calls == ["a"] and len(store) == 20
+    assert await store.delete_vectors(["d2-0", "d1-0"], filters={"document_id": [2]}) == 1
+    assert len(store) == 19
@@ -0,0 +1,204 @@
+import numpy as np
+import pytest
+
+from privategpt.infra.embedder.fake import FakeEmbedderAdapter
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+
+
+@pytest.mark.asyncio
+async def test_fake_embedder_returns_float32_matrix_and_vector():
+    embedder = FakeEmbedderAdapter()
+    matrix = await embedder.embed_documents(["a", "b", "c"])
+    vector = await embedder.embed_query("b")
+
+    assert matrix.dtype == np.float32 and matrix.shape == (3, 32)
+    assert vector.dtype == np.float32 and vector.shape == (32,)
+    np.testing.assert_array_equal(matrix[1], vector)
+
+
+@pytest.mark.asyncio
+async def test_memory_store_ranks_matrix_rows_by_cosine():
+    embedder = FakeEmbedderAdapter()
+    store = InMemoryVectorStore()
+    texts = ["alpha", "beta", "gamma"]
+    await store.add_vectors(await embedder.embed_documents(texts), [{} for _ in texts], texts)
+
+    results = await store.similarity_search(await embedder.embed_query("beta"), top_k=2)
+
+    assert [doc_id for doc_id, _ in results][0] == "beta"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-6)
+    assert len(results) == 2
+
+
+def _brute_force(matrix, query, top_k):
+    normed = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = normed @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:top_k])
+
+
+@pytest.mark.asyncio
+async def test_memory_store_grows_and_matches_brute_force_top_k():
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((300, 16)).astype(np.float32)
+    ids = [f"v{i}" for i in range(300)]
+    store = InMemoryVectorStore(initial_capacity=8)
+    for start in range(0, 300, 64):
+        await store.add_vectors(matrix[start : start + 64], [{}] * 64, ids[start : start + 64])
+
+    query = rng.standard_normal(16).astype(np.float32)
+    results = await store.similarity_search(query, top_k=10)
+
+    assert len(store) == 300
+    assert [doc_id for doc_id, _ in results] == [ids[i] for i in _brute_force(matrix, query, 10)]
+    assert [s for _, s in results] == sorted((s for _, s in results), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_memory_store_deletes_upserts_and_compacts():
+    rng = np.random.default_rng(1)
+    matrix = rng.standard_normal((20, 8)).astype(np.float32)
+    ids = [f"v{i}" for i in range(20)]
+    store = InMemoryVectorStore(compact_ratio=0.5)
+    await store.add_vectors(matrix, [{}] * 20, ids)
+
+    assert await store.delete_vectors(["v3", "v4", "missing"]) == 2
+    hits = await store.similarity_search(matrix[3], top_k=20)
+    assert len(hits) == 18 and "v3" not in {doc_id for doc_id, _ in hits}
+
+    # re-adding an existing id overwrites its row
+    await store.add_vectors(matrix[3:4], [{}], ["v5"])
+    assert (await store.similarity_search(matrix[3], top_k=1))[0][0] == "v5"
+
+    await store.delete_vectors(ids[6:16])  # past compact_ratio
+    assert len(store) == 8
+    assert store._size == 8
+    remaining = await store.similarity_search(matrix[19], top_k=1)
+    assert remaining[0][0] == "v19"
+    assert remaining[0][1] == pytest.approx(1.0, abs=1e-6)
+
+
+@pytest.mark.asyncio
+async def test_memory_store_filters_candidates_before_top_k():
+    rng = np.random.default_rng(2)
+    matrix = rng.standard_normal((40, 8)).astype(np.float32)
+    ids = [f"v{i}" for i in range(40)]
+    metas = [{"document_id": i // 10, "collection_id": "a" if i < 20 else "b", "position": i % 10} for i in range(40)]
+    store = InMemoryVectorStore()
+    await store.add_vectors(matrix, metas, ids)
+
+    # the best overall match (v0) is outside the filter, so it must not crowd out results
+    hits = await store.similarity_search(matrix[0], top_k=5, filters={"collection_ids": ["b"]})
+    assert len(hits) == 5 and all(int(h[1:]) >= 20 for h, _ in hits)
+
+    hits = await store.similarity_search(matrix[0], top_k=50, filters={"document_ids": ["1", 3], "position": 2})
+    assert sorted(h for h, _ in hits) == ["v12", "v32"]
+
+    assert await store.similarity_search(matrix[0], filters={"collection_ids": []}) == []
+    await store.delete_vectors(["v12"])
+    hits = await store.similarity_search(matrix[0], filters={"document_id": 1, "position": 2})
+    assert hits == []
+    with pytest.raises(ValueError):
+        await store.similarity_search(matrix[0], filters={"tags": ["x"]})
+
+
+def test_normalize_filters_merges_singular_and_plural_keys():
+    from privategpt.core.ports.vector_store import normalize_filters
+
+    assert normalize_filters(None) == {}
+    assert normalize_filters({"document_id": "7", "document_ids": [7, 8], "collection_ids": ["a"]}) == {
+        "document_id": [7, 8],
+        "collection_id": ["a"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_binary_store_prefilters_by_hamming_and_rescores_exactly():
+    rng = np.random.default_rng(3)
+    centres = rng.standard_normal((8, 64)).astype(np.float32)
+    matrix = centres[rng.integers(0, 8, 2000)] + 0.3 * rng.standard_normal((2000, 64)).astype(np.float32)
+    ids = [f"v{i}" for i in range(2000)]
+    metas = [{"document_id": i % 4} for i in range(2000)]
+    # within a tight cluster the sign bits barely differ, so the shortlist
+    # (top_k * rescore of 2000 rows) must be wide enough to hold the true top 10
+    binary = InMemoryVectorStore(binary=True, rescore=20)
+    exact = InMemoryVectorStore()
+    await binary.add_vectors(matrix, metas, ids)
+    await exact.add_vectors(matrix, metas, ids)
+    assert binary._bits.shape[1] == 8
+
+    recall = []
+    for query in matrix[:20] + 0.1 * rng.standard_normal((20, 64)).astype(np.float32):
+        found = await binary.similarity_search(query, top_k=10)
+        truth = await exact.similarity_search(query, top_k=10)
+        recall.append(len({i for i, _ in found} & {i for i, _ in truth}) / 10)
+        # shortlisted rows carry exact float scores, so they never beat the true best
+        assert found[0][1] <= truth[0][1] + 1e-6
+    assert np.mean(recall) >= 0.9
+
+    await binary.delete_vectors(["v5"])
+    assert "v5" not in {i for i, _ in await binary.similarity_search(matrix[5], top_k=50)}
+    hits = await binary.similarity_search(matrix[6], top_k=5, filters={"document_id": 2})
+    assert hits[0][0] == "v6" and all(int(i[1:]) % 4 == 2 for i, _ in hits)
+
+    await binary.delete_vectors(ids[100:1500])  # compacts the bits with the matrix
+    assert (await binary.similarity_search(matrix[1700], top_k=1))[0][0] == "v1700"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("binary", [False, True])
+async def test_search_many_matches_single_searches(binary):
+    rng = np.random.default_rng(4)
+    matrix = rng.standard_normal((500, 16)).astype(np.float32)
+    ids = [f"v{i}" for i in range(500)]
+    store = InMemoryVectorStore(binary=binary, rescore=5)
+    await store.add_vectors(matrix, [{"document_id": i % 3} for i in range(500)], ids)
+    await store.delete_vectors(["v1", "v2"])
+
+    queries = np.vstack([rng.standard_normal((4, 16)).astype(np.float32), np.zeros((1, 16), dtype=np.float32)])
+    filters = [None, {"document_id": 1}, None, {"document_ids": [0, 2]}, None]
+    batched = await store.similarity_search_many(queries, top_k=7, filters=filters)
+
+    assert len(batched) == 5 and batched[4] == []
+    for query, query_filters, hits in zip(queries[:4], filters, batched):
+        single = await store.similarity_search(query, top_k=7, filters=query_filters)
+        assert [i for i, _ in hits] == [i for i, _ in single]
+        assert [s for _, s in hits] == pytest.approx([s for _, s in single], abs=1e-5)
+
+    shared = await store.similarity_search_many(queries[:2], top_k=3, filters={"document_id": 2})
+    assert all(int(i[1:]) % 3 == 2 for hits in shared for i, _ in hits)
+    with pytest.raises(ValueError):
+        await store.similarity_search_many(queries, filters=[None])
+
+
+@pytest.mark.asyncio
+async def test_dedup_store_shares_rows_and_expands_hits_to_every_reference():
+    embedder = FakeEmbedderAdapter()
+    texts = ["standard disclaimer", "clause a", "standard disclaimer", "clause b", "standard disclaimer"]
+    metas = [
+        {"text": t, "document_id": d, "collection_id": c, "user_id": u, "position": 0}
+        for t, d, c, u in zip(texts, [1, 1, 2, 2, 3], ["x", "x", "y", "y", "y"], [7, 7, 7, 7, 8])
+    ]
+    store = InMemoryVectorStore(dedup=True)
+    await store.add_vectors(await embedder.embed_documents(texts), metas, ["a0", "a1", "b0", "b1", "c0"])
+
+    # the disclaimer is one row for user 7 and another for user 8
+    assert store.dedup_stats() == {"ids": 5, "rows": 4, "shared_rows": 1}
+    query = await embedder.embed_query("standard disclaimer")
+    hits = await store.similarity_search(query, top_k=1, filters={"user_id": 7})
+    assert [i for i, _ in hits] == ["a0", "b0"] and hits[0][1] == hits[1][1]
+    # each reference is checked against every filter field
+    hits = await store.similarity_search(query, top_k=1, filters={"user_id": 7, "collection_id": "y"})
+    assert [i for i, _ in hits] == ["b0"]
+    assert [i for i, _ in await store.hybrid_search("disclaimer", query, top_k=1, filters={"document_id": 2})] == [
+        "b0"
+    ]
+
+    await store.delete_vectors(["a0"])
+    assert store.dedup_stats()["rows"] == 4
+    hits = await store.similarity_search(query, top_k=2, filters={"document_id": 1})
+    assert [i for i, _ in hits] == ["a1"]
+    await store.delete_vectors(["b0"])
+    assert store.dedup_stats() == {"ids": 3, "rows": 3, "shared_rows": 0}
+    store.compact()
+    hits = await store.similarity_search(query, top_k=1)
+    assert [i for i, _ in hits] == ["c0"]
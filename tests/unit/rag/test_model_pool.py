@@ -0,0 +1,83 @@
+import sys
+import threading
+import types
+
+import pytest
+
+from privategpt.infra.embedder.model_pool import EmbedderModelPool
+
+
+@pytest.fixture
+def fake_sentence_transformers(monkeypatch):
+    loads: list[str] = []
+
+    class FakeModel:
+        def __init__(self, name, device=None):
+            loads.append(name)
+            if name == "broken":
+                raise OSError("model not found")
+            self.name = name
+
+        def eval(self):
+            return self
+
+        def parameters(self):
+            return []
+
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    return loads
+
+
+def test_models_are_loaded_once_per_name(fake_sentence_transformers):
+    pool = EmbedderModelPool(device="cpu")
+
+    threads = [threading.Thread(target=pool.get, args=("m1",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pool.get("m2")
+
+    assert fake_sentence_transformers == ["m1", "m2"]
+    assert pool.get("m1") is pool.get("m1")
+    assert set(pool.status()["models"]) == {"m1", "m2"}
+
+
+def test_warmup_drives_readiness_and_records_failures(fake_sentence_transformers):
+    pool = EmbedderModelPool(device="cpu")
+    pool.warmup(["m1"])
+    assert pool.ready
+
+    pool.warmup(["broken"])
+    status = pool.status()
+    assert not status["ready"]
+    assert "broken" in status["errors"]
+    assert status["models"]["m1"]["load_seconds"] >= 0
+
+
+def test_preload_for_fork_loads_only_cpu_torch_models(fake_sentence_transformers, monkeypatch):
+    import gc
+
+    from privategpt.infra.embedder import process_pool
+
+    threads: list[int] = []
+    monkeypatch.setattr(process_pool, "apply_thread_limits", threads.append)
+    monkeypatch.setattr(gc, "freeze", lambda: None)
+    pool = EmbedderModelPool(device="cpu")
+
+    preloaded = pool.preload_for_fork(["m1", "onnx:m2", "m1"])
+
+    assert preloaded == ["m1"]
+    assert fake_sentence_transformers == ["m1"]
+    assert threads == [1]
+    status = pool.status()
+    assert status["models"]["m1"]["inherited"] is False
+    assert set(status["memory"]) == {"rss_bytes", "pss_bytes", "shared_bytes", "private_bytes", "anonymous_bytes"}
+
+
+def test_preload_for_fork_skips_gpu(fake_sentence_transformers):
+    pool = EmbedderModelPool(device="cuda")
+    assert pool.preload_for_fork(["m1"]) == []
+    assert fake_sentence_transformers == []
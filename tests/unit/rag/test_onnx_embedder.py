@@ -0,0 +1,46 @@
+"""Parity between the ONNX Runtime and torch embedders.
+
+Needs the real models, so it only runs where ``onnxruntime``, ``transformers``
+and ``sentence_transformers`` are installed (the model is downloaded and
+exported on first run).
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("transformers")
+pytest.importorskip("sentence_transformers")
+
+from privategpt.infra.embedder.bge_adapter import BgeEmbedderAdapter  # noqa: E402
+from privategpt.infra.embedder.model_pool import EmbedderModelPool  # noqa: E402
+from privategpt.infra.embedder.onnx_adapter import OnnxEmbedderAdapter  # noqa: E402
+
+MODEL = "BAAI/bge-small-en-v1.5"
+TEXTS = [
+    "The contract terminates on 31 December 2025.",
+    "Case number 2023-CV-00412 was dismissed with prejudice.",
+    "short",
+    "A much longer paragraph about revenue recognition, deferred tax assets and the "
+    "accounting treatment of leases under IFRS 16 that spans many more tokens than the others.",
+]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    return EmbedderModelPool(device="cpu")
+
+
+async def _cosines(pool, quantized: bool) -> np.ndarray:
+    torch_vecs = np.asarray(await BgeEmbedderAdapter(MODEL, pool=pool).embed_documents(TEXTS))
+    onnx_vecs = np.asarray(await OnnxEmbedderAdapter(MODEL, quantized=quantized, pool=pool).embed_documents(TEXTS))
+    return np.sum(torch_vecs * onnx_vecs, axis=1)
+
+
+@pytest.mark.asyncio
+async def test_fp32_graph_matches_torch(pool):
+    assert (await _cosines(pool, quantized=False)).min() > 0.9999
+
+
+@pytest.mark.asyncio
+async def test_int8_graph_drift_is_bounded(pool):
+    assert (await _cosines(pool, quantized=True)).min() > 0.98
@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from privategpt.infra.embedder.batching import Histogram, MicroBatchingEmbedder, plan_token_batches
+from privategpt.infra.embedder.fake import FakeEmbedderAdapter
+
+
+class RecordingEmbedder(FakeEmbedderAdapter):
+    def __init__(self, fail: bool = False):
+        self.batches: list[list[str]] = []
+        self.fail = fail
+
+    async def embed_queries(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("encoder down")
+        return await super().embed_queries(texts)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_are_coalesced_and_routed_back():
+    inner = RecordingEmbedder()
+    embedder = MicroBatchingEmbedder(inner, max_wait_ms=20, max_batch=64)
+
+    texts = [f"query {i}" for i in range(10)]
+    vectors = await asyncio.gather(*(embedder.embed_query(t) for t in texts))
+
+    assert inner.batches == [texts]
+    expected = await FakeEmbedderAdapter().embed_queries(texts)
+    np.testing.assert_array_equal(np.stack(vectors), expected)
+    assert embedder.batch_size.samples == 1
+    assert embedder.queue_depth.samples == 10
+
+
+@pytest.mark.asyncio
+async def test_full_batches_flush_without_waiting_for_the_window():
+    inner = RecordingEmbedder()
+    embedder = MicroBatchingEmbedder(inner, max_wait_ms=10_000, max_batch=4)
+
+    await asyncio.wait_for(asyncio.gather(*(embedder.embed_query(str(i)) for i in range(8))), timeout=1)
+    assert [len(b) for b in inner.batches] == [4, 4]
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller():
+    embedder = MicroBatchingEmbedder(RecordingEmbedder(fail=True), max_wait_ms=1)
+    results = await asyncio.gather(embedder.embed_query("a"), embedder.embed_query("b"), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_histogram_buckets():
+    hist = Histogram((1, 4))
+    for value in (1, 2, 5):
+        hist.observe(value)
+    assert hist.to_dict()["buckets"] == {"1": 1, "4": 1, "+Inf": 1}
+
+
+def test_token_batches_group_similar_lengths_within_budget():
+    lengths = [5, 100, 6, 98, 7, 400]
+    batches = plan_token_batches(lengths, token_budget=200, max_batch=8)
+
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    assert batches[0] == [5]  # oversize text gets its own batch
+    assert batches[1] == [1, 3]
+    assert batches[2] == [4, 2, 0]
+    for batch in batches[1:]:
+        assert max(lengths[i] for i in batch) * len(batch) <= 200
+
+
+def test_token_batches_respect_max_batch():
+    batches = plan_token_batches([1] * 10, token_budget=10_000, max_batch=4)
+    assert [len(b) for b in batches] == [4, 4, 2]
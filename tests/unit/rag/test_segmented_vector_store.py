@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from privategpt.infra.vector_store.memory import InMemoryVectorStore
+from privategpt.infra.vector_store.segmented import SegmentedVectorStore
+
+
+def _data(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, dim)).astype(np.float32), [f"v{i}" for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_segments_merge_top_k_like_the_exact_store(tmp_path):
+    vectors, ids = _data(500)
+    metas = [{"document_id": i % 5, "collection_id": f"c{i % 2}"} for i in range(500)]
+    segmented = SegmentedVectorStore(tmp_path, compact_max_small=100)
+    exact = InMemoryVectorStore()
+    for start in range(0, 500, 100):
+        await segmented.add_vectors(vectors[start : start + 100], metas[start : start + 100], ids[start : start + 100])
+    await exact.add_vectors(vectors, metas, ids)
+    assert len(segmented._segments) == 5
+
+    query = vectors[123] + 0.05
+    for filters in (None, {"collection_ids": ["c1"], "document_id": 3}):
+        got = await segmented.similarity_search(query, top_k=10, filters=filters)
+        want = await exact.similarity_search(query, top_k=10, filters=filters)
+        assert [i for i, _ in got] == [i for i, _ in want]
+        np.testing.assert_allclose([s for _, s in got], [s for _, s in want], rtol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_reopen_sees_tombstones_and_upserts_from_other_instance(tmp_path):
+    vectors, ids = _data(50)
+    writer = SegmentedVectorStore(tmp_path)
+    await writer.add_vectors(vectors, [{}] * 50, ids)
+    reader = SegmentedVectorStore(tmp_path)
+
+    assert await writer.delete_vectors(["v1", "missing"]) == 1
+    await writer.add_vectors(vectors[2:3] * -1, [{}], ["v2"])  # upsert into a new segment
+
+    assert len(reader) == 49
+    assert "v1" not in {i for i, _ in await reader.similarity_search(vectors[1], top_k=50)}
+    assert (await reader.similarity_search(-vectors[2], top_k=1))[0][0] == "v2"
+
+
+@pytest.mark.asyncio
+async def test_compaction_merges_small_segments_and_drops_tombstones(tmp_path):
+    vectors, ids = _data(40)
+    store = SegmentedVectorStore(tmp_path, compact_min_rows=100, compact_max_small=4, background_compaction=False)
+    for start in range(0, 30, 10):
+        await store.add_vectors(
+            vectors[start : start + 10], [{"position": i} for i in range(start, start + 10)], ids[start : start + 10]
+        )
+    await store.delete_vectors(ids[:5])
+    await store.add_vectors(vectors[30:40], [{}] * 10, ids[30:40])  # 4th small segment triggers compaction
+
+    assert [s.rows for s in store._segments] == [35]
+    # the sources stay until the next compaction, for readers of the old manifest
+    assert len(list(tmp_path.glob("seg-*"))) == 5 and len(store._retired) == 4
+    hits = await store.similarity_search(vectors[12], top_k=3, filters={"position": 12})
+    assert hits[0][0] == "v12"
+    assert len(SegmentedVectorStore(tmp_path)) == 35
+
+    for start in range(0, 40, 10):
+        await store.add_vectors(vectors[start : start + 10], [{}] * 10, [f"w{i}" for i in range(start, start + 10)])
+    assert {p.name for p in tmp_path.glob("seg-*")} == {s.name for s in store._segments} | set(store._retired)
+
+
+@pytest.mark.asyncio
+async def test_dedup_shares_vectors_within_segments_and_after_compaction(tmp_path):
+    vectors, _ = _data(3)
+    disclaimer, clause_a, clause_b = vectors
+    store = SegmentedVectorStore(tmp_path, compact_max_small=3, background_compaction=False, dedup=True)
+    meta = lambda text, doc, user=7: {"text": text, "document_id": doc, "user_id": user}  # noqa: E731
+    # one document per call; the disclaimer repeats within and across documents
+    await store.add_vectors(
+        np.stack([disclaimer, clause_a, disclaimer]),
+        [meta("disclaimer", 1), meta("clause a", 1), meta("disclaimer", 1)],
+        ["a0", "a1", "a2"],
+    )
+    await store.add_vectors(np.stack([disclaimer, clause_b]), [meta("disclaimer", 2), meta("clause b", 2)], ["b0", "b1"])
+    assert store.dedup_stats() == {"ids": 5, "rows": 4, "shared_rows": 1}
+
+    # hits expand to every reference; top_k counts distinct texts
+    hits = await store.similarity_search(disclaimer, top_k=1)
+    assert sorted(i for i, _ in hits) == ["a0", "a2", "b0"] and len({s for _, s in hits}) == 1
+    assert [i for i, _ in await store.similarity_search(disclaimer, top_k=1, filters={"document_id": 2})] == ["b0"]
+
+    # another user's copy is not shared; compaction merges the remaining copies
+    await store.add_vectors(disclaimer[None], [meta("disclaimer", 3, user=8)], ["c0"])
+    assert len(store._segments) == 1
+    assert store.dedup_stats() == {"ids": 6, "rows": 4, "shared_rows": 1}
+    assert store._segments[0].vectors.shape == (4, 16)
+
+    await store.delete_vectors(["a0", "a2"])
+    hits = await store.similarity_search(disclaimer, top_k=2, filters={"user_id": 7})
+    assert [i for i, _ in hits][0] == "b0"
+    assert store.dedup_stats() == {"ids": 4, "rows": 4, "shared_rows": 0}
@@ -0,0 +1,63 @@
+import types
+
+from privategpt.infra.splitters.recursive import RecursiveTokenSplitter, approx_token_count
+
+
+def _sentences(n: int) -> str:
+    return " ".join(f"Sentence number {i} talks about clause {i}." for i in range(n))
+
+
+def test_text_without_blank_lines_is_split_to_chunk_size():
+    splitter = RecursiveTokenSplitter(chunk_size=64, chunk_overlap=8)
+    chunks = splitter.split(_sentences(400))
+
+    assert len(chunks) > 10
+    assert all(approx_token_count(c) <= 64 for c in chunks)
+    # cuts land on sentence ends, not mid-sentence
+    assert all(c.endswith(".") for c in chunks)
+
+
+def test_tiny_paragraphs_are_merged():
+    text = "\n\n".join(f"Line {i}." for i in range(200))
+    chunks = RecursiveTokenSplitter(chunk_size=100, chunk_overlap=0).split(text)
+
+    assert len(chunks) < 20
+    assert "\n\n".join(chunks).split() == text.split()
+
+
+def test_paragraph_boundary_is_preferred_over_sentence():
+    first = _sentences(5)
+    text = first + "\n\n" + _sentences(5)
+    chunks = RecursiveTokenSplitter(chunk_size=approx_token_count(first) + 20, chunk_overlap=0).split(text)
+    assert chunks[0] == first
+
+
+def test_consecutive_chunks_overlap():
+    chunks = RecursiveTokenSplitter(chunk_size=40, chunk_overlap=12).split(_sentences(50))
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.split()[0] in prev.split()
+
+
+def test_oversized_words_are_cut_and_nothing_is_lost():
+    blob = "x" * 5000
+    chunks = RecursiveTokenSplitter(chunk_size=50, chunk_overlap=0).split(f"start {blob} end")
+    assert all(approx_token_count(c) <= 50 for c in chunks)
+    assert "".join(chunks).replace(" ", "") == f"start{blob}end"
+
+
+def test_iter_chunks_is_lazy_and_empty_text_yields_nothing():
+    splitter = RecursiveTokenSplitter(chunk_size=32)
+    assert isinstance(splitter.iter_chunks("a b c"), types.GeneratorType)
+    assert splitter.split("   \n\n  ") == []
+
+
+def test_streamed_blocks_give_the_same_chunks_as_whole_text():
+    text = "\n\n".join(_sentences(30) for _ in range(10)) + " trailing words without a full stop"
+    # words longer than a chunk are sliced by their full length, wherever a block ends
+    url = "see https://example.com/" + "a1b2" * 300 + " for details"
+    base64 = "\n  payload " + "QUJD" * 500 + "== ok.\n\n"
+    splitter = RecursiveTokenSplitter(chunk_size=64, chunk_overlap=16)
+    for doc in (text, text[:3000] + url + text[3000:6000] + base64 + text[6000:]):
+        for block in (1, 7, 100, 997):
+            blocks = [doc[i : i + block] for i in range(0, len(doc), block)]
+            assert list(splitter.iter_chunks_stream(blocks)) == splitter.split(doc)
@@ -0,0 +1,65 @@
+import pytest
+
+from privategpt.infra.vector_store.weaviate_client import WeaviateClientManager
+
+
+class _FakeClient:
+    def __init__(self, ready=True):
+        self.ready = ready
+        self.open = True
+
+    def is_ready(self):
+        return self.ready
+
+    def is_connected(self):
+        return self.open
+
+    def close(self):
+        self.open = False
+
+
+def test_manager_connects_and_checks_schema_once():
+    made, checked = [], []
+
+    def connect(url, grpc_port):
+        made.append(_FakeClient())
+        return made[-1]
+
+    manager = WeaviateClientManager("http://weaviate:8080", connect=connect)
+    manager.set_schema_check(checked.append)
+    clients = {id(manager.get()) for _ in range(5)}
+
+    assert len(clients) == 1 and len(made) == 1 and checked == made
+    stats = manager.stats()
+    assert stats["connects"] == 1 and stats["schema_checks"] == 1 and stats["connected"]
+
+    manager.invalidate(made[0])  # still connected: kept
+    assert manager.get() is made[0]
+    made[0].open = False
+    manager.invalidate(made[0])
+    assert manager.get() is made[1]
+    assert manager.stats()["reconnects"] == 1 and len(checked) == 1
+
+    manager.close()
+    assert not made[1].open and not manager.connected
+
+
+def test_manager_retries_with_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("privategpt.infra.vector_store.weaviate_client.time.sleep", sleeps.append)
+    attempts = iter([ConnectionError("down"), _FakeClient(ready=False), _FakeClient()])
+
+    def connect(url, grpc_port):
+        outcome = next(attempts)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    manager = WeaviateClientManager("http://weaviate:8080", backoff_s=0.5, connect=connect)
+    assert manager.get().ready
+    assert sleeps == [0.5, 1.0]
+    assert manager.stats()["connect_failures"] == 2
+
+    failing = WeaviateClientManager("http://weaviate:8080", connect_retries=1, connect=lambda *_: _FakeClient(False))
+    with pytest.raises(RuntimeError):
+        failing.get()
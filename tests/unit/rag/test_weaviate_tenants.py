@@ -0,0 +1,134 @@
+import importlib.metadata
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from privategpt.infra.vector_store.weaviate_adapter import TENANT_COLLECTION, WeaviateAdapter, tenant_name
+from privategpt.infra.vector_store.weaviate_client import WeaviateClientManager
+
+
+class _Batch:
+    def __init__(self, shard):
+        self.shard = shard
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_object(self, properties, vector, uuid):
+        self.shard[str(uuid)] = (properties, vector)
+
+
+class _Tenants:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get(self):
+        return {name: SimpleNamespace(activity_status=status) for name, status in self.collection.status.items()}
+
+    def create(self, tenants):
+        for t in tenants:
+            self.collection.status[t.name] = self.collection.active
+            self.collection.shards[t.name] = {}
+
+    def update(self, tenants):
+        for t in tenants:
+            self.collection.status[t.name] = t.activity_status
+
+
+class _Collection:
+    def __init__(self):
+        from weaviate.classes.tenants import TenantActivityStatus
+
+        self.active = getattr(TenantActivityStatus, "ACTIVE", None) or TenantActivityStatus.HOT
+        self.shards, self.status, self.queried, self.deleted = {}, {}, [], []
+        self.tenants = _Tenants(self)
+
+    def with_tenant(self, tenant):
+        shard = self.shards[tenant]
+        collection = self
+
+        def _delete_many(where):
+            assert collection.status[tenant] == collection.active
+            collection.deleted.append(tenant)
+            return SimpleNamespace(successful=sum(shard.pop(str(u), None) is not None for u in where.value))
+
+        class _View:
+            batch = SimpleNamespace(dynamic=lambda: _Batch(shard))
+            data = SimpleNamespace(delete_many=_delete_many)
+
+            class query:
+                @staticmethod
+                def near_vector(near_vector, limit, filters, return_metadata):
+                    assert collection.status[tenant] == collection.active
+                    collection.queried.append(tenant)
+                    scored = sorted(
+                        ((float(np.dot(vec, near_vector)), uuid) for uuid, (_, vec) in shard.items()), reverse=True
+                    )
+                    return SimpleNamespace(
+                        objects=[SimpleNamespace(uuid=u, metadata=SimpleNamespace(certainty=s)) for s, u in scored[:limit]]
+                    )
+
+        return _View
+
+
+class _Client:
+    def __init__(self):
+        self.collection = _Collection()
+        self.collections = SimpleNamespace(get=lambda name: self.collection, list_all=lambda: {TENANT_COLLECTION: None})
+
+    def is_ready(self):
+        return True
+
+
+@pytest.fixture
+def adapter(monkeypatch):
+    # the weaviate client reads package versions on import, which conftest stubs out
+    monkeypatch.setattr(importlib.metadata, "version", lambda name: importlib.metadata.distribution(name).version)
+    client = _Client()
+    manager = WeaviateClientManager("http://fake:8080", connect=lambda *_: client)
+    monkeypatch.setattr("privategpt.infra.vector_store.weaviate_adapter.get_weaviate_manager", lambda url: manager)
+    return WeaviateAdapter("http://fake:8080", multi_tenancy=True), client.collection
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_written_to_and_searched_in_their_users_tenant(adapter):
+    store, collection = adapter
+    vectors = np.eye(4, dtype=np.float32)
+    metas = [{"user_id": 1}, {"user_id": 2}, {"user_id": 1}, {}]
+    await store.add_vectors(vectors, metas, ["a", "b", "c", "d"])
+
+    assert set(collection.shards) == {"user-1", "user-2", tenant_name(None)}
+    assert set(collection.shards["user-1"]) == {"a", "c"}
+
+    # a user's search also covers unowned chunks in the shared tenant
+    hits = await store.similarity_search(vectors[3], top_k=3, filters={"user_id": 1})
+    assert hits[0][0] == "d" and {h for h, _ in hits} == {"a", "c", "d"}
+    assert collection.queried == ["user-1", "shared"]
+
+    collection.queried.clear()
+    assert (await store.similarity_search(vectors[1], top_k=1))[0][0] == "b"
+    assert sorted(collection.queried) == ["shared", "user-1", "user-2"]
+    assert [h for h, _ in await store.similarity_search(vectors[0], filters={"user_id": 9})] == ["d"]
+
+
+@pytest.mark.asyncio
+async def test_deactivated_tenants_are_reactivated_on_use(adapter):
+    store, collection = adapter
+    a, b = str(uuid.UUID(int=1)), str(uuid.UUID(int=2))
+    await store.add_vectors(np.eye(2, dtype=np.float32), [{"user_id": 1}, {"user_id": 2}], [a, b])
+
+    assert await store.set_tenant_activity([2, 7], active=False) == ["user-2"]
+    assert collection.status["user-2"] != collection.active
+
+    # unfiltered searches and deletes leave deactivated tenants unloaded
+    store._active.clear()  # as in a process that has not used the tenants yet
+    assert [h for h, _ in await store.similarity_search(np.array([0, 1], dtype=np.float32), top_k=2)] == [a]
+    assert await store.delete_vectors([b]) == 0 and collection.deleted == ["user-1"]
+    assert collection.status["user-2"] != collection.active
+    assert (await store.similarity_search(np.array([0, 1], dtype=np.float32), filters={"user_id": 2}))[0][0] == b
+    assert collection.status["user-2"] == collection.active